@@ -1,20 +1,18 @@
+import hashlib
 import json
 import os
+import re
 import sqlite3
-from google import genai
-from config import DB_PATH
-
-# ===========================
-# CONFIG
-# ===========================
-
-MODEL = "models/gemini-2.5-flash"  # ✅ correct model
-API_KEY = os.getenv("GEMINI_API_KEY")
-
-if not API_KEY:
-    raise ValueError("❌ GEMINI_API_KEY not found in environment variables")
-
-client = genai.Client(api_key=API_KEY)
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import (
+    CATALOG_DB_PATH, CONNECTION_POOL_SIZE, DB_PATH, QUERY_HISTORY_MAX_BYTES, QUERY_HISTORY_PATH, SQL_CACHE_SIZE,
+)
+from db_connector import ConnectionPool
+from llm_backends import get_backend
+from tracing import traced_connection, traced_stream
 
 
 # ===========================
@@ -46,11 +44,45 @@ def _template_summary(table_name, columns, profile):
     return {"summary": summary, "recommendations": recs}
 
 
+def _open_catalog():
+    from catalog_db import open_catalog
+    return open_catalog()
+
+
+# Shared by all sessions/threads; connections are reopened when the file is replaced
+_sql_pool = ConnectionPool(
+    DB_PATH, lambda: traced_connection(sqlite3.connect(DB_PATH, check_same_thread=False)), CONNECTION_POOL_SIZE
+)
+_catalog_pool = ConnectionPool(CATALOG_DB_PATH, _open_catalog, CONNECTION_POOL_SIZE)
+
+_sql_cache = OrderedDict()
+_sql_cache_lock = threading.Lock()
+_sql_cache_size = SQL_CACHE_SIZE
+
+
+def configure(pool_size=None, sql_cache_size=None):
+    """Change connection reuse and the generated-SQL cache at runtime (e.g. from loadtest.py). Clears both."""
+    global _sql_cache_size
+    _sql_pool.clear(pool_size)
+    _catalog_pool.clear(pool_size)
+    with _sql_cache_lock:
+        _sql_cache.clear()
+        if sql_cache_size is not None:
+            _sql_cache_size = sql_cache_size
+
+
+def _stream_text(prompt):
+    backend = get_backend()
+    return traced_stream(backend, prompt, backend.stream(prompt))
+
+
 # ===========================
 # AI TABLE SUMMARY
 # ===========================
 
 def generate_table_summary(table_name, columns, profile):
+    if not get_backend().generative:
+        return _template_summary(table_name, columns, profile)
 
     prompt = f"""
 You are a data governance expert.
@@ -72,12 +104,7 @@ Return JSON exactly:
 """
 
     try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=prompt
-        )
-
-        text = response.text.strip()
+        text = "".join(_stream_text(prompt)).strip()
 
         if "```" in text:
             text = text.split("```")[1]
@@ -86,21 +113,57 @@ Return JSON exactly:
 
     except Exception as e:
         log_error("generate_table_summary", e)
-        return _template_summary(table_name, columns, profile)
+        # Marked so the pipeline does not cache it in place of a real summary
+        return {**_template_summary(table_name, columns, profile), "fallback": True}
 
 
 # ===========================
 # NATURAL LANGUAGE QA
 # ===========================
 
-def answer_question(question, metadata, profiles, summaries):
-    """Answer any user question about the database schema, relationships, data quality, or documentation."""
+def _keyword_answer(question, metadata, profiles):
+    """Template backend: answer common questions from the artifacts by keyword."""
+    q = question.lower()
+    tables = metadata.get("tables", {})
+    if "relationship" in q or "linked" in q or "connect" in q or "join" in q:
+        rels = metadata.get("relationships", [])
+        if not rels:
+            return "No relationships were extracted."
+        return "\n".join(
+            f"- `{r.get('table')}.{r.get('column')}` → `{r.get('ref_table')}.{r.get('ref_column')}`"
+            for r in rels
+        )
+    if "quality" in q or "rows" in q or "health" in q:
+        lines = []
+        for t, p in profiles.items():
+            kh = p.get("key_health", {})
+            lines.append(
+                f"- **{t}**: {p.get('total_rows', 0)} rows, "
+                f"null_pks={kh.get('null_pks', 0)}, duplicate_pks={kh.get('duplicate_pks', 0)}"
+            )
+        return "\n".join(lines) or "No profiles available."
+    lines = [
+        f"- **{t}**: " + ", ".join(c.get("column_name", "") for c in cols)
+        for t, cols in tables.items()
+    ]
+    return "\n".join(lines) or "No tables found."
 
-    context = json.dumps({
+
+def _answer_context(question, metadata, profiles, summaries):
+    """Tables relevant to the question from the catalog database; whole artifacts if it isn't built."""
+    with _catalog_pool.connection() as catalog:
+        if catalog is not None:
+            return catalog.context_for(question)[:12000]
+    from catalog_model import to_plain
+    return json.dumps({
         "metadata": metadata,
         "profiles": profiles,
         "summaries": summaries
-    })[:12000]   # avoid token overflow
+    }, default=to_plain)[:12000]   # avoid token overflow
+
+
+def _answer_prompt(question, metadata, profiles, summaries):
+    context = _answer_context(question, metadata, profiles, summaries)
 
     prompt = f"""
 You are an intelligent data dictionary assistant. You answer any question about the database: schema, tables, columns, relationships (foreign keys), data quality, row counts, and AI-generated summaries.
@@ -116,18 +179,52 @@ Context:
 User question:
 {question}
 """
-
+    return prompt
+
+
+def stream_answer(question, metadata, profiles, summaries, cancel_event=None):
+    """
+    Yield the answer as text chunks while the model produces them.
+    Set cancel_event (threading.Event) or close() the generator to stop early;
+    either way the underlying model stream is closed.
+    """
+    if not get_backend().generative:
+        yield _keyword_answer(question, metadata, profiles)
+        return
+    prompt = _answer_prompt(question, metadata, profiles, summaries)
+    stream = _stream_text(prompt)
     try:
-        response = client.models.generate_content(
-            model=MODEL,
-            contents=prompt
-        )
+        for chunk in stream:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            yield chunk
+    except Exception as e:
+        log_error("stream_answer", e)
+        yield f"❌ AI error: {e}"
+    finally:
+        stream.close()
 
-        return response.text.strip()
 
-    except Exception as e:
-        log_error("answer_question", e)
-        return f"❌ AI error: {e}"
+def answer_question(question, metadata, profiles, summaries):
+    """Answer any user question about the database schema, relationships, data quality, or documentation."""
+    return "".join(stream_answer(question, metadata, profiles, summaries)).strip()
+
+
+def measure_stream_latency(question, metadata, profiles, summaries):
+    """Time one streamed answer. Returns time-to-first-token, total time (seconds) and chunk count."""
+    start = time.perf_counter()
+    ttft = None
+    chunks = 0
+    for _ in stream_answer(question, metadata, profiles, summaries):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        chunks += 1
+    return {
+        "backend": get_backend().name,
+        "ttft_s": round(ttft, 4) if ttft is not None else None,
+        "total_s": round(time.perf_counter() - start, 4),
+        "chunks": chunks,
+    }
 
 
 # ===========================
@@ -135,17 +232,29 @@ User question:
 # ===========================
 
 def generate_sql(question, metadata):
+    if not get_backend().generative:
+        return "-- NL→SQL needs an LLM backend: set GEMINI_API_KEY or OPENAI_API_KEY (or LLM_BACKEND)."
 
     schema = {
         t: [c["column_name"] for c in cols]
         for t, cols in metadata["tables"].items()
     }
+    schema_text = json.dumps(schema, indent=2)
+    backend = get_backend()
+    key = (
+        backend.name, getattr(backend, "model", ""), " ".join(question.split()),
+        hashlib.sha1(schema_text.encode("utf-8")).hexdigest(),
+    )
+    with _sql_cache_lock:
+        if key in _sql_cache:
+            _sql_cache.move_to_end(key)
+            return _sql_cache[key]
 
     prompt = f"""
 You are an expert SQL generator.
 
 Database schema:
-{json.dumps(schema, indent=2)}
+{schema_text}
 
 Write ONLY a valid SQL query.
 No markdown.
@@ -156,18 +265,18 @@ Question:
 {question}
 """
 
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=prompt
-    )
-
-    sql = response.text.strip()
+    sql = "".join(_stream_text(prompt)).strip()
 
     # 🔥 CLEAN MARKDOWN IF PRESENT
     if "```" in sql:
         sql = sql.split("```")[1]
         sql = sql.replace("sql", "").strip()
 
+    if _sql_cache_size > 0:
+        with _sql_cache_lock:
+            _sql_cache[key] = sql
+            while len(_sql_cache) > _sql_cache_size:
+                _sql_cache.popitem(last=False)
     return sql
 
 # ===========================
@@ -198,23 +307,186 @@ def _is_destructive(sql):
     return False, None
 
 
+def _record_query(sql, seconds, n_rows):
+    """Append to the query history (QUERY_HISTORY_PATH), rotating it once it outgrows QUERY_HISTORY_MAX_BYTES."""
+    try:
+        QUERY_HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(QUERY_HISTORY_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"sql": sql, "seconds": round(seconds, 6), "rows": n_rows, "ts": time.time()}) + "\n")
+            full = f.tell() > QUERY_HISTORY_MAX_BYTES
+        if full:
+            os.replace(QUERY_HISTORY_PATH, QUERY_HISTORY_PATH.with_name(QUERY_HISTORY_PATH.name + ".1"))
+    except OSError as e:
+        log_error("_record_query", e)
+
+
+@contextmanager
+def _query_cursor(sql):
+    """Cursor that has executed sql on a pooled connection; nothing is committed."""
+    with _sql_pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            yield cur
+        finally:
+            # Changes made by a statement are discarded, as before pooling
+            cur.close()
+            if conn.in_transaction:
+                conn.rollback()
+
+
 def execute_sql(sql):
     blocked, reason = _is_destructive(sql)
     if blocked:
         return None, reason
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
     try:
-        cur.execute(sql)
-        rows = cur.fetchall()
-        cols = [d[0] for d in cur.description]
-
-        conn.close()
+        start = time.perf_counter()
+        with _query_cursor(sql) as cur:
+            rows = cur.fetchall()
+            cols = [d[0] for d in cur.description]
+        _record_query(sql, time.perf_counter() - start, len(rows))
         return cols, rows
 
     except Exception as e:
         log_error("execute_sql", e)
-        conn.close()
-        return None, str(e)
\ No newline at end of file
+        return None, str(e)
+
+
+# Results are read lazily from the SQLite cursor and never held beyond one page.
+# A plain single-table SELECT is paged by rowid (keyset: WHERE rowid > last key),
+# so every page costs the same; any other statement skips earlier rows with
+# fetchmany(), which stays memory-bounded but reads every earlier row.
+ROW_COUNT_CAP = 100_000
+
+_IDENT = r'(?:"(?:[^"]|"")+"|`[^`]+`|\[[^\]]+\]|\w+)'
+_PLAIN_SELECT = re.compile(
+    rf"^\s*SELECT\s+(?P<cols>.+?)\s+FROM\s+(?P<table>{_IDENT})(?:\s+WHERE\s+(?P<where>.+?))?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+# Anything that changes the row set or its order, or could swallow the appended condition
+_NOT_KEYSET = re.compile(
+    r"\b(?:DISTINCT|JOIN|UNION|INTERSECT|EXCEPT|GROUP|ORDER|LIMIT|HAVING|WINDOW|OVER"
+    r"|COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\b|--|/\*",
+    re.IGNORECASE,
+)
+
+
+def _keyset_query(cur, sql):
+    """
+    sql rewritten to return its rows in rowid order with the rowid first, after the
+    rowid given as its one parameter; None if sql is not a plain SELECT from one
+    rowid table.
+    """
+    m = _PLAIN_SELECT.match(sql)
+    if not m or _NOT_KEYSET.search(sql):
+        return None
+    table = m.group("table")
+    name = table[1:-1].replace('""', '"') if table[0] in "\"`[" else table
+    row = cur.execute(
+        "SELECT type FROM sqlite_master WHERE name = ? COLLATE NOCASE", (name,)
+    ).fetchone()
+    if not row or row[0] != "table":
+        return None
+    columns = {r[1].lower() for r in cur.execute(f"PRAGMA table_info({table})")}
+    key = next((k for k in ("rowid", "_rowid_", "oid") if k not in columns), None)
+    if key is None:
+        return None
+    try:
+        cur.execute(f"SELECT {key} FROM {table} LIMIT 0")
+    except sqlite3.OperationalError:
+        return None  # WITHOUT ROWID
+    where = f"({m.group('where')}) AND " if m.group("where") else ""
+    return f"SELECT {key}, {m.group('cols')} FROM {table} WHERE {where}{key} > ? ORDER BY {key}"
+
+
+def fetch_page(sql, page=0, page_size=100, after=None):
+    """
+    Rows page*page_size .. +page_size of a query: (columns, rows, has_more, next_after),
+    or (None, error message, False, None). When next_after is not None, passing it as
+    after with page + 1 reads the next page by key instead of skipping earlier rows.
+    Page 0 is recorded in the query history.
+    """
+    blocked, reason = _is_destructive(sql)
+    if blocked:
+        return None, reason, False, None
+    try:
+        start = time.perf_counter()
+        with _sql_pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                keyset = _keyset_query(cur, sql) if page == 0 or after is not None else None
+                if keyset is not None:
+                    cur.execute(f"{keyset} LIMIT {int(page_size) + 1}", (-(2**63) if after is None else after,))
+                    cols = [d[0] for d in cur.description[1:]]
+                    rows = cur.fetchall()
+                    next_after = rows[page_size - 1][0] if len(rows) > page_size else None
+                    rows = [r[1:] for r in rows]
+                else:
+                    next_after = None
+                    cur.execute(sql)
+                    if cur.description is None:
+                        return [], [], False, None
+                    cols = [d[0] for d in cur.description]
+                    skip = page * page_size
+                    while skip > 0:
+                        batch = cur.fetchmany(min(skip, 10_000))
+                        if not batch:
+                            break
+                        skip -= len(batch)
+                    rows = cur.fetchmany(page_size + 1)
+            finally:
+                cur.close()
+                if conn.in_transaction:
+                    conn.rollback()
+        if page == 0:
+            _record_query(sql, time.perf_counter() - start, len(rows))
+        return cols, rows[:page_size], len(rows) > page_size, next_after
+    except Exception as e:
+        log_error("fetch_page", e)
+        return None, str(e), False, None
+
+
+def count_rows(sql, cap=ROW_COUNT_CAP):
+    """Number of result rows, counting at most cap: (count, exact). (None, False) on error."""
+    if _is_destructive(sql)[0]:
+        return None, False
+    inner = sql.strip().rstrip(";")
+    try:
+        # Counted inside SQLite when the statement can be a subquery (SELECT / WITH / VALUES)
+        with _query_cursor(f"SELECT COUNT(*) FROM (SELECT 1 FROM ({inner}) LIMIT {int(cap) + 1})") as cur:
+            n = cur.fetchone()[0]
+    except sqlite3.Error:
+        try:
+            n = 0
+            with _query_cursor(sql) as cur:
+                while n <= cap:
+                    batch = cur.fetchmany(10_000)
+                    if not batch:
+                        break
+                    n += len(batch)
+        except Exception as e:
+            log_error("count_rows", e)
+            return None, False
+    return min(n, cap), n <= cap
+
+
+def write_csv(sql, path, batch_size=10_000):
+    """Stream the full result of a query to a CSV file (header row first). Returns the row count."""
+    import csv
+    from storage import atomic_writer
+
+    blocked, reason = _is_destructive(sql)
+    if blocked:
+        raise ValueError(reason)
+    n = 0
+    with _query_cursor(sql) as cur, atomic_writer(path) as f:
+        writer = csv.writer(f)
+        writer.writerow([d[0] for d in cur.description or ()])
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            writer.writerows(batch)
+            n += len(batch)
+    return n
\ No newline at end of file
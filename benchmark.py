@@ -0,0 +1,384 @@
+"""
+Benchmark the dictionary pipeline on a synthetic SQLite database.
+
+generate_database() builds a schema of N tables with M columns and R rows each.
+Foreign keys are declared and also named <parent>_id, so both the explicit and
+the inferred relationship paths run. Null rates and Zipf-skewed value
+cardinalities are configurable. run_benchmark() then runs these steps in a
+fresh subprocess against that database:
+- metadata extraction
+- relationship inference
+- profiling
+- summaries (local stub LLM)
+- artifact store, Markdown docs and static site
+- table data export
+It runs with DB_PATH/ARTIFACTS_DIR pointing at a temp dir, so real artifacts
+are untouched and peak RSS covers only the benchmark.
+
+Each step reports wall time, items/s, SQL statement count and RSS as JSON.
+compare() checks a result against a stored baseline (artifacts/benchmarks/baseline.json)
+using BENCHMARK_THRESHOLDS. The CLI exits with status 1 on a regression.
+
+    python3 benchmark.py --tables 200 --rows 5000 --save-baseline
+    python3 benchmark.py --tables 200 --rows 5000        # compare with the baseline
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from config import ARTIFACTS_DIR
+
+BENCHMARK_DIR = ARTIFACTS_DIR / "benchmarks"
+BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+
+DEFAULT_PARAMS = {
+    "tables": 50,
+    "columns": 12,
+    "rows": 2000,
+    # Average foreign keys per table (fractional part = probability of one more)
+    "fk_density": 1.0,
+    # Share of NULLs in data and foreign key columns
+    "null_rate": 0.1,
+    # Zipf exponent for value frequencies (0 = uniform)
+    "skew": 1.2,
+    "seed": 7,
+    "stub_latency_ms": 0.0,
+}
+
+# A step regresses when it is more than seconds_pct slower and at least min_seconds slower,
+# or issues more than queries_pct more SQL statements; peak RSS likewise by peak_rss_pct.
+BENCHMARK_THRESHOLDS = {
+    "seconds_pct": 25.0,
+    "min_seconds": 0.05,
+    "queries_pct": 0.0,
+    "peak_rss_pct": 25.0,
+}
+
+_KINDS = ("int", "real", "text", "date")
+_SQL_TYPES = {"int": "INTEGER", "real": "REAL", "text": "TEXT", "date": "TEXT"}
+_EPOCH = date(2020, 1, 1)
+
+
+# --------------------------------------------------
+# Synthetic database
+# --------------------------------------------------
+
+def _zipf_cum_weights(n, skew):
+    total, cum = 0.0, []
+    for k in range(n):
+        total += 1.0 / (k + 1) ** skew
+        cum.append(total)
+    return cum
+
+
+def _draw(rng, values, cum_weights, n, null_rate):
+    drawn = rng.choices(values, cum_weights=cum_weights, k=n)
+    if null_rate > 0:
+        for i in range(n):
+            if rng.random() < null_rate:
+                drawn[i] = None
+    return drawn
+
+
+def _domain(kind, size):
+    if kind == "int":
+        return list(range(size))
+    if kind == "real":
+        return [k * 0.25 for k in range(size)]
+    if kind == "text":
+        return [f"value_{k}" for k in range(size)]
+    return [(_EPOCH + timedelta(days=k)).isoformat() for k in range(size)]
+
+
+def generate_database(path, tables=50, columns=12, rows=2000, fk_density=1.0, null_rate=0.1, skew=1.2, seed=7, **_):
+    """
+    Write a synthetic SQLite database to path. Table t<i> has primary key t<i>_id,
+    foreign keys <parent>_id to earlier tables, and data columns cycling through
+    int/real/text/date (date columns are named so the profiler reports freshness).
+    Each data column gets a random cardinality; values follow a Zipf(skew) distribution.
+    Returns {"tables", "rows", "foreign_keys"}.
+    """
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    rng = random.Random(seed)
+    names = [f"t{i:04d}" for i in range(tables)]
+    ids = list(range(1, rows + 1))
+    id_weights = _zipf_cum_weights(rows, skew) if rows else []
+    n_fks = 0
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        for i, name in enumerate(names):
+            n_parents = int(fk_density) + (rng.random() < fk_density % 1)
+            parents = rng.sample(names[:i], min(n_parents, i))
+            n_fks += len(parents)
+            defs = [f"{name}_id INTEGER PRIMARY KEY"]
+            defs += [f"{p}_id INTEGER REFERENCES {p}({p}_id)" for p in parents]
+            data_cols = []
+            for j in range(max(0, columns - 1 - len(parents))):
+                kind = _KINDS[j % len(_KINDS)]
+                col = f"{kind}_date_{j}" if kind == "date" else f"{kind}_{j}"
+                defs.append(f"{col} {_SQL_TYPES[kind]}")
+                data_cols.append(kind)
+            conn.execute(f"CREATE TABLE {name} ({', '.join(defs)})")
+
+            values = [ids]
+            for _ in parents:
+                values.append(_draw(rng, ids, id_weights, rows, null_rate))
+            for kind in data_cols:
+                size = max(1, int(rows * rng.choice((0.001, 0.01, 0.1, 0.5, 1.0))))
+                values.append(_draw(rng, _domain(kind, size), _zipf_cum_weights(size, skew), rows, null_rate))
+            placeholders = ", ".join("?" * len(values))
+            conn.executemany(f"INSERT INTO {name} VALUES ({placeholders})", zip(*values))
+            conn.commit()
+    finally:
+        conn.close()
+    return {"tables": tables, "rows": tables * rows, "foreign_keys": n_fks}
+
+
+# --------------------------------------------------
+# Workload (runs in the benchmark subprocess)
+# --------------------------------------------------
+
+def _run_steps():
+    """Run every pipeline step against DB_PATH and return per-step measurements."""
+    import tracing
+    from ai_engine import generate_table_summary
+    from config import ARTIFACT_STORE_DIR, DB_PATH
+    from doc_generator import build_markdown, render_docs, render_site
+    from export_table_data import export_table_data
+    from metadata_extractor import extract_metadata
+    from profiler import profile_all
+    from relationship_extractor import detect_relationships
+    from storage import ArtifactStore
+
+    tracing.enable()
+    steps = {}
+    state = {}
+
+    def measure(name, unit, fn):
+        before = tracing.counters()
+        t0 = time.perf_counter()
+        items = fn()
+        seconds = time.perf_counter() - t0
+        after = tracing.counters()
+        steps[name] = {
+            "seconds": round(seconds, 4),
+            "items": items,
+            "unit": unit,
+            "per_s": round(items / seconds, 1) if seconds > 0 else None,
+            "queries": after.get("sql_statements", 0) - before.get("sql_statements", 0),
+            "rss_mb": tracing.rss_mb(),
+        }
+
+    def extract():
+        state["meta"] = extract_metadata()
+        return len(state["meta"]["tables"])
+
+    def relationships():
+        return len(detect_relationships(DB_PATH))
+
+    def profile():
+        state["profiles"] = profile_all(state["meta"])
+        return sum(p.get("total_rows", 0) for p in state["profiles"].values())
+
+    def summaries():
+        state["summaries"] = {
+            t: generate_table_summary(t, cols, state["profiles"][t]) for t, cols in state["meta"]["tables"].items()
+        }
+        return len(state["summaries"])
+
+    def store():
+        ArtifactStore(ARTIFACT_STORE_DIR).write_catalog(state["meta"], state["profiles"], state["summaries"])
+        return len(state["meta"]["tables"])
+
+    def docs():
+        build_markdown(state["meta"], state["profiles"], state["summaries"])
+        return render_docs()["rendered"]
+
+    def site():
+        return render_site()["rendered"]
+
+    def export():
+        return export_table_data(fmt="ndjson")["rows"]
+
+    measure("extract", "tables", extract)
+    measure("relationships", "relationships", relationships)
+    measure("profile", "rows", profile)
+    measure("summaries", "tables", summaries)
+    measure("store", "tables", store)
+    measure("docs", "pages", docs)
+    measure("site", "pages", site)
+    measure("export", "rows", export)
+    return {
+        "steps": steps,
+        "total_seconds": round(sum(s["seconds"] for s in steps.values()), 4),
+        "queries": sum(s["queries"] for s in steps.values()),
+        "peak_rss_mb": tracing.peak_rss_mb(),
+    }
+
+
+def run_benchmark(params=None, keep_dir=None):
+    """
+    Generate the synthetic database and run the workload in a subprocess.
+    Returns the result dict (params, environment, generate step, steps, totals).
+    keep_dir: keep the database and artifacts there instead of a deleted temp dir.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    work = Path(keep_dir) if keep_dir else Path(tempfile.mkdtemp(prefix="dictionary-bench-"))
+    work.mkdir(parents=True, exist_ok=True)
+    try:
+        db_path = work / "bench.db"
+        t0 = time.perf_counter()
+        shape = generate_database(db_path, **params)
+        generate_seconds = time.perf_counter() - t0
+
+        out_path = work / "result.json"
+        env = {
+            **os.environ,
+            "DB_TYPE": "sqlite",
+            "DB_PATH": str(db_path),
+            "ARTIFACTS_DIR": str(work / "artifacts"),
+            "LLM_BACKEND": "stub",
+            "STUB_LATENCY_MS": str(params["stub_latency_ms"]),
+            "TRACE": "",
+        }
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--worker", str(out_path)],
+            env=env, cwd=str(work), capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark workload failed:\n{proc.stderr[-4000:]}")
+        with open(out_path) as f:
+            result = json.load(f)
+    finally:
+        if not keep_dir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    return {
+        "params": params,
+        "shape": shape,
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "generate_seconds": round(generate_seconds, 3),
+        **result,
+    }
+
+
+# --------------------------------------------------
+# Baseline comparison
+# --------------------------------------------------
+
+def _pct(current, base):
+    return (current - base) / base * 100 if base else (0.0 if current == base else float("inf"))
+
+
+def compare(result, baseline, thresholds=None):
+    """
+    Compare a result with a baseline. Returns (regressions, notes): lists of strings.
+    Results for different params are not comparable and report only a note.
+    """
+    t = {**BENCHMARK_THRESHOLDS, **(thresholds or {})}
+    if result["params"] != baseline["params"]:
+        return [], ["Baseline was recorded with different params; nothing compared."]
+    regressions, notes = [], []
+    for name, step in result["steps"].items():
+        base = baseline["steps"].get(name)
+        if base is None:
+            notes.append(f"{name}: new step")
+            continue
+        slower = _pct(step["seconds"], base["seconds"])
+        if slower > t["seconds_pct"] and step["seconds"] - base["seconds"] >= t["min_seconds"]:
+            regressions.append(f"{name}: {step['seconds']:.3f}s vs {base['seconds']:.3f}s (+{slower:.0f}%)")
+        elif slower < -t["seconds_pct"] and base["seconds"] - step["seconds"] >= t["min_seconds"]:
+            notes.append(f"{name}: {step['seconds']:.3f}s vs {base['seconds']:.3f}s ({slower:.0f}%)")
+        if _pct(step["queries"], base["queries"]) > t["queries_pct"]:
+            regressions.append(f"{name}: {step['queries']} queries vs {base['queries']}")
+    if result["peak_rss_mb"] and baseline.get("peak_rss_mb"):
+        grown = _pct(result["peak_rss_mb"], baseline["peak_rss_mb"])
+        if grown > t["peak_rss_pct"]:
+            regressions.append(
+                f"peak RSS: {result['peak_rss_mb']} MB vs {baseline['peak_rss_mb']} MB (+{grown:.0f}%)"
+            )
+    return regressions, notes
+
+
+def format_result(result):
+    p = result["params"]
+    lines = [
+        f"Benchmark: {p['tables']} tables x {p['columns']} columns x {p['rows']} rows "
+        f"(fk {p['fk_density']}, nulls {p['null_rate']}, skew {p['skew']}); generated in {result['generate_seconds']:.2f}s",
+        f"{'step':<14} {'seconds':>9} {'items':>10} {'per s':>22} {'queries':>9} {'rss MB':>8}",
+    ]
+    for name, s in result["steps"].items():
+        per_s = f"{s['per_s']:,.0f} {s['unit']}" if s["per_s"] is not None else "-"
+        lines.append(
+            f"{name:<14} {s['seconds']:>9.3f} {s['items']:>10,} {per_s:>22} {s['queries']:>9,} {s['rss_mb'] or '-':>8}"
+        )
+    lines.append(
+        f"Total {result['total_seconds']:.3f}s, {result['queries']:,} queries, peak RSS {result['peak_rss_mb']} MB"
+    )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on a synthetic database.")
+    parser.add_argument("--worker", metavar="RESULT_PATH", help=argparse.SUPPRESS)
+    parser.add_argument("--tables", type=int, default=DEFAULT_PARAMS["tables"])
+    parser.add_argument("--columns", type=int, default=DEFAULT_PARAMS["columns"], help="Columns per table")
+    parser.add_argument("--rows", type=int, default=DEFAULT_PARAMS["rows"], help="Rows per table")
+    parser.add_argument("--fk-density", type=float, default=DEFAULT_PARAMS["fk_density"], help="Foreign keys per table")
+    parser.add_argument("--null-rate", type=float, default=DEFAULT_PARAMS["null_rate"])
+    parser.add_argument("--skew", type=float, default=DEFAULT_PARAMS["skew"], help="Zipf exponent (0 = uniform)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_PARAMS["seed"])
+    parser.add_argument("--stub-latency-ms", type=float, default=DEFAULT_PARAMS["stub_latency_ms"])
+    parser.add_argument("--output", type=Path, help="Result JSON path (default artifacts/benchmarks/<time>.json)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this result as the baseline")
+    parser.add_argument("--keep", type=Path, help="Keep the synthetic database and its artifacts in this directory")
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.worker, "w") as f:
+            json.dump(_run_steps(), f)
+        sys.exit(0)
+
+    params = {k: getattr(args, k) for k in DEFAULT_PARAMS}
+    result = run_benchmark(params, keep_dir=args.keep)
+    print(format_result(result))
+    BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+    output = args.output or BENCHMARK_DIR / f"{datetime.now():%Y%m%dT%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline {args.baseline}")
+    elif args.baseline.exists():
+        with open(args.baseline) as f:
+            regressions, notes = compare(result, json.load(f))
+        for line in notes:
+            print(f"  note: {line}")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        print("No regressions against baseline." if not regressions else f"{len(regressions)} regression(s).")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,358 @@
+"""
+Embedded SQLite catalog: sources, tables, columns, relationships, profiles and
+summaries, with indexes and an FTS5 full-text index over names and summaries.
+
+The pipeline writes it in one transaction; the UI, docs and chat query it
+instead of loading and walking the JSON artifacts, so lookups and search cost
+the same however large the catalog is. The JSON artifacts are still written and
+export_json() rebuilds them from the catalog.
+"""
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import CATALOG_DB_PATH, DB_PATH, DB_TYPE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    db_type TEXT,
+    location TEXT,
+    extracted_at TEXT
+);
+CREATE TABLE IF NOT EXISTS tables (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    ordinal INTEGER,
+    row_count INTEGER,
+    column_count INTEGER,
+    UNIQUE (source_id, name)
+);
+CREATE TABLE IF NOT EXISTS columns (
+    id INTEGER PRIMARY KEY,
+    table_id INTEGER NOT NULL REFERENCES tables(id) ON DELETE CASCADE,
+    ordinal INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    data_type TEXT,
+    nullable INTEGER,
+    primary_key INTEGER,
+    completeness_pct REAL,
+    unique_count INTEGER,
+    null_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_columns_table ON columns (table_id, ordinal);
+CREATE INDEX IF NOT EXISTS ix_columns_name ON columns (name);
+CREATE TABLE IF NOT EXISTS relationships (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    from_table TEXT NOT NULL,
+    from_column TEXT,
+    ref_table TEXT NOT NULL,
+    ref_column TEXT,
+    type TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_relationships_from ON relationships (source_id, from_table);
+CREATE INDEX IF NOT EXISTS ix_relationships_ref ON relationships (source_id, ref_table);
+CREATE TABLE IF NOT EXISTS profiles (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    total_rows INTEGER,
+    null_pks INTEGER,
+    duplicate_pks INTEGER,
+    freshness TEXT,
+    profile TEXT
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    summary TEXT,
+    recommendations TEXT
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5 (
+    source UNINDEXED, kind UNINDEXED, table_name, column_name, text, tokenize = 'unicode61'
+);
+"""
+
+DEFAULT_SOURCE = "default"
+
+
+def _connect(path=None):
+    conn = sqlite3.connect(str(path or CATALOG_DB_PATH), isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _has_fts5(conn):
+    try:
+        conn.executescript(FTS_SCHEMA)
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _init(conn):
+    conn.executescript(SCHEMA)
+    return _has_fts5(conn)
+
+
+def write_catalog(metadata, profiles, summaries, path=None, source=DEFAULT_SOURCE):
+    """Replace the source's catalog contents in a single transaction (readers keep the old snapshot until commit)."""
+    tables = metadata.get("tables", metadata)
+    conn = _connect(path)
+    try:
+        fts = _init(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM sources WHERE name = ?", (source,))
+        if fts:
+            conn.execute("DELETE FROM catalog_fts WHERE source = ?", (source,))
+        source_id = conn.execute(
+            "INSERT INTO sources (name, db_type, location, extracted_at) VALUES (?, ?, ?, ?)",
+            (source, DB_TYPE, str(DB_PATH), datetime.now(timezone.utc).isoformat()),
+        ).lastrowid
+
+        for t_ord, (name, columns) in enumerate(tables.items()):
+            profile = profiles.get(name, {}) or {}
+            col_stats = profile.get("columns", {})
+            table_id = conn.execute(
+                "INSERT INTO tables (source_id, name, ordinal, row_count, column_count) VALUES (?, ?, ?, ?, ?)",
+                (source_id, name, t_ord, profile.get("total_rows"), len(columns)),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO columns (table_id, ordinal, name, data_type, nullable, primary_key, "
+                "completeness_pct, unique_count, null_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        table_id, i, c["column_name"], c.get("data_type"), int(bool(c.get("nullable"))),
+                        int(bool(c.get("primary_key"))),
+                        col_stats.get(c["column_name"], {}).get("completeness_pct"),
+                        col_stats.get(c["column_name"], {}).get("unique_count"),
+                        col_stats.get(c["column_name"], {}).get("null_count"),
+                    )
+                    for i, c in enumerate(columns)
+                ],
+            )
+            if profile:
+                kh = profile.get("key_health", {})
+                conn.execute(
+                    "INSERT INTO profiles (table_id, total_rows, null_pks, duplicate_pks, freshness, profile) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (table_id, profile.get("total_rows"), kh.get("null_pks"), kh.get("duplicate_pks"),
+                     json.dumps(profile.get("freshness", {})), json.dumps(profile)),
+                )
+            block = summaries.get(name)
+            summary_text = ""
+            if isinstance(block, dict):
+                summary_text = block.get("summary", "")
+                conn.execute(
+                    "INSERT INTO summaries (table_id, summary, recommendations) VALUES (?, ?, ?)",
+                    (table_id, summary_text, json.dumps(block.get("recommendations", []))),
+                )
+            if fts:
+                conn.execute(
+                    "INSERT INTO catalog_fts (source, kind, table_name, column_name, text) "
+                    "VALUES (?, 'table', ?, '', ?)",
+                    (source, name, summary_text),
+                )
+                conn.executemany(
+                    "INSERT INTO catalog_fts (source, kind, table_name, column_name, text) "
+                    "VALUES (?, 'column', ?, ?, ?)",
+                    [(source, name, c["column_name"], c.get("data_type") or "") for c in columns],
+                )
+
+        conn.executemany(
+            "INSERT INTO relationships (source_id, from_table, from_column, ref_table, ref_column, type) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (source_id, r.get("table"), r.get("column"), r.get("ref_table"), r.get("ref_column"), r.get("type"))
+                for r in metadata.get("relationships", [])
+                if isinstance(r, dict) and r.get("table") and r.get("ref_table")
+            ],
+        )
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA optimize")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return path or CATALOG_DB_PATH
+
+
+def _fts_query(text):
+    """Turn free text into an FTS5 prefix query: 'order cust' -> 'order* OR cust*'."""
+    words = re.findall(r"\w+", text.lower())
+    return " OR ".join(f'"{w}"*' for w in words)
+
+
+class Catalog:
+    """Read-only view over the catalog database. One connection per instance."""
+
+    def __init__(self, path=None, source=DEFAULT_SOURCE):
+        self.path = path or CATALOG_DB_PATH
+        self.source = source
+        self.conn = sqlite3.connect(
+            Path(self.path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False
+        )
+        row = self.conn.execute("SELECT id FROM sources WHERE name = ?", (source,)).fetchone()
+        self.source_id = row[0] if row else None
+        self.has_fts = bool(self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'catalog_fts'"
+        ).fetchone())
+
+    def close(self):
+        self.conn.close()
+
+    def _table_id(self, name):
+        row = self.conn.execute(
+            "SELECT id FROM tables WHERE source_id = ? AND name = ?", (self.source_id, name)
+        ).fetchone()
+        return row[0] if row else None
+
+    def table_names(self):
+        return [r[0] for r in self.conn.execute(
+            "SELECT name FROM tables WHERE source_id = ? ORDER BY ordinal", (self.source_id,)
+        )]
+
+    def counts(self):
+        """(tables, columns, relationships)."""
+        return self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM tables WHERE source_id = ?), "
+            "(SELECT COUNT(*) FROM columns c JOIN tables t ON t.id = c.table_id WHERE t.source_id = ?), "
+            "(SELECT COUNT(*) FROM relationships WHERE source_id = ?)",
+            (self.source_id,) * 3,
+        ).fetchone()
+
+    def columns(self, table):
+        """Columns in metadata.json shape, plus profile stats."""
+        rows = self.conn.execute(
+            "SELECT c.name, c.data_type, c.nullable, c.primary_key, c.completeness_pct, c.unique_count, c.null_count "
+            "FROM columns c JOIN tables t ON t.id = c.table_id "
+            "WHERE t.source_id = ? AND t.name = ? ORDER BY c.ordinal",
+            (self.source_id, table),
+        )
+        return [
+            {
+                "column_name": r[0], "data_type": r[1], "nullable": bool(r[2]), "primary_key": bool(r[3]),
+                "completeness_pct": r[4], "unique_count": r[5], "null_count": r[6],
+            }
+            for r in rows
+        ]
+
+    def relationships(self, table=None):
+        """All relationships, or those where table is either side."""
+        sql = "SELECT from_table, from_column, ref_table, ref_column, type FROM relationships WHERE source_id = ?"
+        params = [self.source_id]
+        if table is not None:
+            sql += " AND (from_table = ? OR ref_table = ?)"
+            params += [table, table]
+        return [
+            {"table": r[0], "column": r[1], "ref_table": r[2], "ref_column": r[3], "type": r[4]}
+            for r in self.conn.execute(sql, params)
+        ]
+
+    def profile(self, table):
+        row = self.conn.execute(
+            "SELECT p.profile FROM profiles p JOIN tables t ON t.id = p.table_id WHERE t.source_id = ? AND t.name = ?",
+            (self.source_id, table),
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def summary(self, table):
+        row = self.conn.execute(
+            "SELECT s.summary, s.recommendations FROM summaries s JOIN tables t ON t.id = s.table_id "
+            "WHERE t.source_id = ? AND t.name = ?",
+            (self.source_id, table),
+        ).fetchone()
+        return {"summary": row[0], "recommendations": json.loads(row[1])} if row else {}
+
+    def search(self, text, limit=20):
+        """
+        Ranked matches for text over table names, column names and summaries:
+        [{"kind": "table"|"column", "table", "column"}].
+        """
+        if not text.strip():
+            return []
+        if self.has_fts:
+            query = _fts_query(text)
+            if not query:
+                return []
+            rows = self.conn.execute(
+                "SELECT kind, table_name, column_name FROM catalog_fts WHERE catalog_fts MATCH ? AND source = ? "
+                "ORDER BY bm25(catalog_fts, 0, 0, 5.0, 3.0, 1.0) LIMIT ?",
+                (query, self.source, limit),
+            )
+        else:
+            like = f"%{text.strip()}%"
+            rows = self.conn.execute(
+                "SELECT 'table', t.name, '' FROM tables t WHERE t.source_id = ? AND t.name LIKE ? "
+                "UNION ALL SELECT 'column', t.name, c.name FROM columns c JOIN tables t ON t.id = c.table_id "
+                "WHERE t.source_id = ? AND c.name LIKE ? LIMIT ?",
+                (self.source_id, like, self.source_id, like, limit),
+            )
+        return [{"kind": r[0], "table": r[1], "column": r[2] or None} for r in rows]
+
+    def iter_tables(self):
+        """Yield (name, columns, profile, summary) per table in catalog order."""
+        for name in self.table_names():
+            cols = [
+                {k: c[k] for k in ("column_name", "data_type", "nullable", "primary_key")}
+                for c in self.columns(name)
+            ]
+            yield name, cols, self.profile(name), self.summary(name)
+
+    def context_for(self, question, max_tables=8):
+        """Compact JSON context for the tables most relevant to a question (for the chat prompt)."""
+        names = []
+        for hit in self.search(question, limit=max_tables * 4):
+            if hit["table"] not in names:
+                names.append(hit["table"])
+            if len(names) >= max_tables:
+                break
+        if not names:
+            names = self.table_names()[:max_tables]
+        n_tables, n_columns, n_rels = self.counts()
+        context = {
+            "catalog": {"tables": n_tables, "columns": n_columns, "relationships": n_rels},
+            "tables": {},
+        }
+        for name in names:
+            context["tables"][name] = {
+                "columns": [
+                    {k: c[k] for k in ("column_name", "data_type", "primary_key", "completeness_pct")}
+                    for c in self.columns(name)
+                ],
+                "profile": {k: v for k, v in self.profile(name).items() if k != "columns"},
+                "summary": self.summary(name).get("summary", ""),
+                "relationships": self.relationships(name),
+            }
+        return json.dumps(context, default=str)
+
+    def export_json(self):
+        """(metadata, profiles, summaries) in the flat JSON artifact shapes."""
+        metadata = {"tables": {}, "relationships": self.relationships()}
+        profiles, summaries = {}, {}
+        for name, cols, profile, summary in self.iter_tables():
+            metadata["tables"][name] = cols
+            if profile:
+                profiles[name] = profile
+            if summary:
+                summaries[name] = summary
+        return metadata, profiles, summaries
+
+
+def open_catalog(path=None):
+    """Catalog for path (default CATALOG_DB_PATH), or None if it has not been built yet."""
+    path = path or CATALOG_DB_PATH
+    if not Path(path).exists():
+        return None
+    try:
+        return Catalog(path)
+    except sqlite3.Error:
+        return None
@@ -0,0 +1,304 @@
+"""
+Compact in-memory catalog model.
+
+The JSON artifacts load as nested dicts of lists of dicts (one dict with four
+string keys per column). Here each table keeps its columns as parallel arrays
+instead: interned name/type tuples, a flags byte array and array('d'/'q') for
+numeric profile fields, all in __slots__ classes. One model is built per
+artifact version and shared by every caller in the process (e.g. all Streamlit
+sessions). Read-only Mapping/Sequence views give existing code the dict shapes
+it expects (metadata["tables"][t][i]["column_name"], profiles[t]["columns"]...).
+"""
+import sys
+import threading
+from array import array
+from collections.abc import Mapping, Sequence
+
+from config import ARTIFACTS_DIR
+from storage import read_generation, read_json_set
+
+_NULLABLE = 1
+_PRIMARY_KEY = 2
+_MISSING_INT = -1
+_MISSING_FLOAT = float("nan")
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Relationship:
+    __slots__ = ("table", "column", "ref_table", "ref_column", "type")
+
+    def __init__(self, table, column, ref_table, ref_column, type):
+        self.table = _intern(table)
+        self.column = _intern(column)
+        self.ref_table = _intern(ref_table)
+        self.ref_column = _intern(ref_column)
+        self.type = _intern(type)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Table:
+    """One table: struct-of-arrays column storage plus table-level profile and summary."""
+
+    __slots__ = (
+        "name", "column_names", "data_types", "flags",
+        "completeness", "unique_count", "null_count",
+        "total_rows", "key_health", "freshness", "summary", "recommendations",
+        "_positions",
+    )
+
+    def __init__(self, name, columns, profile, summary):
+        self.name = _intern(name)
+        self.column_names = tuple(_intern(c.get("column_name", c.get("name", ""))) for c in columns)
+        self.data_types = tuple(_intern(c.get("data_type", c.get("type", "")) or "") for c in columns)
+        self.flags = array("B", (
+            (_NULLABLE if c.get("nullable") else 0)
+            | (_PRIMARY_KEY if c.get("primary_key", c.get("pk")) else 0)
+            for c in columns
+        ))
+        stats = (profile or {}).get("columns", {})
+        self.completeness = array("d", (
+            stats.get(n, {}).get("completeness_pct", _MISSING_FLOAT) for n in self.column_names
+        ))
+        self.unique_count = array("q", (stats.get(n, {}).get("unique_count", _MISSING_INT) for n in self.column_names))
+        self.null_count = array("q", (stats.get(n, {}).get("null_count", _MISSING_INT) for n in self.column_names))
+        self.total_rows = (profile or {}).get("total_rows")
+        self.key_health = (profile or {}).get("key_health")
+        self.freshness = (profile or {}).get("freshness")
+        block = summary if isinstance(summary, dict) else {}
+        self.summary = block.get("summary")
+        self.recommendations = tuple(block.get("recommendations", ()))
+        self._positions = None
+
+    def __len__(self):
+        return len(self.column_names)
+
+    def position(self, column):
+        if self._positions is None:
+            self._positions = {n: i for i, n in enumerate(self.column_names)}
+        return self._positions.get(column)
+
+    def has_profile(self):
+        return self.total_rows is not None
+
+
+# --------------------------------------------------
+# Dict-compatible read-only views
+# --------------------------------------------------
+
+class ColumnView(Mapping):
+    """metadata["tables"][t][i] — {"column_name", "data_type", "nullable", "primary_key"}."""
+
+    __slots__ = ("_table", "_i")
+    _KEYS = ("column_name", "data_type", "nullable", "primary_key")
+
+    def __init__(self, table, i):
+        self._table = table
+        self._i = i
+
+    def __getitem__(self, key):
+        t, i = self._table, self._i
+        if key == "column_name":
+            return t.column_names[i]
+        if key == "data_type":
+            return t.data_types[i]
+        if key == "nullable":
+            return bool(t.flags[i] & _NULLABLE)
+        if key == "primary_key":
+            return bool(t.flags[i] & _PRIMARY_KEY)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ColumnsView(Sequence):
+    __slots__ = ("_table",)
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ColumnView(self._table, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return ColumnView(self._table, i)
+
+    def __len__(self):
+        return len(self._table)
+
+
+class _TableMapping(Mapping):
+    """Mapping over model tables; subclasses define _value(table)."""
+
+    __slots__ = ("_model",)
+
+    def __init__(self, model):
+        self._model = model
+
+    def _value(self, table):
+        raise NotImplementedError
+
+    def _include(self, table):
+        return True
+
+    def __getitem__(self, name):
+        table = self._model.tables[name]
+        if not self._include(table):
+            raise KeyError(name)
+        return self._value(table)
+
+    def __iter__(self):
+        return (n for n, t in self._model.tables.items() if self._include(t))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class TablesView(_TableMapping):
+    """metadata["tables"]."""
+
+    __slots__ = ()
+
+    def _value(self, table):
+        return ColumnsView(table)
+
+
+class ColumnStatsView(Mapping):
+    """profiles[t]["columns"] — {column: {"completeness_pct", "unique_count", "null_count"}}."""
+
+    __slots__ = ("_table",)
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, column):
+        t = self._table
+        i = t.position(column)
+        if i is None or t.unique_count[i] == _MISSING_INT:
+            raise KeyError(column)
+        return {
+            "completeness_pct": t.completeness[i],
+            "unique_count": t.unique_count[i],
+            "null_count": t.null_count[i],
+        }
+
+    def __iter__(self):
+        t = self._table
+        return (n for i, n in enumerate(t.column_names) if t.unique_count[i] != _MISSING_INT)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class ProfilesView(_TableMapping):
+    __slots__ = ()
+
+    def _include(self, table):
+        return table.has_profile()
+
+    def _value(self, table):
+        profile = {"total_rows": table.total_rows, "columns": ColumnStatsView(table)}
+        if table.freshness is not None:
+            profile["freshness"] = table.freshness
+        if table.key_health is not None:
+            profile["key_health"] = table.key_health
+        return profile
+
+
+class SummariesView(_TableMapping):
+    __slots__ = ()
+
+    def _include(self, table):
+        return table.summary is not None
+
+    def _value(self, table):
+        return {"summary": table.summary, "recommendations": list(table.recommendations)}
+
+
+class CatalogModel:
+    __slots__ = ("tables", "relationships", "version")
+
+    def __init__(self, tables, relationships, version=None):
+        self.tables = tables
+        self.relationships = relationships
+        self.version = version
+
+    @classmethod
+    def from_artifacts(cls, metadata, profiles, summaries, version=None):
+        tables_src = metadata.get("tables", metadata)
+        tables = {
+            _intern(name): Table(name, cols, profiles.get(name), summaries.get(name))
+            for name, cols in tables_src.items()
+            if isinstance(cols, list)
+        }
+        rels = tuple(
+            Relationship(r.get("table"), r.get("column"), r.get("ref_table"), r.get("ref_column"), r.get("type"))
+            for r in metadata.get("relationships", [])
+            if isinstance(r, dict)
+        )
+        return cls(tables, rels, version)
+
+    def as_artifacts(self):
+        """(metadata, profiles, summaries) as read-only views in the JSON artifact shapes."""
+        metadata = {
+            "tables": TablesView(self),
+            "relationships": [r.as_dict() for r in self.relationships],
+        }
+        return metadata, ProfilesView(self), SummariesView(self)
+
+
+def to_plain(obj):
+    """json.dumps default= hook: turn views back into plain dicts/lists."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, Sequence) and not isinstance(obj, str):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# --------------------------------------------------
+# Shared, per-artifact-version model
+# --------------------------------------------------
+
+_ARTIFACT_FILES = ("metadata.json", "profiles.json", "summaries.json")
+_shared = None
+_lock = threading.Lock()
+
+
+def artifacts_version(artifacts_dir=ARTIFACTS_DIR):
+    """Publish generation + artifact mtimes; changes whenever the pipeline rewrites an artifact."""
+    return (read_generation(artifacts_dir),) + tuple(
+        (artifacts_dir / name).stat().st_mtime_ns if (artifacts_dir / name).exists() else 0
+        for name in _ARTIFACT_FILES
+    )
+
+
+def get_shared_model(artifacts_dir=ARTIFACTS_DIR):
+    """The process-wide model for the current artifacts, rebuilt only when they change."""
+    global _shared
+    version = artifacts_version(artifacts_dir)
+    model = _shared
+    if model is not None and model.version == version:
+        return model
+    with _lock:
+        if _shared is None or _shared.version != version:
+            # One consistent generation (see storage.publish_json). If a newer one lands meanwhile,
+            # the version below is already stale and the next call reloads.
+            version = artifacts_version(artifacts_dir)
+            loaded = read_json_set(_ARTIFACT_FILES, artifacts_dir)
+            _shared = CatalogModel.from_artifacts(*loaded, version=version)
+        return _shared
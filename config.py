@@ -13,7 +13,32 @@ except ImportError:
 
 # Project root
 PROJECT_ROOT = Path(__file__).resolve().parent
-ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
+ARTIFACTS_DIR = Path(os.getenv("ARTIFACTS_DIR", str(PROJECT_ROOT / "artifacts")))
+# Sharded per-table artifact store (see storage.ArtifactStore)
+ARTIFACT_STORE_DIR = ARTIFACTS_DIR / "store"
+# Embedded catalog database (see catalog_db.py)
+CATALOG_DB_PATH = ARTIFACTS_DIR / "catalog.db"
+# Deduplicated profile snapshots, metric series and drift alerts (see profile_history.py)
+PROFILE_HISTORY_PATH = ARTIFACTS_DIR / "profile_history.db"
+# Per-table Markdown pages + index (see doc_generator.render_docs)
+DOCS_DIR = ARTIFACTS_DIR / "docs"
+# Static HTML site with client-side search (see doc_generator.render_site)
+SITE_DIR = ARTIFACTS_DIR / "site"
+# DAG executor checkpoints + stage result cache (see dag_executor.py)
+PIPELINE_STATE_PATH = ARTIFACTS_DIR / "pipeline_state.db"
+# TRACE=1 records spans, SQL and LLM timings to artifacts/traces/ (see tracing.py)
+TRACE_ENABLED = os.getenv("TRACE", "").strip().lower() in ("1", "true", "yes")
+# Events kept in memory between exports; the oldest are dropped past this (e.g. watch mode)
+TRACE_MAX_EVENTS = int(os.getenv("TRACE_MAX_EVENTS", "200000"))
+# Worker threads per pipeline stage (profiling runs SQL, summarizing waits on the LLM)
+PROFILE_WORKERS = int(os.getenv("PROFILE_WORKERS", "4"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))
+# Watch mode (see watch.py): poll interval, quiet period before a refresh, cap on the delay
+# during a long burst of changes, and periodic full re-profile (0 = never)
+WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "2"))
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "5"))
+WATCH_MAX_DELAY_SECONDS = float(os.getenv("WATCH_MAX_DELAY_SECONDS", "60"))
+WATCH_FULL_REFRESH_HOURS = float(os.getenv("WATCH_FULL_REFRESH_HOURS", "24"))
 
 # Database: sqlite | postgres | sqlserver
 DB_TYPE = os.getenv("DB_TYPE", "sqlite")
@@ -23,9 +48,26 @@ DB_PATH = os.getenv("DB_PATH", str(PROJECT_ROOT / "demo.db"))
 POSTGRES_URI = os.getenv("POSTGRES_URI", "")
 SQLSERVER_URI = os.getenv("SQLSERVER_URI", "")
 
-# AI: set OPENAI_API_KEY for business summaries and NL answers
+# AI backend: auto | gemini | openai | template | stub
+# auto = Gemini if GEMINI_API_KEY is set, else OpenAI if OPENAI_API_KEY is set, else template
+LLM_BACKEND = os.getenv("LLM_BACKEND", "auto").strip().lower()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Local stub backend: per-chunk latency (for offline benchmarks)
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "20"))
+
+# Chat / NL→SQL: idle SQLite connections kept for reuse (0 = open one per request)
+CONNECTION_POOL_SIZE = int(os.getenv("CONNECTION_POOL_SIZE", "8"))
+# Generated SQL remembered per (question, schema, backend); 0 disables the cache
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "256"))
+# Queries run by execute_sql, one JSON object per line (read by index_advisor.py); past
+# QUERY_HISTORY_MAX_BYTES the file is rotated to query_history.jsonl.1 (one old file kept)
+QUERY_HISTORY_PATH = ARTIFACTS_DIR / "query_history.jsonl"
+QUERY_HISTORY_MAX_BYTES = int(os.getenv("QUERY_HISTORY_MAX_BYTES", str(5 * 1024 * 1024)))
+# ER diagram: most nodes drawn at once; larger schemas open as collapsed groups (see er_layout.py)
+ER_MAX_NODES = int(os.getenv("ER_MAX_NODES", "300"))
 
 
 def get_db_connection_string():
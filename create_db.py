@@ -1,25 +1,33 @@
-import pandas as pd
-import sqlite3
+"""
+Create demo.db from the CSV files in the project root (or CSV_DIR / a manifest).
+Uses the streaming loader in csv_loader.py: chunked executemany under bulk-load
+pragmas, typed schemas with primary keys inferred from a sample, files parsed in parallel.
+"""
 import os
+from pathlib import Path
+
+from csv_loader import discover_csv_files, format_report, load_csv_files
 
 DB = "demo.db"
+CSV_DIR = os.getenv("CSV_DIR", str(Path(__file__).resolve().parent))
 
-CSV_FILES = {
-    "customers": "olist_customers_dataset.csv",
-    "orders": "olist_orders_dataset.csv",
-    "order_items": "olist_order_items_dataset.csv",
-    "payments": "olist_order_payments_dataset.csv",
-    "products": "olist_products_dataset.csv",
-    "reviews": "olist_order_reviews_dataset.csv",
-    "sellers": "olist_sellers_dataset.csv"
+# Olist file names whose table name differs from the default (olist_<name>_dataset.csv -> <name>)
+CSV_TABLE_NAMES = {
+    "olist_order_payments_dataset.csv": "payments",
+    "olist_order_reviews_dataset.csv": "reviews",
 }
 
-conn = sqlite3.connect(DB)
 
-for table, file in CSV_FILES.items():
-    df = pd.read_csv(file)
-    df.to_sql(table, conn, if_exists="replace", index=False)
-    print(f"Loaded {table}")
+def main():
+    files = discover_csv_files(CSV_DIR, names=CSV_TABLE_NAMES)
+    if not files:
+        raise SystemExit(f"No CSV files found in {CSV_DIR}")
+
+    report = load_csv_files(DB, files, workers=os.cpu_count() or 1)
+    print(format_report(report))
+    print("Database created.")
+
 
-conn.close()
-print("Database created.")
\ No newline at end of file
+# The loader's process pool re-imports this module in its workers (spawn start method)
+if __name__ == "__main__":
+    main()
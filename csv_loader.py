@@ -0,0 +1,326 @@
+"""
+Streaming CSV → SQLite loader.
+
+Files are discovered from a directory or a manifest, each file's schema
+(column types and a declared primary key) is inferred from a sample, and rows
+are streamed in chunks with executemany() inside one large transaction under
+bulk-load pragmas. With several workers, files are parsed in parallel into
+per-file shard databases which are then merged into the target.
+
+Only the throwaway shards run without a rollback journal: a failed load there
+discards the shard file. The target database keeps its journal, so the
+rollback after a non-unique primary key (or any error) leaves it intact.
+"""
+import csv
+import json
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CHUNK_ROWS = 50_000
+SAMPLE_ROWS = 1000
+BULK_PRAGMAS = (
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -200000",
+)
+# Shards are rebuilt from the CSV on any failure, so they can skip the journal
+SHARD_PRAGMAS = ("PRAGMA journal_mode = OFF",) + BULK_PRAGMAS
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_name_for(path) -> str:
+    """olist_order_items_dataset.csv -> order_items."""
+    stem = Path(path).stem.lower()
+    stem = re.sub(r"^olist_", "", stem)
+    stem = re.sub(r"_dataset$", "", stem)
+    return re.sub(r"\W", "_", stem)
+
+
+def discover_csv_files(source, names: Optional[dict] = None) -> dict:
+    """
+    {table: csv path} from a directory (every *.csv) or a JSON manifest file
+    ({"table": "file.csv", ...}, paths relative to the manifest; FileNotFoundError
+    if any listed file is missing).
+    names optionally maps file names to table names; otherwise table_name_for() is used.
+    """
+    source = Path(source)
+    if source.is_file():
+        with open(source) as f:
+            manifest = json.load(f)
+        files = {t: source.parent / p for t, p in manifest.items()}
+        missing = [str(p) for p in files.values() if not p.exists()]
+        if missing:
+            raise FileNotFoundError(f"Files listed in {source} not found: {', '.join(missing)}")
+        return files
+    names = names or {}
+    return {names.get(p.name, table_name_for(p)): p for p in sorted(source.glob("*.csv"))}
+
+
+def _value_type(v):
+    try:
+        int(v)
+        return "INTEGER"
+    except ValueError:
+        pass
+    try:
+        float(v)
+        return "REAL"
+    except ValueError:
+        return "TEXT"
+
+
+def _open_csv(path):
+    return open(path, newline="", encoding="utf-8-sig")
+
+
+def infer_schema(path, table, sample_rows=SAMPLE_ROWS) -> dict:
+    """
+    Infer {"columns": [(name, type)], "primary_key": name or None} from the header and a sample.
+    The primary key is the first `id` / `<table>_id` / `*_id` column that is non-empty and unique in the sample.
+    Raises ValueError for a file without a header row or with repeated column names.
+    """
+    with _open_csv(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"{path}: empty CSV, no header row")
+        sample = [row for _, row in zip(range(sample_rows), reader)]
+    seen, repeated = set(), []
+    for name in header:
+        # SQLite column names are case-insensitive
+        if name.lower() in seen:
+            repeated.append(name)
+        seen.add(name.lower())
+    if repeated:
+        raise ValueError(f"{path}: repeated column names in the header: {', '.join(repeated)}")
+    rank = {"INTEGER": 0, "REAL": 1, "TEXT": 2}
+    columns = []
+    for i, name in enumerate(header):
+        typ = "INTEGER"
+        for row in sample:
+            v = row[i] if i < len(row) else ""
+            if v != "":
+                t = _value_type(v)
+                if rank[t] > rank[typ]:
+                    typ = t
+                if typ == "TEXT":
+                    break
+        columns.append((name, typ))
+
+    singular = table[:-1] if table.endswith("s") else table
+    candidates = sorted(
+        (name for name, _ in columns if name.lower() == "id" or name.lower().endswith("_id")),
+        key=lambda n: (n.lower() not in ("id", f"{singular}_id"),),
+    )
+    primary_key = None
+    for name in candidates:
+        i = header.index(name)
+        values = [row[i] for row in sample if i < len(row)]
+        if values and all(values) and len(set(values)) == len(values) == len(sample):
+            primary_key = name
+            break
+    return {"columns": columns, "primary_key": primary_key}
+
+
+def _create_table(conn, table, schema, with_pk=True):
+    cols = []
+    for name, typ in schema["columns"]:
+        pk = " PRIMARY KEY" if with_pk and name == schema["primary_key"] else ""
+        cols.append(f"{_q(name)} {typ}{pk}")
+    conn.execute(f"DROP TABLE IF EXISTS {_q(table)}")
+    conn.execute(f"CREATE TABLE {_q(table)} ({', '.join(cols)})")
+
+
+def _converter(typ):
+    cast = {"INTEGER": int, "REAL": float}.get(typ)
+
+    def convert(v):
+        if v == "":
+            return None
+        if cast is None:
+            return v
+        try:
+            return cast(v)
+        except ValueError:
+            return v  # sample missed a wider type; SQLite keeps the text
+    return convert
+
+
+def _insert_rows(conn, table, path, schema, chunk_rows):
+    converters = [_converter(typ) for _, typ in schema["columns"]]
+    width = len(converters)
+    sql = f"INSERT INTO {_q(table)} VALUES ({', '.join('?' * width)})"
+    n = 0
+    with _open_csv(path) as f:
+        reader = csv.reader(f)
+        next(reader)
+        chunk = []
+        for row in reader:
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            chunk.append([conv(v) for conv, v in zip(converters, row)])
+            if len(chunk) >= chunk_rows:
+                conn.executemany(sql, chunk)
+                n += len(chunk)
+                chunk = []
+        if chunk:
+            conn.executemany(sql, chunk)
+            n += len(chunk)
+    return n
+
+
+def _connect_bulk(db_path, pragmas=BULK_PRAGMAS):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma in pragmas:
+        conn.execute(pragma)
+    return conn
+
+
+def _load_table(conn, table, path, schema, chunk_rows):
+    """Create table and insert the CSV in one transaction; returns rows inserted."""
+    conn.execute("BEGIN")
+    _create_table(conn, table, schema)
+    n = _insert_rows(conn, table, path, schema, chunk_rows)
+    conn.execute("COMMIT")
+    return n
+
+
+def load_csv(conn, table, path, chunk_rows=DEFAULT_CHUNK_ROWS, schema=None) -> dict:
+    """
+    Load one CSV into table (replaced) inside one transaction. If the inferred
+    primary key turns out not to be unique, the table is reloaded without it.
+    conn must have a rollback journal (not journal_mode = OFF).
+    Returns {"rows", "seconds", "primary_key"}.
+    """
+    t0 = time.perf_counter()
+    schema = schema or infer_schema(path, table)
+    try:
+        n = _load_table(conn, table, path, schema, chunk_rows)
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if not isinstance(e, sqlite3.IntegrityError) or not schema["primary_key"]:
+            raise
+        schema = {**schema, "primary_key": None}
+        n = _load_table(conn, table, path, schema, chunk_rows)
+    return {"rows": n, "seconds": round(time.perf_counter() - t0, 3), "primary_key": schema["primary_key"]}
+
+
+def _load_shard(table, path, shard_path, chunk_rows):
+    """
+    Worker: parse one CSV into its own shard database (no journal). A non-unique
+    primary key discards the shard and starts over without the key.
+    """
+    t0 = time.perf_counter()
+    schema = infer_schema(path, table)
+    while True:
+        shard_path.unlink(missing_ok=True)
+        conn = _connect_bulk(shard_path, SHARD_PRAGMAS)
+        try:
+            n = _load_table(conn, table, path, schema, chunk_rows)
+            break
+        except sqlite3.IntegrityError:
+            if not schema["primary_key"]:
+                raise
+            schema = {**schema, "primary_key": None}
+        finally:
+            conn.close()
+    return {"rows": n, "seconds": round(time.perf_counter() - t0, 3), "primary_key": schema["primary_key"]}
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process and its finished workers (None where unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return round(peak_kb / 1024, 1)
+
+
+def load_csv_files(db_path, files: dict, workers: int = 1, chunk_rows=DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Load {table: csv path} into db_path. workers > 1 parses files in a process pool,
+    each into a shard database next to db_path, then merges the shards.
+    Returns {"tables": {table: {rows, seconds, rows_per_s, primary_key}}, "rows", "seconds", "peak_rss_mb"}.
+    """
+    started = time.perf_counter()
+    report = {"tables": {}}
+    shards = {}
+    conn = _connect_bulk(db_path)
+    try:
+        if workers <= 1 or len(files) <= 1:
+            for table, path in files.items():
+                report["tables"][table] = load_csv(conn, table, path, chunk_rows)
+        else:
+            db_path = Path(db_path)
+            shards = {t: db_path.with_name(f"{db_path.stem}.{t}.shard.db") for t in files}
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    t: pool.submit(_load_shard, t, path, shards[t], chunk_rows)
+                    for t, path in files.items()
+                }
+                for table, future in futures.items():
+                    report["tables"][table] = future.result()
+                    shard = shards[table]
+                    t0 = time.perf_counter()
+                    conn.execute("ATTACH DATABASE ? AS shard", (str(shard),))
+                    conn.execute("BEGIN")
+                    sql = conn.execute(
+                        "SELECT sql FROM shard.sqlite_master WHERE type='table' AND name=?", (table,)
+                    ).fetchone()[0]
+                    conn.execute(f"DROP TABLE IF EXISTS main.{_q(table)}")
+                    conn.execute(sql)
+                    conn.execute(f"INSERT INTO main.{_q(table)} SELECT * FROM shard.{_q(table)}")
+                    conn.execute("COMMIT")
+                    conn.execute("DETACH DATABASE shard")
+                    shard.unlink()
+                    report["tables"][table]["seconds"] += round(time.perf_counter() - t0, 3)
+    finally:
+        conn.close()
+        # Shards of files that failed, or were not merged because another one failed
+        for shard in shards.values():
+            shard.unlink(missing_ok=True)
+    for stats in report["tables"].values():
+        stats["rows_per_s"] = round(stats["rows"] / stats["seconds"]) if stats["seconds"] else stats["rows"]
+    report["rows"] = sum(s["rows"] for s in report["tables"].values())
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["peak_rss_mb"] = _peak_rss_mb()
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Loaded {table}: {s['rows']} rows in {s['seconds']:.2f}s ({s['rows_per_s']:,} rows/s)"
+        + (f", PK {s['primary_key']}" if s.get("primary_key") else "")
+        for table, s in report["tables"].items()
+    ]
+    lines.append(
+        f"Total: {report['rows']} rows in {report['seconds']:.2f}s, peak RSS {report['peak_rss_mb']} MB"
+    )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from config import DB_PATH
+
+    parser = argparse.ArgumentParser(description="Stream CSV files into a SQLite database.")
+    parser.add_argument("source", help="Directory of *.csv files or a JSON manifest {table: file}")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+    print(format_report(load_csv_files(args.db, discover_csv_files(args.source), args.workers, args.chunk_rows)))
@@ -0,0 +1,327 @@
+"""
+Per-key DAG executor for the pipeline.
+
+Stages form a dependency graph and run once per key (table). Each stage has a
+bounded input queue and its own worker threads; as soon as every dependency of
+a stage has finished for a key, that key is queued for the stage, so table A
+can be summarized while table B is still being profiled. Full queues block the
+producer (backpressure), keeping memory bounded for large catalogs.
+
+Results can be cached across runs by a hash of each task's inputs
+(cache=True, for deterministic stages such as LLM summaries) and every
+finished task is checkpointed, so an interrupted run resumes where it stopped.
+"""
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import PIPELINE_STATE_PATH
+from tracing import span
+
+DEFAULT_QUEUE_SIZE = 64
+# Cache entries not used by one of the last CACHE_KEEP_RUNS runs are dropped
+CACHE_KEEP_RUNS = 5
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (run_id, stage, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cache (
+    stage TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    last_run INTEGER NOT NULL,
+    PRIMARY KEY (stage, input_hash)
+) WITHOUT ROWID;
+"""
+
+
+class Stage:
+    """
+    One per-key step. fn(key, payload, inputs) returns a JSON-serialisable result;
+    inputs maps each dependency's name to its result for the same key.
+    version is mixed into cache/checkpoint hashes (bump it, or pass e.g. the LLM
+    backend name, when the same inputs should produce a different result).
+    on_exit() runs in each worker thread as it stops (e.g. to close a per-thread connection).
+    With cache=True, cacheable(value) can veto caching a result (e.g. a fallback).
+    """
+
+    def __init__(
+        self, name, fn, depends_on=(), workers=1, cache=False, version=1,
+        queue_size=DEFAULT_QUEUE_SIZE, on_exit=None, cacheable=None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+        self.workers = max(1, int(workers))
+        self.cache = cache
+        self.version = version
+        self.queue_size = queue_size
+        self.on_exit = on_exit
+        self.cacheable = cacheable
+
+
+def _input_hash(stage, key, payload, inputs):
+    text = json.dumps([stage.name, stage.version, key, payload, inputs], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class PipelineState:
+    """Checkpoints and result cache in a small SQLite file, shared by the worker threads."""
+
+    def __init__(self, path=None):
+        path = Path(path or PIPELINE_STATE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(STATE_SCHEMA)
+        self.lock = threading.Lock()
+        self.run_id = None
+        self.resumed = False
+
+    def start_run(self, resume=False):
+        """Start a run; with resume=True, continue the last run if it never finished."""
+        with self.lock:
+            row = self.conn.execute("SELECT id, finished FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+            if resume and row and row[1] is None:
+                self.run_id, self.resumed = row[0], True
+            else:
+                self.run_id = self.conn.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+        return self.run_id
+
+    def checkpoint(self, stage, key, input_hash):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM checkpoints WHERE run_id = ? AND stage = ? AND key = ? AND input_hash = ?",
+                (self.run_id, stage, key, input_hash),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_checkpoint(self, stage, key, input_hash, value):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, stage, key, input_hash, value) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, stage, key, input_hash, json.dumps(value, default=str)),
+            )
+
+    def cached(self, stage, input_hash):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM cache WHERE stage = ? AND input_hash = ?", (stage, input_hash)
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE cache SET last_run = ? WHERE stage = ? AND input_hash = ?", (self.run_id, stage, input_hash)
+                )
+        return json.loads(row[0]) if row else None
+
+    def save_cache(self, stage, input_hash, value):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (stage, input_hash, value, last_run) VALUES (?, ?, ?, ?)",
+                (stage, input_hash, json.dumps(value, default=str), self.run_id),
+            )
+
+    def finish_run(self):
+        """Mark the run complete, drop its checkpoints and stale cache entries."""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run_id))
+            self.conn.execute("DELETE FROM checkpoints WHERE run_id <= ?", (self.run_id,))
+            self.conn.execute("DELETE FROM cache WHERE last_run <= ?", (self.run_id - CACHE_KEEP_RUNS,))
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+
+class DagExecutor:
+    """Run stages over keys with per-stage worker pools and bounded queues between them."""
+
+    def __init__(self, stages, state=None):
+        self.stages = {s.name: s for s in stages}
+        for s in stages:
+            missing = [d for d in s.depends_on if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {s.name} depends on unknown stage(s): {', '.join(missing)}")
+        self._check_acyclic()
+        self.state = state
+        self.downstream = {name: [s for s in stages if name in s.depends_on] for name in self.stages}
+        self.roots = [s for s in stages if not s.depends_on]
+
+    def _check_acyclic(self):
+        seen, visiting = set(), set()
+
+        def visit(name):
+            if name in visiting:
+                raise ValueError(f"Stage dependency cycle through {name}")
+            if name not in seen:
+                visiting.add(name)
+                for dep in self.stages[name].depends_on:
+                    visit(dep)
+                visiting.discard(name)
+                seen.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def run(self, items, progress=None):
+        """
+        items: {key: payload}. Returns {"results": {stage: {key: result}}, "errors": {stage: {key: message}},
+        "stats": {stage: {"tasks", "cached", "resumed", "busy_s"}}, "seconds"}.
+        A failed task skips its key in every downstream stage.
+        progress(done, total), if given, is called from a worker thread each time a key
+        has finished (or been skipped) in every stage.
+        """
+        started = time.perf_counter()
+        results = {name: {} for name in self.stages}
+        errors = {name: {} for name in self.stages}
+        stats = {name: {"tasks": 0, "cached": 0, "resumed": 0, "busy_s": 0.0} for name in self.stages}
+        queues = {name: queue.Queue(maxsize=s.queue_size) for name, s in self.stages.items()}
+        lock = threading.Lock()
+        remaining = {"tasks": len(items) * len(self.stages)}
+        all_done = threading.Event()
+        if not remaining["tasks"]:
+            all_done.set()
+
+        settled = set()
+        queued = set()
+        settled_per_key = {}
+        keys_done = {"n": 0}
+
+        def finish(tasks):
+            # tasks: (stage, key) pairs that are complete or will never run
+            with lock:
+                new = [t for t in tasks if t not in settled]
+                settled.update(new)
+                remaining["tasks"] -= len(new)
+                for _, key in new:
+                    settled_per_key[key] = settled_per_key.get(key, 0) + 1
+                    if settled_per_key[key] == len(self.stages):
+                        keys_done["n"] += 1
+                done = keys_done["n"]
+                if remaining["tasks"] <= 0:
+                    all_done.set()
+            if progress is not None and new:
+                progress(done, len(items))
+
+        def downstream_of(name):
+            found, frontier = set(), [name]
+            while frontier:
+                for s in self.downstream[frontier.pop()]:
+                    if s.name not in found:
+                        found.add(s.name)
+                        frontier.append(s.name)
+            return found
+
+        def claim_ready(name, key):
+            """Downstream stages of name whose dependencies are all done for key, each claimed once."""
+            with lock:
+                ready = [
+                    s for s in self.downstream[name]
+                    if (s.name, key) not in queued and all(key in results[d] for d in s.depends_on)
+                ]
+                queued.update((s.name, key) for s in ready)
+            return ready
+
+        def execute(stage, key):
+            payload = items[key]
+            with lock:
+                inputs = {d: results[d][key] for d in stage.depends_on}
+            t0 = time.perf_counter()
+            with span(stage.name, cat="table", table=key) as sp:
+                digest = _input_hash(stage, key, payload, inputs)
+                value = kind = None
+                if self.state is not None:
+                    value = self.state.checkpoint(stage.name, key, digest)
+                    kind = "resumed" if value is not None else None
+                    if value is None and stage.cache:
+                        value = self.state.cached(stage.name, digest)
+                        kind = "cached" if value is not None else None
+                if value is None:
+                    value = stage.fn(key, payload, inputs)
+                    if self.state is not None and stage.cache and (stage.cacheable is None or stage.cacheable(value)):
+                        self.state.save_cache(stage.name, digest, value)
+                else:
+                    sp.set(result=kind)
+                if self.state is not None and kind != "resumed":
+                    self.state.save_checkpoint(stage.name, key, digest, value)
+            with lock:
+                results[stage.name][key] = value
+                stats[stage.name]["tasks"] += 1
+                stats[stage.name]["busy_s"] += time.perf_counter() - t0
+                if kind:
+                    stats[stage.name][kind] += 1
+
+        def worker(stage):
+            q = queues[stage.name]
+            while True:
+                key = q.get()
+                if key is None:
+                    if stage.on_exit is not None:
+                        stage.on_exit()
+                    return
+                try:
+                    execute(stage, key)
+                except Exception as e:
+                    with lock:
+                        errors[stage.name][key] = f"{type(e).__name__}: {e}"
+                    finish([(stage.name, key)] + [(name, key) for name in downstream_of(stage.name)])
+                    continue
+                for nxt in claim_ready(stage.name, key):
+                    queues[nxt.name].put(key)
+                finish([(stage.name, key)])
+
+        threads = [
+            threading.Thread(target=worker, args=(s,), name=f"{s.name}-{i}", daemon=True)
+            for s in self.stages.values()
+            for i in range(s.workers)
+        ]
+        for t in threads:
+            t.start()
+        for key in items:
+            for stage in self.roots:
+                queues[stage.name].put(key)
+        all_done.wait()
+        for s in self.stages.values():
+            for _ in range(s.workers):
+                queues[s.name].put(None)
+        for t in threads:
+            t.join()
+
+        for s in stats.values():
+            s["busy_s"] = round(s["busy_s"], 3)
+        return {
+            "results": results,
+            "errors": {k: v for k, v in errors.items() if v},
+            "stats": stats,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+def format_stats(report):
+    lines = [f"DAG run: {report['seconds']:.2f}s wall"]
+    for name, s in report["stats"].items():
+        extra = ", ".join(f"{s[k]} {k}" for k in ("cached", "resumed") if s[k])
+        lines.append(
+            f"  {name}: {s['tasks']} tasks, {s['busy_s']:.2f}s busy" + (f" ({extra})" if extra else "")
+        )
+    for name, errs in report["errors"].items():
+        for key, message in errs.items():
+            lines.append(f"  {name} failed for {key}: {message}")
+    return "\n".join(lines)
@@ -1,9 +1,14 @@
 """
 Database connector: SQLite (default), PostgreSQL, SQL Server.
-Returns a connection object for metadata extraction and profiling.
+Returns a connection object for metadata extraction and profiling, and a small
+pool for callers that run many short queries (chat, NL→SQL).
 """
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from config import DB_TYPE, DB_PATH, POSTGRES_URI, SQLSERVER_URI
+from tracing import traced_connection
 
 
 def get_connection():
@@ -11,12 +16,12 @@ def get_connection():
     if DB_TYPE == "sqlite":
         conn = sqlite3.connect(DB_PATH)
         conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        return traced_connection(conn)
     if DB_TYPE == "postgres":
         try:
             import psycopg2
             uri = POSTGRES_URI or "postgresql://localhost/demo"
-            return psycopg2.connect(uri)
+            return traced_connection(psycopg2.connect(uri))
         except ImportError:
             raise RuntimeError(
                 "PostgreSQL support requires: pip install psycopg2-binary. "
@@ -28,7 +33,7 @@ def get_connection():
             conn_str = SQLSERVER_URI
             if not conn_str:
                 raise ValueError("Set SQLSERVER_URI in .env for SQL Server.")
-            return pyodbc.connect(conn_str)
+            return traced_connection(pyodbc.connect(conn_str))
         except ImportError:
             raise RuntimeError(
                 "SQL Server support requires: pip install pyodbc. "
@@ -40,3 +45,65 @@ def get_connection():
 def get_cursor(conn):
     """Return a cursor. For SQLite/psycopg2 it's conn.cursor(). For pyodbc, conn.cursor()."""
     return conn.cursor()
+
+
+def _file_identity(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+class ConnectionPool:
+    """
+    Idle connections to one database file, each handed to one caller at a time.
+    Connections opened before the file was replaced (e.g. catalog.db rebuilt by
+    the pipeline) are dropped instead of reused. max_idle=0 disables reuse:
+    every caller gets a fresh connection that is closed afterwards.
+    connect() must allow use from any thread (sqlite3: check_same_thread=False).
+    """
+
+    def __init__(self, path, connect, max_idle=8):
+        self.path = path
+        self.connect = connect
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """Yield a connection (None if connect() returned None) and return it to the pool afterwards."""
+        identity = _file_identity(self.path)
+        conn = None
+        with self._lock:
+            while self._idle and conn is None:
+                candidate, candidate_identity = self._idle.pop()
+                if candidate_identity == identity:
+                    conn = candidate
+                else:
+                    candidate.close()
+        if conn is None:
+            conn = self.connect()
+        try:
+            yield conn
+        except BaseException:
+            if conn is not None:
+                conn.close()
+            raise
+        if conn is None:
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle and identity is not None:
+                self._idle.append((conn, identity))
+                return
+        conn.close()
+
+    def clear(self, max_idle=None):
+        """Close idle connections (and optionally change max_idle)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            if max_idle is not None:
+                self.max_idle = max_idle
+        for conn, _ in idle:
+            conn.close()
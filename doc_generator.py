@@ -1,14 +1,41 @@
 """
 Generate documentation: Markdown data dictionary from metadata, profiles, and summaries.
+
+render_docs() writes one page per table plus an index under artifacts/docs/,
+re-rendering only the pages whose inputs changed (tracked by hash in
+docs/manifest.json). The single-file data_dictionary.md is streamed to disk.
+render_site() does the same as a static HTML site with a prebuilt, sharded
+client-side search index and relationship graphs drawn with lib/vis-9.1.2.
 """
+import hashlib
+import html
+import json
+import re
+import shutil
+import time
 from pathlib import Path
-from config import ARTIFACTS_DIR
+from config import ARTIFACTS_DIR, ARTIFACT_STORE_DIR, DOCS_DIR, PROJECT_ROOT, SITE_DIR
+from storage import ArtifactStore, atomic_writer, load_json, save_json
+from tracing import span
 
+# Bump when the page layout changes so every page is re-rendered once
+DOCS_FORMAT_VERSION = 1
+# Above this many tables the pipeline skips the single-file dictionary (use docs/index.md)
+DATA_DICTIONARY_MAX_TABLES = 500
+SITE_FORMAT_VERSION = 1
+# The site index page draws the whole relationship graph only up to this many tables
+SITE_GRAPH_MAX_TABLES = 300
+# Search scores by where a term occurs (as in the catalog's FTS ranking)
+SEARCH_WEIGHTS = {"table": 5, "column": 3, "summary": 1}
+# Prefix shards with more postings than this are split by the first three characters
+SEARCH_SHARD_MAX_POSTINGS = 4000
+_STOPWORDS = frozenset(
+    "the and for with this that are from each its into has have was were which table data "
+    "can may not but all any per use used".split()
+)
 
-def build_markdown(metadata, profiles, summaries):
-    """Build a single Markdown document and per-table snippets."""
-    tables = metadata.get("tables", metadata)
-    rels = metadata.get("relationships", [])
+
+def _header_lines(rels):
     lines = [
         "# Data Dictionary",
         "",
@@ -23,46 +50,61 @@ def build_markdown(metadata, profiles, summaries):
     else:
         lines.append("- No foreign key relationships extracted.")
     lines.extend(["", "---", ""])
+    return lines
 
-    for table_name, columns in tables.items():
-        profile = profiles.get(table_name, {})
-        summary_block = summaries.get(table_name, {})
-        summary = summary_block.get("summary", "") if isinstance(summary_block, dict) else ""
-        recs = summary_block.get("recommendations", []) if isinstance(summary_block, dict) else []
 
-        lines.append(f"## Table: `{table_name}`")
-        lines.append("")
-        if summary:
-            lines.append(summary)
-            lines.append("")
-        lines.append("### Columns")
-        lines.append("")
-        lines.append("| Column | Type | Nullable | PK | Completeness | Unique |")
-        lines.append("|--------|------|----------|-----|--------------|--------|")
-        col_stats = profile.get("columns", {})
-        for c in columns:
-            cn = c.get("column_name", c)
-            typ = c.get("data_type", "")
-            null = "YES" if c.get("nullable") else "NO"
-            pk = "✓" if c.get("primary_key") else ""
-            st = col_stats.get(cn, {})
-            comp = st.get("completeness_pct", "")
-            uniq = st.get("unique_count", "")
-            lines.append(f"| {cn} | {typ} | {null} | {pk} | {comp} | {uniq} |")
-        lines.append("")
-        if profile.get("total_rows") is not None:
-            lines.append(f"**Total rows:** {profile['total_rows']}")
-        kh = profile.get("key_health", {})
-        if kh:
-            lines.append(f"**Key health:** null_pks={kh.get('null_pks', 0)}, duplicate_pks={kh.get('duplicate_pks', 0)}")
-        if recs:
-            lines.append("**Recommendations:**")
-            for r in recs:
-                lines.append(f"- {r}")
-        lines.append("")
-        lines.append("---")
+def _table_lines(table_name, columns, profile, summary_block):
+    summary = summary_block.get("summary", "") if isinstance(summary_block, dict) else ""
+    recs = summary_block.get("recommendations", []) if isinstance(summary_block, dict) else []
+
+    lines = [f"## Table: `{table_name}`", ""]
+    if summary:
+        lines.append(summary)
         lines.append("")
+    lines.append("### Columns")
+    lines.append("")
+    lines.append("| Column | Type | Nullable | PK | Completeness | Unique |")
+    lines.append("|--------|------|----------|-----|--------------|--------|")
+    col_stats = profile.get("columns", {})
+    for c in columns:
+        cn = c.get("column_name", c)
+        typ = c.get("data_type", "")
+        null = "YES" if c.get("nullable") else "NO"
+        pk = "✓" if c.get("primary_key") else ""
+        st = col_stats.get(cn, {})
+        comp = st.get("completeness_pct", "")
+        uniq = st.get("unique_count", "")
+        lines.append(f"| {cn} | {typ} | {null} | {pk} | {comp} | {uniq} |")
+    lines.append("")
+    if profile.get("total_rows") is not None:
+        lines.append(f"**Total rows:** {profile['total_rows']}")
+    kh = profile.get("key_health", {})
+    if kh:
+        lines.append(f"**Key health:** null_pks={kh.get('null_pks', 0)}, duplicate_pks={kh.get('duplicate_pks', 0)}")
+    if recs:
+        lines.append("**Recommendations:**")
+        for r in recs:
+            lines.append(f"- {r}")
+    lines.append("")
+    lines.append("---")
+    lines.append("")
+    return lines
 
+
+def build_markdown(metadata, profiles, summaries):
+    """Build a single Markdown document and per-table snippets."""
+    tables = metadata.get("tables", metadata)
+    lines = _header_lines(metadata.get("relationships", []))
+    for table_name, columns in tables.items():
+        lines.extend(_table_lines(table_name, columns, profiles.get(table_name, {}), summaries.get(table_name, {})))
+    return "\n".join(lines)
+
+
+def build_markdown_from_catalog(catalog):
+    """Same document as build_markdown, read table by table from a catalog_db.Catalog."""
+    lines = _header_lines(catalog.relationships())
+    for table_name, columns, profile, summary in catalog.iter_tables():
+        lines.extend(_table_lines(table_name, columns, profile, summary))
     return "\n".join(lines)
 
 
@@ -74,3 +116,408 @@ def run_and_save(metadata, profiles, summaries):
     path.write_text(md, encoding="utf-8")
     print(f"Saved {path}")
     return path
+
+
+def run_and_save_from_catalog(catalog):
+    """Stream the data dictionary from the catalog database to artifacts/data_dictionary.md, one table at a time."""
+    path = ARTIFACTS_DIR / "data_dictionary.md"
+    with atomic_writer(path) as f:
+        lines = _header_lines(catalog.relationships())
+        f.write("\n".join(lines))
+        for table_name, columns, profile, summary in catalog.iter_tables():
+            f.write("\n" + "\n".join(_table_lines(table_name, columns, profile, summary)))
+    print(f"Saved {path}")
+    return path
+
+
+# --------------------------------------------------
+# Incremental per-table pages
+# --------------------------------------------------
+
+def page_name(table_name, suffix=".md"):
+    """File name for a table's page; names that are not filesystem-safe get a hash suffix."""
+    slug = re.sub(r"[^\w.-]", "_", table_name)
+    if slug != table_name:
+        slug += "-" + hashlib.sha1(table_name.encode("utf-8")).hexdigest()[:8]
+    return slug + suffix
+
+
+def _page_lines(table_name, columns, profile, summary_block, rels):
+    lines = ["[← Data dictionary](../index.md)", ""]
+    lines.extend(_table_lines(table_name, columns, profile, summary_block)[:-2])
+    lines.append("### Relationships")
+    lines.append("")
+    if rels:
+        for r in rels:
+            other = r.get("ref_table") if r.get("table") == table_name else r.get("table")
+            lines.append(
+                f"- `{r.get('table')}.{r.get('column')}` → `{r.get('ref_table')}.{r.get('ref_column')}` "
+                f"([{other}]({page_name(other)}))"
+            )
+    else:
+        lines.append("- None.")
+    lines.append("")
+    return lines
+
+
+def _index_lines(entries, n_rels):
+    yield "# Data Dictionary"
+    yield ""
+    yield "## Overview"
+    yield "This document describes the database schema, data quality metrics, and business context."
+    yield f"{len(entries)} tables, {n_rels} relationships. Each table has its own page."
+    yield ""
+    yield "| Table | Columns | Rows |"
+    yield "|-------|---------|------|"
+    for name, entry in entries.items():
+        rows = entry.get("rows")
+        yield f"| [{name}](tables/{entry['page']}) | {entry.get('columns', '')} | {'' if rows is None else rows} |"
+    yield ""
+
+
+def _digest(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _relationships_by_table(relationships):
+    by_table = {}
+    for r in relationships:
+        by_table.setdefault(r.get("table"), []).append(r)
+        if r.get("ref_table") != r.get("table"):
+            by_table.setdefault(r.get("ref_table"), []).append(r)
+    return by_table
+
+
+def _render_pages(store, out_dir, version, suffix, write_page, force=False):
+    """
+    Shared incremental loop of render_docs / render_site. Calls write_page(f, name, shard, rels)
+    for each table whose input hash changed and deletes pages of dropped tables.
+    Returns (index, pages, old_manifest, rendered_names, removed_names).
+    """
+    manifest_path = out_dir / "manifest.json"
+    manifest = load_json(manifest_path) if manifest_path.exists() and not force else {}
+    if manifest.get("version") != version:
+        manifest = {}
+    old_pages = manifest.get("tables", {})
+
+    index = store.index()
+    rels_by_table = _relationships_by_table(index["relationships"])
+    pages = {}
+    rendered = []
+    for name, entry in index["tables"].items():
+        rels = rels_by_table.get(name, [])
+        digest = _digest(entry["shard"], rels, version)
+        page = page_name(name, suffix)
+        path = out_dir / "tables" / page
+        pages[name] = {"page": page, "hash": digest, "columns": entry.get("columns"), "rows": entry.get("rows")}
+        if old_pages.get(name, {}).get("hash") == digest and path.exists():
+            continue
+        with span("page", cat="docs", table=name, format=suffix), atomic_writer(path) as f:
+            write_page(f, name, store.table(name), rels)
+        rendered.append(name)
+
+    removed = [name for name in old_pages if name not in pages]
+    for name in removed:
+        (out_dir / "tables" / old_pages[name]["page"]).unlink(missing_ok=True)
+    return index, pages, manifest, rendered, removed
+
+
+def render_docs(store=None, out_dir=None, force=False):
+    """
+    Write out_dir/tables/<table>.md per table and out_dir/index.md from the artifact store.
+
+    A page's input hash covers its shard (metadata + profile + summary, already
+    content-addressed by the store) and its relationships; pages whose hash
+    matches docs/manifest.json are skipped without reading the shard. Pages of
+    dropped tables are deleted. Returns {"rendered", "unchanged", "removed", "index", "seconds"}.
+    """
+    started = time.perf_counter()
+    store = store or ArtifactStore(ARTIFACT_STORE_DIR)
+    out_dir = Path(out_dir or DOCS_DIR)
+
+    def write_page(f, name, shard, rels):
+        for line in _page_lines(name, shard["metadata"], shard["profile"] or {}, shard["summary"] or {}, rels):
+            f.write(line + "\n")
+
+    index, pages, manifest, rendered, removed = _render_pages(
+        store, out_dir, DOCS_FORMAT_VERSION, ".md", write_page, force
+    )
+    index_hash = _digest([(n, e["page"], e["columns"], e["rows"]) for n, e in pages.items()], len(index["relationships"]))
+    index_rebuilt = index_hash != manifest.get("index_hash") or not (out_dir / "index.md").exists()
+    if index_rebuilt:
+        with atomic_writer(out_dir / "index.md") as f:
+            for line in _index_lines(pages, len(index["relationships"])):
+                f.write(line + "\n")
+    save_json({"version": DOCS_FORMAT_VERSION, "index_hash": index_hash, "tables": pages}, out_dir / "manifest.json")
+    return {
+        "rendered": len(rendered),
+        "unchanged": len(pages) - len(rendered),
+        "removed": len(removed),
+        "index": index_rebuilt,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# --------------------------------------------------
+# Static HTML site
+# --------------------------------------------------
+
+def _search_terms(text):
+    """Lowercase terms of an identifier or sentence, split on non-alphanumerics and camelCase."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    return {w.lower() for w in re.findall(r"[A-Za-z0-9]+", text) if len(w) > 1}
+
+
+def _search_postings(table_name, shard):
+    """[[term, column, weight]] for one table; column "" means the table itself."""
+    best = {}
+
+    def add(terms, column, weight):
+        for term in terms:
+            if best.get((term, column), 0) < weight:
+                best[(term, column)] = weight
+
+    add(_search_terms(table_name), "", SEARCH_WEIGHTS["table"])
+    for c in shard["metadata"]:
+        column = c.get("column_name", "")
+        add(_search_terms(column), column, SEARCH_WEIGHTS["column"])
+    summary = (shard["summary"] or {}).get("summary", "")
+    add({t for t in _search_terms(summary) if len(t) > 2 and t not in _STOPWORDS}, "", SEARCH_WEIGHTS["summary"])
+    return [[term, column, weight] for (term, column), weight in best.items()]
+
+
+def _esc(value):
+    return html.escape("" if value is None else str(value))
+
+
+def _html_head(title, root):
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\"/>\n"
+        f"<title>{_esc(title)}</title>\n"
+        f"<link rel=\"stylesheet\" href=\"{root}lib/site/site.css\"/>\n"
+        f"<link rel=\"stylesheet\" href=\"{root}lib/vis-9.1.2/vis-network.css\"/>\n"
+        "</head>\n<body>\n<header>\n"
+        f"<a class=\"home\" href=\"{root}index.html\">Data Dictionary</a>\n"
+        "<div class=\"search\"><input id=\"search\" type=\"search\" placeholder=\"Search tables, columns, summaries…\" "
+        "autocomplete=\"off\"/><ul id=\"search-results\"></ul></div>\n</header>\n<main>\n"
+    )
+
+
+def _html_tail(root, graph):
+    parts = ["</main>\n"]
+    if graph is not None:
+        parts.append(f"<script src=\"{root}lib/vis-9.1.2/vis-network.min.js\"></script>\n")
+        parts.append("<script>window.GRAPH = " + json.dumps(graph).replace("</", "<\\/") + ";</script>\n")
+        parts.append(f"<script src=\"{root}lib/site/graph.js\"></script>\n")
+    parts.append(f"<script src=\"{root}lib/site/search.js\" data-root=\"{root}\"></script>\n</body>\n</html>\n")
+    return "".join(parts)
+
+
+def _graph(rels, url_for):
+    """vis-network nodes/edges for relationships; url_for(table) links each node to its page."""
+    nodes, edges = {}, []
+    for r in rels:
+        for t in (r.get("table"), r.get("ref_table")):
+            if t not in nodes:
+                nodes[t] = {"id": t, "label": t, "url": url_for(t)}
+        edges.append({"from": r.get("table"), "to": r.get("ref_table"), "label": r.get("column") or ""})
+    return {"nodes": list(nodes.values()), "edges": edges}
+
+
+def _write_table_html(f, table_name, shard, rels):
+    columns, profile, summary_block = shard["metadata"], shard["profile"] or {}, shard["summary"] or {}
+    f.write(_html_head(f"{table_name} · Data Dictionary", "../"))
+    f.write(f"<h1><code>{_esc(table_name)}</code></h1>\n")
+    if summary_block.get("summary"):
+        f.write(f"<p>{_esc(summary_block['summary'])}</p>\n")
+    stats = []
+    if profile.get("total_rows") is not None:
+        stats.append(f"<b>Total rows:</b> {profile['total_rows']:,}")
+    kh = profile.get("key_health") or {}
+    if kh:
+        stats.append(f"<b>Key health:</b> null_pks={kh.get('null_pks', 0)}, duplicate_pks={kh.get('duplicate_pks', 0)}")
+    if stats:
+        f.write(f"<p class=\"muted\">{' · '.join(stats)}</p>\n")
+    f.write("<h2>Columns</h2>\n<table>\n<tr><th>Column</th><th>Type</th><th>Nullable</th><th>PK</th>"
+            "<th>Completeness</th><th>Unique</th></tr>\n")
+    col_stats = profile.get("columns") or {}
+    for c in columns:
+        name = c.get("column_name", "")
+        st = col_stats.get(name, {})
+        f.write(
+            f"<tr id=\"col-{_esc(name)}\"><td><code>{_esc(name)}</code></td><td>{_esc(c.get('data_type'))}</td>"
+            f"<td>{'YES' if c.get('nullable') else 'NO'}</td><td>{'✓' if c.get('primary_key') else ''}</td>"
+            f"<td class=\"num\">{_esc(st.get('completeness_pct', ''))}</td>"
+            f"<td class=\"num\">{_esc(st.get('unique_count', ''))}</td></tr>\n"
+        )
+    f.write("</table>\n")
+    recs = summary_block.get("recommendations") or []
+    if recs:
+        f.write("<h2>Recommendations</h2>\n<ul>\n")
+        f.writelines(f"<li>{_esc(r)}</li>\n" for r in recs)
+        f.write("</ul>\n")
+    f.write("<h2>Relationships</h2>\n")
+    if rels:
+        f.write("<ul>\n")
+        for r in rels:
+            other = r.get("ref_table") if r.get("table") == table_name else r.get("table")
+            f.write(
+                f"<li><code>{_esc(r.get('table'))}.{_esc(r.get('column'))}</code> → "
+                f"<code>{_esc(r.get('ref_table'))}.{_esc(r.get('ref_column'))}</code> "
+                f"(<a href=\"{_esc(page_name(other, '.html'))}\">{_esc(other)}</a>)</li>\n"
+            )
+        f.write("</ul>\n<div id=\"graph\" class=\"graph\"></div>\n")
+        f.write(_html_tail("../", _graph(rels, lambda t: page_name(t, ".html"))))
+    else:
+        f.write("<p class=\"muted\">None.</p>\n")
+        f.write(_html_tail("../", None))
+
+
+def _write_site_index(f, pages, relationships):
+    f.write(_html_head("Data Dictionary", ""))
+    f.write("<h1>Data Dictionary</h1>\n")
+    f.write(
+        "<p class=\"muted\">This document describes the database schema, data quality metrics, and business context. "
+        f"{len(pages):,} tables, {len(relationships):,} relationships.</p>\n"
+    )
+    graph = None
+    if relationships and len(pages) <= SITE_GRAPH_MAX_TABLES:
+        f.write("<h2>Relationships</h2>\n<div id=\"graph\" class=\"graph\"></div>\n")
+        graph = _graph(relationships, lambda t: "tables/" + page_name(t, ".html"))
+    f.write("<h2>Tables</h2>\n<table>\n<tr><th>Table</th><th>Columns</th><th>Rows</th></tr>\n")
+    for name, entry in pages.items():
+        rows = entry.get("rows")
+        f.write(
+            f"<tr><td><a href=\"tables/{_esc(entry['page'])}\"><code>{_esc(name)}</code></a></td>"
+            f"<td class=\"num\">{_esc(entry.get('columns'))}</td>"
+            f"<td class=\"num\">{'' if rows is None else f'{rows:,}'}</td></tr>\n"
+        )
+    f.write("</table>\n")
+    f.write(_html_tail("", graph))
+
+
+def _copy_assets(out_dir):
+    """Copy the bundled lib/ assets (vis-network + site scripts) when missing or changed."""
+    copied = 0
+    for sub in ("vis-9.1.2", "site"):
+        src_dir = PROJECT_ROOT / "lib" / sub
+        if not src_dir.exists():
+            continue
+        for src in src_dir.iterdir():
+            dst = out_dir / "lib" / sub / src.name
+            if not dst.exists() or dst.stat().st_size != src.stat().st_size or dst.stat().st_mtime < src.stat().st_mtime:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dst)
+                copied += 1
+    return copied
+
+
+def _write_if_changed(path, text, old_hash):
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    if digest != old_hash or not path.exists():
+        with atomic_writer(path) as f:
+            f.write(text)
+    return digest
+
+
+def render_site(store=None, out_dir=None, force=False):
+    """
+    Write a static HTML site (index.html + tables/<table>.html) from the artifact store.
+
+    Pages are re-rendered incrementally like render_docs(). The search index is
+    built from per-table postings cached in search/postings.json (recomputed only
+    for changed tables) and split into search/<xx>.js shards by the first two
+    characters of each term (three for crowded prefixes); the browser loads search/meta.js and the shards it
+    needs via <script> tags, so search works from file:// without a server.
+    Only shards whose content changed are rewritten.
+    Returns {"rendered", "unchanged", "removed", "index", "shards_written", "seconds"}.
+    """
+    started = time.perf_counter()
+    store = store or ArtifactStore(ARTIFACT_STORE_DIR)
+    out_dir = Path(out_dir or SITE_DIR)
+    _copy_assets(out_dir)
+
+    index, pages, manifest, rendered, removed = _render_pages(
+        store, out_dir, SITE_FORMAT_VERSION, ".html", _write_table_html, force
+    )
+
+    index_hash = _digest(
+        [(n, e["page"], e["columns"], e["rows"]) for n, e in pages.items()],
+        index["relationships"] if len(pages) <= SITE_GRAPH_MAX_TABLES else len(index["relationships"]),
+    )
+    index_rebuilt = index_hash != manifest.get("index_hash") or not (out_dir / "index.html").exists()
+    if index_rebuilt:
+        with atomic_writer(out_dir / "index.html") as f:
+            _write_site_index(f, pages, index["relationships"])
+
+    # Search index: cached postings per table, regrouped into prefix shards
+    search_dir = out_dir / "search"
+    postings_path = search_dir / "postings.json"
+    cached = load_json(postings_path) if manifest and postings_path.exists() else {}
+    postings = {}
+    for name, entry in pages.items():
+        hit = cached.get(name)
+        if hit and hit[0] == entry["hash"]:
+            postings[name] = hit
+        else:
+            postings[name] = [entry["hash"], _search_postings(name, store.table(name))]
+    shards = {}
+    for name, (_, table_postings) in postings.items():
+        for term, column, weight in table_postings:
+            shards.setdefault(term[:2], {}).setdefault(term, []).append([name, column, weight])
+    for key in [k for k, terms in shards.items() if sum(len(v) for v in terms.values()) > SEARCH_SHARD_MAX_POSTINGS]:
+        # Split crowded prefixes one character further; two-character terms keep the short key
+        for term, hits in shards.pop(key).items():
+            shards.setdefault(term[:3], {})[term] = hits
+
+    old_shards = manifest.get("shards", {})
+    shard_hashes = {}
+    written = 0
+    for key in sorted(shards):
+        text = f"__searchShard({json.dumps(key)},{json.dumps(shards[key], separators=(',', ':'))});\n"
+        shard_hashes[key] = _write_if_changed(search_dir / f"{key}.js", text, old_shards.get(key))
+        written += shard_hashes[key] != old_shards.get(key)
+    for key in old_shards:
+        if key not in shards:
+            (search_dir / f"{key}.js").unlink(missing_ok=True)
+    meta = {"keys": sorted(shards), "pages": {n: e["page"] for n, e in pages.items()}}
+    meta_hash = _write_if_changed(
+        search_dir / "meta.js",
+        f"__searchMeta({json.dumps(meta, separators=(',', ':'))});\n",
+        manifest.get("meta_hash"),
+    )
+    if rendered or removed or not postings_path.exists():
+        save_json(postings, postings_path)
+
+    save_json(
+        {
+            "version": SITE_FORMAT_VERSION,
+            "index_hash": index_hash,
+            "meta_hash": meta_hash,
+            "shards": shard_hashes,
+            "tables": pages,
+        },
+        out_dir / "manifest.json",
+    )
+    return {
+        "rendered": len(rendered),
+        "unchanged": len(pages) - len(rendered),
+        "removed": len(removed),
+        "index": index_rebuilt,
+        "shards_written": written,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render per-table Markdown pages (or the HTML site) from the artifact store.")
+    parser.add_argument("--force", action="store_true", help="Re-render every page")
+    parser.add_argument("--site", action="store_true", help="Render the static HTML site instead (artifacts/site/)")
+    args = parser.parse_args()
+    report = (render_site if args.site else render_docs)(force=args.force)
+    print(
+        f"{'Site' if args.site else 'Docs'}: {report['rendered']} pages rendered, {report['unchanged']} unchanged, "
+        f"{report['removed']} removed in {report['seconds']:.2f}s"
+    )
@@ -0,0 +1,335 @@
+"""
+ER diagram layout for large schemas.
+
+Tables are placed in layers by foreign-key dependency: referenced tables on the
+left, referencing tables to their right. FK cycles (a table pair referencing
+each other, or longer loops) are collapsed into strongly connected components
+first (iterative Tarjan), which also yields the components in topological
+order, so longest-path layering is a single pass: O(V + E) overall. Within a
+layer, tables are ordered by the mean row of the tables they reference (one
+barycenter sweep), which keeps most edges short.
+
+Level of detail: a schema with more than max_nodes tables is shown as clusters,
+one per database schema when table names are qualified ("sales.orders"),
+otherwise one per connected component. Components larger than max_nodes are
+cut into breadth-first slices and small components are packed together, so
+no view ever has more than max_nodes nodes. Expanding a cluster or focusing a
+table (ErLayout.view) returns just that subgraph, placed with the global layers
+so the orientation stays the same between views.
+
+Layouts are cached per schema fingerprint (table names and relationships), so a
+refresh that only changed data reuses the previous layout.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import ER_MAX_NODES
+
+X_GAP, Y_GAP = 480, 380
+CLUSTER_X_GAP, CLUSTER_Y_GAP = 420, 220
+# Layouts kept in memory (one per schema fingerprint)
+LAYOUT_CACHE_SIZE = 4
+
+
+def layer_graph(nodes, refs):
+    """
+    Longest-path layers of a directed graph given as {node: [referenced nodes]}.
+    Nodes on a cycle share a layer. Returns ({node: layer}, {node: row within layer}).
+    """
+    index, low, component = {}, {}, {}
+    stack, on_stack = [], set()
+    order = []  # strongly connected components, referenced ones first
+    counter = 0
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(refs.get(root, ())))]
+        while work:
+            node, targets = work[-1]
+            descended = False
+            for target in targets:
+                if target not in index:
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(refs.get(target, ()))))
+                    descended = True
+                    break
+                if target in on_stack:
+                    low[node] = min(low[node], index[target])
+            if descended:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = len(order)
+                    members.append(member)
+                    if member == node:
+                        break
+                order.append(members)
+
+    # Tarjan emits a component only after everything it references: one pass layers them
+    component_layer = []
+    for c, members in enumerate(order):
+        lv = 0
+        for member in members:
+            for target in refs.get(member, ()):
+                if component[target] != c:
+                    lv = max(lv, component_layer[component[target]] + 1)
+        component_layer.append(lv)
+    layer = {n: component_layer[component[n]] for n in nodes}
+
+    by_layer = {}
+    for n in nodes:
+        by_layer.setdefault(layer[n], []).append(n)
+    row = {}
+    for lv in sorted(by_layer):
+        def barycenter(n):
+            placed = [row[t] for t in refs.get(n, ()) if t in row]
+            return sum(placed) / len(placed) if placed else -1.0
+        members = sorted(by_layer[lv], key=lambda n: (barycenter(n), str(n)))
+        for r, n in enumerate(members):
+            row[n] = r
+    return layer, row
+
+
+def _place(nodes, layer, row, x_gap, y_gap):
+    """{node: (x, y)} for a subset: global layers as columns, global row order compacted."""
+    by_layer = {}
+    for n in nodes:
+        by_layer.setdefault(layer[n], []).append(n)
+    positions = {}
+    for lv, members in by_layer.items():
+        members.sort(key=row.__getitem__)
+        for r, n in enumerate(members):
+            positions[n] = (180 + lv * x_gap, 180 + r * y_gap)
+    return positions
+
+
+class ErLayout:
+    """Layers, clusters and adjacency of one schema; views are built from it on demand."""
+
+    def __init__(self, table_names, relationships, max_nodes=ER_MAX_NODES):
+        self.max_nodes = max(2, int(max_nodes))
+        self.tables = list(table_names)
+        known = set(self.tables)
+        # (index into relationships, from table, to table) for edges between known tables
+        self.edges = []
+        self.edges_of = {t: [] for t in self.tables}
+        self.neighbors = {t: set() for t in self.tables}
+        refs = {t: [] for t in self.tables}
+        for i, r in enumerate(relationships):
+            fr, to = r.get("table"), r.get("ref_table")
+            if fr not in known or to not in known:
+                continue
+            self.edges.append((i, fr, to))
+            self.edges_of[fr].append(len(self.edges) - 1)
+            if to != fr:
+                self.edges_of[to].append(len(self.edges) - 1)
+                self.neighbors[fr].add(to)
+                self.neighbors[to].add(fr)
+                refs[fr].append(to)
+        self.layer, self.row = layer_graph(self.tables, refs)
+        self._build_clusters()
+
+    # --------------------------------------------------
+    # Clusters
+    # --------------------------------------------------
+
+    def _units(self):
+        """Schema name -> tables if names are schema-qualified, else connected components."""
+        schemas = {t.rpartition(".")[0] for t in self.tables}
+        if "" not in schemas and len(schemas) > 1:
+            units = {}
+            for t in self.tables:
+                units.setdefault(t.rpartition(".")[0], []).append(t)
+            return "schema", list(units.items())
+        seen, units = set(), []
+        for start in self.tables:
+            if start in seen:
+                continue
+            seen.add(start)
+            members, queue = [], [start]
+            while queue:
+                t = queue.pop()
+                members.append(t)
+                for n in self.neighbors[t]:
+                    if n not in seen:
+                        seen.add(n)
+                        queue.append(n)
+            units.append((None, members))
+        return "component", units
+
+    def _hub(self, members):
+        """Most connected table (alphabetically first on ties), used to name a group."""
+        return min(members, key=lambda t: (-len(self.neighbors[t]), t))
+
+    def _breadth_first(self, members):
+        """Members in breadth-first order from the hub, so consecutive slices are mostly connected."""
+        inside = set(members)
+        start = self._hub(members)
+        seen, ordered = {start}, [start]
+        for t in ordered:
+            for n in sorted(self.neighbors[t]):
+                if n in inside and n not in seen:
+                    seen.add(n)
+                    ordered.append(n)
+        # Schema units need not be connected
+        ordered += [t for t in members if t not in seen]
+        return ordered
+
+    def _build_clusters(self):
+        """self.clusters: [{"label", "tables"}]; self.cluster_of: table -> cluster index."""
+        mode, units = self._units()
+        self.mode = mode
+        clusters, small = [], []
+        limit = self.max_nodes
+        for name, members in units:
+            if len(members) > limit:
+                ordered = self._breadth_first(members)
+                hub = name or f"{self._hub(members)} group"
+                parts = (len(ordered) + limit - 1) // limit
+                for p in range(parts):
+                    chunk = ordered[p * limit:(p + 1) * limit]
+                    clusters.append({
+                        "label": f"{hub} · part {p + 1}/{parts}",
+                        "detail": f"around {chunk[0]}",
+                        "tables": chunk,
+                    })
+            elif mode == "schema":
+                clusters.append({"label": name, "detail": "", "tables": members})
+            else:
+                small.append(members)
+        # Pack whole components, largest first, into clusters of at most max_nodes tables
+        small.sort(key=len, reverse=True)
+        packed = []
+        for members in small:
+            if packed and len(packed[-1][1]) + len(members) <= limit:
+                packed[-1][0].append(members)
+                packed[-1][1].extend(members)
+            else:
+                packed.append(([members], list(members)))
+        for groups, members in packed:
+            if len(groups) == 1:
+                label = f"{self._hub(members)} group" if len(members) > 1 else members[0]
+                detail = ""
+            else:
+                singles = sum(1 for g in groups if len(g) == 1)
+                label = f"{len(groups)} groups ({self._hub(groups[0])}, …)"
+                detail = f"{singles} unrelated tables" if singles else ""
+            clusters.append({"label": label, "detail": detail, "tables": members})
+        self.clusters = clusters
+        self.cluster_of = {t: c for c, cluster in enumerate(clusters) for t in cluster["tables"]}
+
+        counts = {}
+        for _, fr, to in self.edges:
+            a, b = self.cluster_of[fr], self.cluster_of[to]
+            if a != b:
+                counts[(a, b)] = counts.get((a, b), 0) + 1
+        self.cluster_edges = counts
+        cluster_refs = {c: [] for c in range(len(clusters))}
+        for a, b in counts:
+            cluster_refs[a].append(b)
+        self.cluster_layer, self.cluster_row = layer_graph(list(range(len(clusters))), cluster_refs)
+
+    # --------------------------------------------------
+    # Views
+    # --------------------------------------------------
+
+    def _edges_within(self, shown):
+        found = set()
+        for t in shown:
+            for e in self.edges_of[t]:
+                _, fr, to = self.edges[e]
+                if fr in shown and to in shown:
+                    found.add(e)
+        return [self.edges[e][0] for e in sorted(found)]
+
+    def _tables_view(self, tables, title):
+        shown = set(tables)
+        return {
+            "title": title,
+            "tables": _place(tables, self.layer, self.row, X_GAP, Y_GAP),
+            "relationships": self._edges_within(shown),
+            "clusters": {},
+            "cluster_edges": [],
+            "complete": len(shown) == len(self.tables),
+        }
+
+    def view(self, kind="overview", target=None):
+        """
+        Subgraph to draw: {"title", "tables": {name: (x, y)}, "relationships": [index into
+        relationships], "clusters": {index: (x, y)}, "cluster_edges": [(from, to, count)],
+        "complete": all tables shown}. kind is "overview", "cluster" (target = cluster index)
+        or "table" (target = table name; the table and its neighbours). None if target is unknown.
+        """
+        if kind == "table":
+            if target not in self.neighbors:
+                return None
+            # Busiest neighbours first when a hub has more than fit in one view
+            ranked = sorted(self.neighbors[target], key=lambda t: (-len(self.neighbors[t]), t))
+            shown = [target] + ranked[:self.max_nodes - 1]
+            hidden = len(ranked) - (len(shown) - 1)
+            title = f"{target} and its {len(shown) - 1} connected tables" + (f" ({hidden} more not shown)" if hidden else "")
+            return self._tables_view(shown, title)
+        if kind == "cluster":
+            if not isinstance(target, int) or not 0 <= target < len(self.clusters):
+                return None
+            cluster = self.clusters[target]
+            return self._tables_view(cluster["tables"], cluster["label"])
+        if len(self.tables) <= self.max_nodes:
+            return self._tables_view(self.tables, "All tables")
+        clusters = list(range(len(self.clusters)))
+        return {
+            "title": f"{len(self.tables):,} tables in {len(clusters)} groups",
+            "tables": {},
+            "relationships": [],
+            "clusters": _place(clusters, self.cluster_layer, self.cluster_row, CLUSTER_X_GAP, CLUSTER_Y_GAP),
+            "cluster_edges": [(a, b, n) for (a, b), n in sorted(self.cluster_edges.items())],
+            "complete": False,
+        }
+
+
+def schema_fingerprint(table_names, relationships):
+    """Hash of what the layout depends on: table names and the FK edges between them."""
+    h = hashlib.sha1()
+    for t in table_names:
+        h.update(t.encode("utf-8"))
+        h.update(b"\0")
+    h.update(b"\1")
+    for r in relationships:
+        h.update(f"{r.get('table')}\0{r.get('column')}\0{r.get('ref_table')}\1".encode("utf-8"))
+    return h.hexdigest()
+
+
+_layouts = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+def get_layout(table_names, relationships, max_nodes=ER_MAX_NODES):
+    """ErLayout for this schema, reused while the table names and relationships are unchanged."""
+    table_names = list(table_names)
+    key = (schema_fingerprint(table_names, relationships), max_nodes)
+    with _layouts_lock:
+        layout = _layouts.get(key)
+        if layout is not None:
+            _layouts.move_to_end(key)
+            return layout
+    layout = ErLayout(table_names, relationships, max_nodes=max_nodes)
+    with _layouts_lock:
+        _layouts[key] = layout
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return layout
@@ -1,15 +1,53 @@
 """
-Export table row data to JSON.
+Export table row data to JSON, NDJSON, CSV, Parquet or Arrow IPC.
 Supports: all tables or selected tables; all rows or a limit per table;
 one file per table or one combined file; custom file name or prefix.
+
+Rows are streamed in fetchmany() batches and written incrementally, so memory
+stays constant regardless of table size. Text formats can be gzip- or
+zstd-compressed; Parquet and Arrow IPC (require pyarrow) convert each batch to a
+columnar record batch typed from artifacts/metadata.json. Each export reports
+its throughput in rows/s.
+
+export_table_data_parallel() runs tables concurrently in a process pool, splits
+large tables into rowid ranges written as part-files, and records parts, row
+counts and SHA-256 checksums in a manifest.json.
+
+export_table_data_delta() exports only rows beyond a per-table watermark (max
+rowid, or an updated_at-style column) into timestamped delta files, and falls
+back to a full export when it detects the table was rewritten.
 """
+import csv
+import decimal
+import gzip
+import hashlib
 import json
+import os
 import re
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
 from config import ARTIFACTS_DIR, DB_PATH, DB_TYPE
+from profiler import detect_date_columns
+from storage import load_json, save_json
+from tracing import span, traced_connection
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_ROWS_PER_PART = 1_000_000
+# Name fragments that mark a date column as a last-modified timestamp (watermark candidate)
+UPDATED_AT_HINTS = ("updated", "modified", "changed", "last_")
+# Rows sharing a timestamp watermark's max value remembered (by digest) to skip next run
+MAX_ROWS_AT_MARK = 1000
+FORMATS = ("json", "ndjson", "csv", "parquet", "arrow")
+COMPRESSIONS = ("gzip", "zstd")
+# Formats that can hold several tables in one file
+COMBINABLE_FORMATS = ("json", "ndjson")
+_EXTENSIONS = {"json": "json", "ndjson": "ndjson", "csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+_COMPRESSED_SUFFIX = {"gzip": ".gz", "zstd": ".zst"}
 
 
 def _safe_filename(name: str) -> str:
@@ -19,44 +57,873 @@ def _safe_filename(name: str) -> str:
     return re.sub(r"[^\w\-]", "_", name.strip()).strip("_") or "export"
 
 
+def _open_text(path: Path, compression: Optional[str], newline=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6, newline=newline)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires: pip install zstandard")
+        return zstandard.open(path, "wt", encoding="utf-8", newline=newline)
+    return open(path, "w", encoding="utf-8", newline=newline)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet and Arrow export require: pip install pyarrow")
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, default=str, ensure_ascii=False)
+
+
+def _load_column_types() -> dict:
+    """{table: {column: declared type}} from artifacts/metadata.json (empty if not generated yet)."""
+    path = ARTIFACTS_DIR / "metadata.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        meta = json.load(f)
+    tables = meta.get("tables", meta)
+    types = {}
+    for table, cols in tables.items():
+        if isinstance(cols, list):
+            types[table] = {
+                c.get("column_name", c.get("name")): (c.get("data_type", c.get("type")) or "")
+                for c in cols
+            }
+    return types
+
+
+class _JsonWriter:
+    """
+    Emits JSON incrementally. Per-table files hold one array of row objects;
+    the combined file holds {"table": [rows], ...}, one table section at a time.
+    """
+
+    def __init__(self, path: Path, combined: bool, compression: Optional[str], column_types: dict):
+        self.f = _open_text(path, compression)
+        self.combined = combined
+        self.n_tables = 0
+        self.n_rows = 0
+        if combined:
+            self.f.write("{")
+
+    def begin_table(self, table: str, columns: list[str]):
+        if self.combined:
+            self.f.write(("," if self.n_tables else "") + "\n" + _dumps(table) + ": ")
+        self.f.write("[")
+        self.n_tables += 1
+        self.n_rows = 0
+
+    def write_batch(self, table: str, columns: list[str], rows: list[tuple]):
+        parts = []
+        for row in rows:
+            parts.append(("," if self.n_rows else "") + "\n" + _dumps(dict(zip(columns, row))))
+            self.n_rows += 1
+        self.f.write("".join(parts))
+
+    def end_table(self, table: str):
+        self.f.write("\n]" if self.n_rows else "]")
+
+    def close(self):
+        self.f.write("\n}\n" if self.combined else "\n")
+        self.f.close()
+
+
+class _NdjsonWriter:
+    """One JSON object per line. In the combined file each line is {"table": ..., "row": {...}}."""
+
+    def __init__(self, path: Path, combined: bool, compression: Optional[str], column_types: dict):
+        self.f = _open_text(path, compression)
+        self.combined = combined
+
+    def begin_table(self, table: str, columns: list[str]):
+        pass
+
+    def write_batch(self, table: str, columns: list[str], rows: list[tuple]):
+        if self.combined:
+            lines = [_dumps({"table": table, "row": dict(zip(columns, row))}) for row in rows]
+        else:
+            lines = [_dumps(dict(zip(columns, row))) for row in rows]
+        self.f.write("\n".join(lines) + "\n")
+
+    def end_table(self, table: str):
+        pass
+
+    def close(self):
+        self.f.close()
+
+
+class _CsvWriter:
+    """Header row plus one CSV row per record, written per batch."""
+
+    def __init__(self, path: Path, combined: bool, compression: Optional[str], column_types: dict):
+        self.f = _open_text(path, compression, newline="")
+        self.writer = csv.writer(self.f)
+
+    def begin_table(self, table: str, columns: list[str]):
+        self.writer.writerow(columns)
+
+    def write_batch(self, table: str, columns: list[str], rows: list[tuple]):
+        self.writer.writerows(rows)
+
+    def end_table(self, table: str):
+        pass
+
+    def close(self):
+        self.f.close()
+
+
+class _Lossy(ValueError):
+    """A value that cannot be stored in the column's Arrow type without changing it."""
+
+
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+# Wide enough to quantize any decimal128 value without rounding
+_DECIMAL_CONTEXT = decimal.Context(prec=80)
+_DECIMAL_ARGS = re.compile(r"\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\)")
+
+
+def _to_int(v):
+    if v is None:
+        return v
+    if isinstance(v, float):
+        if not v.is_integer():
+            raise _Lossy(v)
+        v = int(v)
+    elif isinstance(v, str):
+        try:
+            v = int(v)
+        except ValueError:
+            try:
+                d = decimal.Decimal(v.strip())
+            except decimal.InvalidOperation:
+                raise _Lossy(v)
+            if not d.is_finite() or d != d.to_integral_value():
+                raise _Lossy(v)
+            v = int(d)
+    elif not isinstance(v, int):
+        raise _Lossy(v)
+    if not _INT64_MIN <= v <= _INT64_MAX:
+        raise _Lossy(v)
+    return v
+
+
+def _to_float(v):
+    if v is None or isinstance(v, float):
+        return v
+    if isinstance(v, int):
+        f = float(v)
+        # Integers beyond 2**53 do not survive the round trip
+        if int(f) != v:
+            raise _Lossy(v)
+        return f
+    if isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            raise _Lossy(v)
+    raise _Lossy(v)
+
+
+def _to_str(v):
+    if v is None or isinstance(v, str):
+        return v
+    if isinstance(v, bytes):
+        return v.hex()
+    return str(v)
+
+
+def _decimal_coercer(precision, scale):
+    exponent = decimal.Decimal(1).scaleb(-scale)
+
+    def coerce(v):
+        if v is None:
+            return v
+        if isinstance(v, bytes):
+            raise _Lossy(v)
+        try:
+            # str() of a float is its shortest round-trip form, i.e. the value SQLite shows
+            d = decimal.Decimal(v if isinstance(v, (int, str)) else str(v))
+        except decimal.InvalidOperation:
+            raise _Lossy(v)
+        if not d.is_finite():
+            raise _Lossy(v)
+        q = d.quantize(exponent, context=_DECIMAL_CONTEXT)
+        if q != d or len(q.as_tuple().digits) > precision:
+            raise _Lossy(v)
+        return q
+
+    return coerce
+
+
+def _arrow_type(pa, declared: str):
+    """
+    Map a declared SQL type to (arrow type, value coercion) using SQLite affinity rules.
+    DECIMAL(p, s) / NUMERIC(p, s) become decimal128(p, s); without a usable
+    precision they are kept exact as strings rather than rounded to float64.
+    """
+    t = (declared or "").upper()
+    if "INT" in t:
+        return pa.int64(), _to_int
+    if "NUMERIC" in t or "DECIMAL" in t:
+        m = _DECIMAL_ARGS.search(t)
+        precision = int(m.group(1)) if m else 0
+        scale = int(m.group(2) or 0) if m else 0
+        if 0 < precision <= 38 and scale <= precision:
+            return pa.decimal128(precision, scale), _decimal_coercer(precision, scale)
+        return pa.string(), _to_str
+    if any(k in t for k in ("REAL", "FLOA", "DOUB")):
+        return pa.float64(), _to_float
+    return pa.string(), _to_str
+
+
+def _lossy(writer, table) -> dict:
+    """{"lossy": {column: values written as null}} for a table, or {} if none were."""
+    counts = getattr(writer, "lossy", {}).get(table)
+    return {"lossy": counts} if counts else {}
+
+
+class _ArrowBatchWriter:
+    """
+    Base for columnar writers: converts each fetchmany() batch to a RecordBatch.
+    Values that do not fit the declared column type unchanged (3.7 in an INTEGER
+    column, text in a REAL column, ...) are written as null and counted per
+    column in self.lossy, which the export report lists.
+    """
+
+    def __init__(self, path: Path, combined: bool, compression: Optional[str], column_types: dict):
+        self.pa = _import_pyarrow()
+        self.path = path
+        self.compression = compression
+        self.column_types = column_types
+        self.schema = None
+        self.coercers = []
+        self.sink = None
+        self.lossy = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _open_sink(self):
+        raise NotImplementedError
+
+    def begin_table(self, table: str, columns: list[str]):
+        declared = self.column_types.get(table, {})
+        fields = []
+        self.coercers = []
+        for col in columns:
+            typ, coerce = _arrow_type(self.pa, declared.get(col, ""))
+            fields.append(self.pa.field(col, typ))
+            self.coercers.append(coerce)
+        self.schema = self.pa.schema(fields)
+        self.sink = self._open_sink()
+
+    def write_batch(self, table: str, columns: list[str], rows: list[tuple]):
+        arrays = []
+        for i, coerce in enumerate(self.coercers):
+            values = []
+            bad = 0
+            for row in rows:
+                try:
+                    values.append(coerce(row[i]))
+                except _Lossy:
+                    values.append(None)
+                    bad += 1
+            if bad:
+                counts = self.lossy.setdefault(table, {})
+                counts[columns[i]] = counts.get(columns[i], 0) + bad
+            arrays.append(self.pa.array(values, type=self.schema.field(i).type))
+        self.sink.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def end_table(self, table: str):
+        pass
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+
+
+class _ParquetWriter(_ArrowBatchWriter):
+    def _open_sink(self):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(str(self.path), self.schema, compression=self.compression or "zstd")
+
+
+class _ArrowIpcWriter(_ArrowBatchWriter):
+    def _open_sink(self):
+        if self.compression not in (None, "zstd"):
+            raise ValueError("Arrow IPC supports only zstd compression.")
+        options = self.pa.ipc.IpcWriteOptions(compression=self.compression)
+        return self.pa.ipc.new_file(str(self.path), self.schema, options=options)
+
+
+_WRITERS = {
+    "json": _JsonWriter,
+    "ndjson": _NdjsonWriter,
+    "csv": _CsvWriter,
+    "parquet": _ParquetWriter,
+    "arrow": _ArrowIpcWriter,
+}
+
+
+def _file_name(base: Optional[str], table: Optional[str], fmt: str, compression: Optional[str]) -> str:
+    """File name for one table (table given) or the combined file (table None)."""
+    if table is None:
+        stem = base or "table_data"
+    else:
+        stem = f"{base}_{table}" if base else table
+    name = f"{stem}.{_EXTENSIONS[fmt]}"
+    # Parquet/Arrow compress internally; the file name stays the same
+    if compression and fmt not in ("parquet", "arrow"):
+        name += _COMPRESSED_SUFFIX[compression]
+    return name
+
+
+def _stream_table(cur, table, writer, max_rows_per_table, batch_size, where="", params=(), skip=None):
+    """
+    Copy one table (optionally filtered by a WHERE clause) into writer batch by batch,
+    leaving out rows whose _digest() is in skip. Returns rows written.
+    """
+    limit_sql = f" LIMIT {int(max_rows_per_table)}" if max_rows_per_table else ""
+    with span("export", cat="table", table=table) as sp:
+        cur.execute(f"SELECT * FROM [{table}]{where}{limit_sql}", params)
+        columns = [d[0] for d in cur.description]
+        n = 0
+        writer.begin_table(table, columns)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            if skip:
+                rows = [row for row in rows if _digest(row) not in skip]
+                if not rows:
+                    continue
+            writer.write_batch(table, columns, rows)
+            n += len(rows)
+        writer.end_table(table)
+        sp.set(rows=n)
+    return n
+
+
+def _list_tables(cur):
+    cur.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _check_options(fmt, compression):
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}. Use one of {', '.join(FORMATS)}.")
+    if compression and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}. Use one of {', '.join(COMPRESSIONS)}.")
+
+
+def _table_stats(path, rows, seconds):
+    return {
+        "path": str(path),
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows / seconds) if seconds > 0 else rows,
+    }
+
+
 def _export_sqlite(
     out_dir: Path,
     one_file: bool = False,
     tables: Optional[list[str]] = None,
     max_rows_per_table: Optional[int] = None,
     custom_name: Optional[str] = None,
+    fmt: str = "json",
+    compression: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
 ):
+    """Stream tables to out_dir. Returns a throughput report (per table and total)."""
+    _check_options(fmt, compression)
+    if one_file and fmt not in COMBINABLE_FORMATS:
+        raise ValueError(f"Single-file export is supported only for {', '.join(COMBINABLE_FORMATS)}.")
+    column_types = _load_column_types() if fmt in ("parquet", "arrow") else {}
     base = _safe_filename(custom_name) if custom_name else None
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    writer_cls = _WRITERS[fmt]
+    conn = traced_connection(sqlite3.connect(DB_PATH))
     cur = conn.cursor()
-    if tables is None:
-        cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-        )
-        tables = [row[0] for row in cur.fetchall()]
-    result = {}
+    started = time.perf_counter()
+    report = {"tables": {}}
+    try:
+        if tables is None:
+            tables = _list_tables(cur)
+        if one_file:
+            path = out_dir / _file_name(base, None, fmt, compression)
+            report["path"] = str(path)
+            writer = writer_cls(path, True, compression, column_types)
+            try:
+                for table in tables:
+                    t0 = time.perf_counter()
+                    n = _stream_table(cur, table, writer, max_rows_per_table, batch_size)
+                    report["tables"][table] = {**_table_stats(path, n, time.perf_counter() - t0), **_lossy(writer, table)}
+            finally:
+                writer.close()
+        else:
+            report["path"] = str(out_dir)
+            for table in tables:
+                path = out_dir / _file_name(base, table, fmt, compression)
+                t0 = time.perf_counter()
+                writer = writer_cls(path, False, compression, column_types)
+                try:
+                    n = _stream_table(cur, table, writer, max_rows_per_table, batch_size)
+                finally:
+                    writer.close()
+                report["tables"][table] = {**_table_stats(path, n, time.perf_counter() - t0), **_lossy(writer, table)}
+    finally:
+        conn.close()
+    total_rows = sum(t["rows"] for t in report["tables"].values())
+    report.update(_table_stats(report["path"], total_rows, time.perf_counter() - started))
+    return report
+
+
+# --------------------------------------------------
+# Parallel, partitioned export
+# --------------------------------------------------
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _connect_readonly():
+    return sqlite3.connect(Path(DB_PATH).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def _plan_parts(cur, table, rows_per_part):
+    """
+    Split a table into rowid ranges of about rows_per_part rows each, ending at
+    the table's current max rowid. Returns ([(lo, hi), ...], row count), or
+    ([None], count) to export the table as a single unbounded part (empty and
+    WITHOUT ROWID tables).
+    """
+    try:
+        cur.execute(f"SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM [{table}]")
+    except sqlite3.OperationalError:
+        return [None], None
+    lo, hi, count = cur.fetchone()
+    if lo is None:
+        return [None], count
+    n_parts = max(1, -(-count // rows_per_part))
+    step = -(-(hi - lo + 1) // n_parts)
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)], count
+
+
+def _export_part(table, rowid_range, path, fmt, compression, column_types, batch_size):
+    """Worker: export one rowid range (or the whole table) to path. Returns the manifest entry."""
+    t0 = time.perf_counter()
+    conn = _connect_readonly()
+    try:
+        cur = conn.cursor()
+        where, params = "", ()
+        if rowid_range is not None:
+            where, params = " WHERE rowid BETWEEN ? AND ? ORDER BY rowid", tuple(rowid_range)
+        # One read transaction per part: the rows written and max_rowid_seen agree
+        cur.execute("BEGIN")
+        max_seen = None
+        if rowid_range is not None:
+            cur.execute(f"SELECT MAX(rowid) FROM [{table}] WHERE rowid BETWEEN ? AND ?", params)
+            max_seen = cur.fetchone()[0]
+        writer = _WRITERS[fmt](path, False, compression, column_types)
+        try:
+            n = _stream_table(cur, table, writer, None, batch_size, where, params)
+        finally:
+            writer.close()
+        conn.rollback()
+    finally:
+        conn.close()
+    return {
+        "table": table,
+        "file": path.name,
+        "rowid_range": list(rowid_range) if rowid_range else None,
+        "max_rowid_seen": max_seen,
+        "rows": n,
+        "bytes": path.stat().st_size,
+        "sha256": _sha256(path),
+        "seconds": round(time.perf_counter() - t0, 3),
+        **_lossy(writer, table),
+    }
+
+
+def export_table_data_parallel(
+    tables: Optional[list[str]] = None,
+    custom_name: Optional[str] = None,
+    fmt: str = "ndjson",
+    compression: Optional[str] = None,
+    workers: Optional[int] = None,
+    rows_per_part: int = DEFAULT_ROWS_PER_PART,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    """
+    Export a full snapshot with a pool of worker processes.
+
+    Tables run concurrently; tables larger than rows_per_part are split into
+    rowid ranges, each written as its own part-file ({table}.part-00000.ndjson, ...)
+    by its own read-only connection. Writes artifacts/table_data/<custom_name or
+    "snapshot">/manifest.json listing every part with its rowid range, row count,
+    size and SHA-256. Returns the throughput report (see export_table_data), with
+    "manifest" set to the manifest path.
+
+    The parts are not one snapshot: each part reads in its own transaction. The
+    ranges are planned in a single read transaction and end at each table's max
+    rowid at that moment ("max_rowid" in the manifest), so rows inserted during
+    the export are left out, but rows updated or deleted meanwhile may be seen
+    in their new state by parts that run later. Each part records the highest
+    rowid it actually exported ("max_rowid_seen"). Export a quiet database (or
+    a copy) when the parts must agree exactly.
+    """
+    if DB_TYPE != "sqlite":
+        raise NotImplementedError("Table data export is supported only for SQLite.")
+    _check_options(fmt, compression)
+    out_dir = ARTIFACTS_DIR / "table_data" / (_safe_filename(custom_name) if custom_name else "snapshot")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    column_types = _load_column_types() if fmt in ("parquet", "arrow") else {}
+    started = time.perf_counter()
+
+    conn = _connect_readonly()
+    planned_max = {}
+    try:
+        cur = conn.cursor()
+        # Plan every table from the same state of the database
+        cur.execute("BEGIN")
+        if tables is None:
+            tables = _list_tables(cur)
+        tasks = []
+        for table in tables:
+            ranges, count = _plan_parts(cur, table, rows_per_part)
+            planned_max[table] = ranges[-1][1] if ranges[-1] is not None else None
+            for i, rowid_range in enumerate(ranges):
+                path = out_dir / _file_name(None, f"{table}.part-{i:05d}", fmt, compression)
+                size = count / len(ranges) if count else 0
+                tasks.append((size, table, rowid_range, path))
+        conn.rollback()
+    finally:
+        conn.close()
+    # Largest parts first so the pool drains evenly
+    tasks.sort(key=lambda t: t[0], reverse=True)
+
+    parts = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(_export_part, table, rowid_range, path, fmt, compression, column_types, batch_size)
+            for _, table, rowid_range, path in tasks
+        ]
+        for future in as_completed(futures):
+            parts.append(future.result())
+
+    # Part files left by an earlier run that split these tables into more parts
+    written = {path.name for _, _, _, path in tasks}
+    prefixes = tuple(f"{table}.part-" for table in tables)
+    for stale in out_dir.iterdir():
+        if stale.name.startswith(prefixes) and stale.name not in written:
+            stale.unlink(missing_ok=True)
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": str(DB_PATH),
+        "format": fmt,
+        "compression": compression,
+        "tables": {},
+    }
+    report = {"tables": {}}
     for table in tables:
-        limit_sql = f" LIMIT {int(max_rows_per_table)}" if max_rows_per_table else ""
-        cur.execute(f"SELECT * FROM [{table}]{limit_sql}")
-        rows = [dict(row) for row in cur.fetchall()]
-        result[table] = rows
-        if not one_file:
-            fname = f"{base}_{table}.json" if base else f"{table}.json"
-            path = out_dir / fname
-            path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(rows, f, indent=2, default=str)
-    conn.close()
-    if one_file:
-        fname = f"{base}.json" if base else "table_data.json"
-        if not fname.endswith(".json"):
-            fname += ".json"
-        path = out_dir / fname
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, default=str)
-    return result
+        table_parts = sorted((p for p in parts if p["table"] == table), key=lambda p: p["file"])
+        rows = sum(p["rows"] for p in table_parts)
+        manifest["tables"][table] = {
+            "rows": rows,
+            "max_rowid": planned_max.get(table),
+            "parts": [{k: v for k, v in p.items() if k not in ("table", "seconds")} for p in table_parts],
+        }
+        report["tables"][table] = _table_stats(out_dir, rows, max((p["seconds"] for p in table_parts), default=0))
+        lossy = {}
+        for p in table_parts:
+            for col, n in p.get("lossy", {}).items():
+                lossy[col] = lossy.get(col, 0) + n
+        if lossy:
+            report["tables"][table]["lossy"] = lossy
+    manifest_path = out_dir / "manifest.json"
+    save_json(manifest, manifest_path)
+    report.update(_table_stats(out_dir, sum(t["rows"] for t in report["tables"].values()), time.perf_counter() - started))
+    report["manifest"] = str(manifest_path)
+    return report
+
+
+# --------------------------------------------------
+# Incremental (delta) export with watermarks
+# --------------------------------------------------
+
+def _table_columns(cur, table):
+    cur.execute(f"PRAGMA table_info([{table}])")
+    return [{"column_name": r[1], "data_type": r[2] or ""} for r in cur.fetchall()]
+
+
+def pick_watermark_column(columns):
+    """An updated_at-style column among the profiler's freshness (date) columns, or None."""
+    for col in detect_date_columns(columns):
+        if any(hint in col.lower() for hint in UPDATED_AT_HINTS):
+            return col
+    return None
+
+
+def _digest(row) -> str:
+    return hashlib.sha256(_dumps(list(row)).encode()).hexdigest()
+
+
+def _row_digest(cur, table, rowid):
+    cur.execute(f"SELECT * FROM [{table}] WHERE rowid = ?", (rowid,))
+    row = cur.fetchone()
+    return _digest(row) if row else None
+
+
+def _has_rowid(cur, table):
+    try:
+        cur.execute(f"SELECT rowid FROM [{table}] LIMIT 0")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _watermark_key(cur, table, columns, watermark_columns):
+    """The watermark: a timestamp column, "rowid", or "full" (WITHOUT ROWID table, exported whole)."""
+    key = watermark_columns.get(table) or pick_watermark_column(columns)
+    if key:
+        return key
+    return "rowid" if _has_rowid(cur, table) else "full"
+
+
+def _watermark_state(cur, table, key):
+    """
+    Current watermark of a table. rowid: max rowid, rows at or below it and a digest
+    of that row. Timestamp column: max value, total rows, digests of the rows at
+    the max (None past MAX_ROWS_AT_MARK), and the max rowid of rows with no value.
+    """
+    if key == "full":
+        return {"value": None}
+    if key == "rowid":
+        cur.execute(f"SELECT MAX(rowid) FROM [{table}]")
+        mark = cur.fetchone()[0]
+        if mark is None:
+            return {"value": None, "rows": 0, "anchor": None}
+        cur.execute(f"SELECT COUNT(*) FROM [{table}] WHERE rowid <= ?", (mark,))
+        return {"value": mark, "rows": cur.fetchone()[0], "anchor": _row_digest(cur, table, mark)}
+    cur.execute(f"SELECT MAX([{key}]), COUNT(*) FROM [{table}]")
+    mark, rows = cur.fetchone()
+    at_mark = None
+    if mark is not None:
+        cur.execute(f"SELECT * FROM [{table}] WHERE [{key}] = ? LIMIT ?", (mark, MAX_ROWS_AT_MARK + 1))
+        found = cur.fetchall()
+        at_mark = sorted(_digest(r) for r in found) if len(found) <= MAX_ROWS_AT_MARK else None
+    null_rowid = None
+    if _has_rowid(cur, table):
+        cur.execute(f"SELECT MAX(rowid) FROM [{table}] WHERE [{key}] IS NULL")
+        null_rowid = cur.fetchone()[0]
+    return {"value": mark, "rows": rows, "at_mark": at_mark, "null_rowid": null_rowid}
+
+
+def _was_rewritten(cur, table, key, previous, columns):
+    """
+    True if a delta would miss data: the schema or watermark key changed, rows at or
+    below a rowid watermark changed (count or anchor row differ), or a timestamp
+    watermarked table lost rows or its max value went back (deleted or reloaded).
+    """
+    if previous.get("key") != key or previous.get("columns") != [c["column_name"] for c in columns]:
+        return True
+    mark = previous.get("value")
+    if mark is None:
+        return False
+    if key == "rowid":
+        cur.execute(f"SELECT COUNT(*) FROM [{table}] WHERE rowid <= ?", (mark,))
+        if cur.fetchone()[0] != previous.get("rows"):
+            return True
+        return _row_digest(cur, table, mark) != previous.get("anchor")
+    cur.execute(f"SELECT COUNT(*), MAX([{key}]) IS NULL OR MAX([{key}]) < ? FROM [{table}]", (mark,))
+    rows, went_back = cur.fetchone()
+    return rows < (previous.get("rows") or 0) or bool(went_back)
+
+
+def _delta_filter(key, previous, has_rowid):
+    """(WHERE clause, params, digests to skip) selecting the rows past the previous watermark."""
+    mark = previous.get("value")
+    if key == "rowid":
+        return (" WHERE rowid > ?", (mark,), None) if mark is not None else ("", (), None)
+    col = f"[{key}]"
+    conds, params = [], []
+    if mark is not None:
+        # >= so rows committed later with the same value are not missed; the rows
+        # already exported at that value are skipped by digest
+        conds.append(f"{col} >= ?")
+        params.append(mark)
+    else:
+        conds.append(f"{col} IS NOT NULL")
+    if not has_rowid:
+        conds.append(f"{col} IS NULL")
+    elif previous.get("null_rowid") is None:
+        conds.append(f"{col} IS NULL")
+    else:
+        conds.append(f"({col} IS NULL AND rowid > ?)")
+        params.append(previous["null_rowid"])
+    return " WHERE " + " OR ".join(conds), tuple(params), set(previous.get("at_mark") or ())
+
+
+def export_table_data_delta(
+    tables: Optional[list[str]] = None,
+    fmt: str = "ndjson",
+    compression: Optional[str] = None,
+    watermark_columns: Optional[dict] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    """
+    Export only rows added (or, with a timestamp watermark, updated) since the last run.
+
+    Each table's watermark is its max rowid, or an updated_at-style column:
+    watermark_columns[table] if given, else one found by pick_watermark_column().
+    WITHOUT ROWID tables with no such column are exported in full on every run.
+    Rows beyond the watermark go to artifacts/table_data/delta/{table}.{UTC stamp}.delta.{ext}
+    (stamp to the microsecond, so runs never overwrite each other's files). A timestamp
+    watermark selects rows at or after the previous max value, minus the rows already
+    exported at that value (unless more than MAX_ROWS_AT_MARK shared it, in which case
+    they are exported again), plus rows without a value that are new since the last
+    run (all of them on WITHOUT ROWID tables). If the table was rewritten (rowid
+    watermark: rows at or below it changed; timestamp: fewer rows or a lower max
+    value; either: the schema changed) the whole table is exported as
+    {table}.{stamp}.full.{ext}. Each table is read in one transaction. Empty deltas
+    leave no file.
+    State lives in delta/watermarks.json and every file is appended to
+    delta/manifest.json; both are saved after each table, so an interrupted run
+    keeps the tables it finished.
+    Returns the throughput report, with "kind" ("delta" | "full") per table.
+    """
+    if DB_TYPE != "sqlite":
+        raise NotImplementedError("Table data export is supported only for SQLite.")
+    _check_options(fmt, compression)
+    out_dir = ARTIFACTS_DIR / "table_data" / "delta"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state_path = out_dir / "watermarks.json"
+    manifest_path = out_dir / "manifest.json"
+    state = load_json(state_path) if state_path.exists() else {}
+    manifest = load_json(manifest_path) if manifest_path.exists() else {"files": []}
+    watermark_columns = watermark_columns or {}
+    column_types = _load_column_types() if fmt in ("parquet", "arrow") else {}
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    started = time.perf_counter()
+    report = {"path": str(out_dir), "tables": {}}
+
+    conn = _connect_readonly()
+    try:
+        cur = conn.cursor()
+        if tables is None:
+            tables = _list_tables(cur)
+        for table in tables:
+            t0 = time.perf_counter()
+            # The watermark read and the rows exported come from the same snapshot
+            cur.execute("BEGIN")
+            columns = _table_columns(cur, table)
+            key = _watermark_key(cur, table, columns, watermark_columns)
+            previous = state.get(table)
+            full = key == "full" or previous is None or _was_rewritten(cur, table, key, previous, columns)
+            current = _watermark_state(cur, table, key)
+            where, params, skip = "", (), None
+            if not full:
+                where, params, skip = _delta_filter(key, previous, _has_rowid(cur, table))
+
+            kind = "full" if full else "delta"
+            path = out_dir / _file_name(None, f"{table}.{stamp}.{kind}", fmt, compression)
+            writer = _WRITERS[fmt](path, False, compression, column_types)
+            try:
+                n = _stream_table(cur, table, writer, None, batch_size, where, params, skip)
+            finally:
+                writer.close()
+            conn.rollback()
+
+            state[table] = {"key": key, "columns": [c["column_name"] for c in columns], **current}
+            report["tables"][table] = {**_table_stats(path, n, time.perf_counter() - t0), "kind": kind, **_lossy(writer, table)}
+            if kind == "delta" and n == 0:
+                path.unlink()
+            else:
+                manifest["files"].append({
+                    "table": table,
+                    "file": path.name,
+                    "kind": kind,
+                    "key": key,
+                    "from": None if full else previous.get("value"),
+                    "to": current["value"],
+                    "rows": n,
+                    "sha256": _sha256(path),
+                    "created_at": stamp,
+                    **_lossy(writer, table),
+                })
+                save_json(manifest, manifest_path)
+            save_json(state, state_path)
+    finally:
+        conn.close()
+
+    report.update(_table_stats(out_dir, sum(t["rows"] for t in report["tables"].values()), time.perf_counter() - started))
+    return report
+
+
+def format_report(report: dict) -> str:
+    """Human-readable throughput report."""
+    lines = []
+    for name, s in report.get("tables", {}).items():
+        line = f"{name}: {s['rows']} rows in {s['seconds']:.2f}s ({s['rows_per_s']:,} rows/s)"
+        if s.get("lossy"):
+            cols = ", ".join(f"{col} ({n})" for col, n in s["lossy"].items())
+            line += f"; values not representable in the column type, written as null: {cols}"
+        lines.append(line)
+    lines.append(
+        f"Total: {report.get('rows', 0)} rows in {report.get('seconds', 0):.2f}s "
+        f"({report.get('rows_per_s', 0):,} rows/s) → {report.get('path', '')}"
+    )
+    return "\n".join(lines)
+
+
+def export_table_data(
+    one_file: bool = False,
+    tables: Optional[list[str]] = None,
+    max_rows_per_table: Optional[int] = None,
+    custom_name: Optional[str] = None,
+    fmt: str = "json",
+    compression: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    """
+    Stream table row data to artifacts/table_data/ and return the throughput report:
+    {"path", "rows", "seconds", "rows_per_s", "tables": {name: {...same keys}}}.
+    Parquet/Arrow tables with values their column type cannot hold unchanged also
+    get "lossy": {column: values written as null}.
+
+    - fmt: "json" (array per table), "ndjson" (one row per line), "csv",
+           "parquet" or "arrow" (Arrow IPC file; parquet/arrow need pyarrow).
+    - compression: None, "gzip" or "zstd". Text formats get a .gz/.zst suffix;
+           Parquet uses it as its codec (default zstd), Arrow IPC accepts zstd only.
+    - batch_size: rows per fetchmany() batch.
+    Other arguments as for export_table_data_to_json.
+    """
+    out_dir = ARTIFACTS_DIR / "table_data"
+    if DB_TYPE != "sqlite":
+        raise NotImplementedError("Table data export is supported only for SQLite.")
+    return _export_sqlite(
+        out_dir,
+        one_file=one_file,
+        tables=tables,
+        max_rows_per_table=max_rows_per_table,
+        custom_name=custom_name,
+        fmt=fmt,
+        compression=compression,
+        batch_size=batch_size,
+    )
 
 
 def export_table_data_to_json(
@@ -64,6 +931,8 @@ def export_table_data_to_json(
     tables: Optional[list[str]] = None,
     max_rows_per_table: Optional[int] = None,
     custom_name: Optional[str] = None,
+    fmt: str = "json",
+    compression: Optional[str] = None,
 ) -> Path:
     """
     Export table row data to JSON.
@@ -73,23 +942,63 @@ def export_table_data_to_json(
     - max_rows_per_table: If None, all rows. Else limit each table to this many rows.
     - custom_name: Optional. Single file: use as filename (e.g. "my_backup" -> my_backup.json).
                    Per-table: use as prefix (e.g. "my_backup" -> my_backup_customers.json, ...).
+    - fmt / compression: see export_table_data.
 
     Returns the directory or file path written.
     """
-    out_dir = ARTIFACTS_DIR / "table_data"
-    if DB_TYPE != "sqlite":
-        raise NotImplementedError("Table data export is supported only for SQLite.")
-    _export_sqlite(
-        out_dir,
+    report = export_table_data(
         one_file=one_file,
         tables=tables,
         max_rows_per_table=max_rows_per_table,
         custom_name=custom_name,
+        fmt=fmt,
+        compression=compression,
     )
-    if one_file:
-        base = _safe_filename(custom_name) if custom_name else "table_data"
-        fname = f"{base}.json" if base else "table_data.json"
-        if not fname.endswith(".json"):
-            fname += ".json"
-        return out_dir / fname
-    return out_dir
+    print(format_report(report))
+    return Path(report["path"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream table row data to artifacts/table_data/.")
+    parser.add_argument("--format", choices=FORMATS, default="json")
+    parser.add_argument("--compression", choices=COMPRESSIONS)
+    parser.add_argument("--one-file", action="store_true")
+    parser.add_argument("--tables", nargs="*")
+    parser.add_argument("--max-rows", type=int)
+    parser.add_argument("--name")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--parallel", action="store_true", help="Process pool + part-files + manifest.json")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--rows-per-part", type=int, default=DEFAULT_ROWS_PER_PART)
+    parser.add_argument("--delta", action="store_true", help="Only rows beyond each table's watermark")
+    args = parser.parse_args()
+    if args.delta:
+        print(format_report(export_table_data_delta(
+            tables=args.tables or None,
+            fmt=args.format,
+            compression=args.compression,
+            batch_size=args.batch_size,
+        )))
+        raise SystemExit
+    if args.parallel:
+        print(format_report(export_table_data_parallel(
+            tables=args.tables or None,
+            custom_name=args.name,
+            fmt=args.format,
+            compression=args.compression,
+            workers=args.workers,
+            rows_per_part=args.rows_per_part,
+            batch_size=args.batch_size,
+        )))
+        raise SystemExit
+    print(format_report(export_table_data(
+        one_file=args.one_file,
+        tables=args.tables or None,
+        max_rows_per_table=args.max_rows,
+        custom_name=args.name,
+        fmt=args.format,
+        compression=args.compression,
+        batch_size=args.batch_size,
+    )))
@@ -1,14 +1,16 @@
 """ Intelligent Data Dictionary Agent — Chat UI. Natural language Q&A over schema, data quality, and AI-generated summaries. """
 import streamlit as st
+import streamlit.components.v1 as components
 import sys
+import time
 from pathlib import Path
-import tempfile
-from pyvis.network import Network
+from collections.abc import Mapping, Sequence
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
+from config import ARTIFACTS_DIR
+
 METADATA_PATH = ARTIFACTS_DIR / "metadata.json"
 PROFILES_PATH = ARTIFACTS_DIR / "profiles.json"
 SUMMARIES_PATH = ARTIFACTS_DIR / "summaries.json"
@@ -27,6 +29,16 @@ RELATIONSHIP_COLORS = [
     "#F50057",  # deep pink
     "#651FFF",  # deep purple
 ]
+# Sidebar: tables listed without a search, search hits shown, column count above which
+# columns render as one scrollable grid instead of a line each
+SIDEBAR_TABLE_LIMIT = 200
+SIDEBAR_SEARCH_LIMIT = 20
+WIDE_TABLE_COLUMNS = 25
+# SQL tab CSV export: st.download_button keeps the whole file in server memory, so larger
+# files are only offered by path; result files older than a day are pruned on each export
+QUERY_RESULTS_DIR = ARTIFACTS_DIR / "query_results"
+CSV_DOWNLOAD_MAX_BYTES = 100 * 1024 * 1024
+QUERY_RESULTS_MAX_AGE_S = 24 * 3600
 
 
 def ensure_artifacts():
@@ -37,314 +49,355 @@ def ensure_artifacts():
 
 
 def load_artifacts():
+    """Read-only views over the compact catalog model shared by all sessions (rebuilt when artifacts change)."""
     ensure_artifacts()
-    from storage import load_json
-    metadata  = load_json(METADATA_PATH)
-    profiles  = load_json(PROFILES_PATH)  if PROFILES_PATH.exists()  else {}
-    summaries = load_json(SUMMARIES_PATH) if SUMMARIES_PATH.exists() else {}
-    return metadata, profiles, summaries
-
-
-def _compute_layered_positions(tables, relationships, x_gap=480, y_gap=380):
-    """Place tables in layers by FK dependency (tree-like). Returns (positions, levels)."""
-    table_names = list(tables.keys())
-    if not table_names:
-        return {}, {}
-    refs = {t: set() for t in table_names}
-    for r in relationships:
-        if not isinstance(r, dict):
-            continue
-        fr, to = r.get("table"), r.get("ref_table")
-        if fr and to and fr in refs and to in refs and fr != to:
-            refs[fr].add(to)
-    layer = {}
-    for t in table_names:
-        if not refs[t]:
-            layer[t] = 0
-        else:
-            layer[t] = 1 + max(layer.get(r, 0) for r in refs[t])
-    for _ in range(len(table_names) + 1):
-        for t in table_names:
-            if refs[t]:
-                layer[t] = 1 + max(layer.get(r, 0) for r in refs[t])
-    by_layer = {}
-    for t, lv in layer.items():
-        by_layer.setdefault(lv, []).append(t)
-    for lv in by_layer:
-        by_layer[lv].sort()
-    positions = {}
-    for lv in sorted(by_layer.keys()):
-        names = by_layer[lv]
-        for row, name in enumerate(names):
-            x = 180 + lv * x_gap
-            y = 180 + row * y_gap
-            positions[name] = (x, y)
-    return positions, layer
-
-
-def build_er_diagram(tables, relationships, tree_layout=True):
-    """Build ER diagram. tree_layout=True uses hierarchical (tree) layout for clarity."""
-    if not tables:
-        return None
-    table_names = list(tables.keys())
-    positions, levels = _compute_layered_positions(tables, relationships)
+    from catalog_model import get_shared_model
+    return get_shared_model(ARTIFACTS_DIR).as_artifacts()
+
+
+def artifacts_key():
+    """Version of the published artifacts; cache key for everything derived from them."""
+    from catalog_model import artifacts_version
+    return artifacts_version(ARTIFACTS_DIR)
 
-    # Map "table|col" → color for FK columns
-    col_colors: dict[str, str] = {}
-    for idx, r in enumerate(relationships):
-        if not isinstance(r, dict):
-            continue
-        fr, col = r.get("table"), r.get("column")
-        if fr and col:
-            col_colors[f"{fr}|{col}"] = RELATIONSHIP_COLORS[idx % len(RELATIONSHIP_COLORS)]
-
-    # We build a full custom HTML page instead of relying on pyvis HTML labels
-    # This gives us 100% control over node rendering
-    
-    # Connected tables per table (names only, no full detail of connected tables)
-    connected_names: dict[str, set[str]] = {t: set() for t in table_names}
-    for r in relationships:
-        if not isinstance(r, dict):
-            continue
-        fr, to = r.get("table"), r.get("ref_table")
-        if fr and to and fr in connected_names and to in connected_names and fr != to:
-            connected_names[fr].add(to)
-            connected_names[to].add(fr)
-
-    # Collect node data for custom rendering
-    node_data = {}
-    for table, cols in tables.items():
-        col_rows = []
-        for c in cols:
-            col_key = f"{table}|{c['column_name']}"
-            color   = col_colors.get(col_key, "#cccccc")
-            if c["primary_key"]:
-                col_rows.append({"name": c["column_name"], "color": "#FFD700", "icon": "🔑", "bold": True})
-            elif col_key in col_colors:
-                col_rows.append({"name": c["column_name"], "color": color, "icon": "⬡", "bold": True})
-            else:
-                col_rows.append({"name": c["column_name"], "color": "#aaaaaa", "icon": "", "bold": False})
-        node_data[table] = {"cols": col_rows, "pos": positions[table], "connected": sorted(connected_names.get(table, []))}
 
-    # Build edge data
-    edge_data = []
-    for idx, r in enumerate(relationships):
-        if not isinstance(r, dict):
+@st.cache_resource(max_entries=2, show_spinner=False)
+def schema_indexes(version):
+    """
+    ER tables, connected-table names and FK targets, built once per artifact version
+    and shared by all sessions (treat as read-only).
+    """
+    metadata, _, _ = load_artifacts()
+    tables_raw = metadata.get("tables", {})
+    if not isinstance(tables_raw, Mapping):
+        tables_raw = {}
+    relationships = [r for r in metadata.get("relationships", []) if isinstance(r, dict)]
+    tables = {}
+    for tname, cols in tables_raw.items():
+        if not isinstance(cols, Sequence):
             continue
+        tables[tname] = [
+            {
+                "column_name": c.get("column_name") or c.get("name", ""),
+                "primary_key": c.get("primary_key") if "primary_key" in c else c.get("pk", False),
+            }
+            for c in cols
+        ]
+    connected = {t: set() for t in tables}
+    fk_ref = {}
+    for r in relationships:
         fr, to, col = r.get("table"), r.get("ref_table"), r.get("column")
-        if not fr or not to:
-            continue
-        color = RELATIONSHIP_COLORS[idx % len(RELATIONSHIP_COLORS)]
-        edge_data.append({
-            "from": fr,
-            "to":   to,
-            "label": col or "",
-            "color": color,
-        })
+        if fr and to and fr in connected and to in connected:
+            connected[fr].add(to)
+            connected[to].add(fr)
+            fk_ref[(fr, col)] = to
+    return {"tables": tables, "relationships": relationships, "connected": connected, "fk_ref": fk_ref}
 
-    # Serialize for JS
-    import json
 
-    nodes_js = []
-    for table, data in node_data.items():
-        x, y = data["pos"]
-        # Show only table name + key columns (PK/FK) in box for readability; max 6 lines
-        key_cols = [c for c in data["cols"] if c["bold"]]  # PK and FK
-        other_cols = [c for c in data["cols"] if not c["bold"]]
-        display_cols = key_cols if key_cols else data["cols"][:5]  # fallback: first 5
-        lines = [table, "─" * min(len(table), 20)]
-        for c in display_cols[:6]:
-            prefix = (c["icon"] + " ") if c["icon"] else "  "
-            lines.append(prefix + c["name"])
-        if (key_cols and len(other_cols) > 0) or len(data["cols"]) > 6:
-            lines.append("  … hover for all")
-        label = "\n".join(lines)
-
-        # Plain-text tooltip: this table's columns + connected table names only (no full detail of connected tables)
-        col_list = "\n".join(
-            (c["icon"] + " " if c["icon"] else "  ") + c["name"] for c in data["cols"]
-        )
-        conn = data.get("connected", [])
-        if conn:
-            title_plain = f"{table}\n─────────────\n{col_list}\n─────────────\nConnected tables: {', '.join(conn)}"
+@st.cache_resource(max_entries=2, show_spinner=False)
+def name_index(version):
+    """Trigram/prefix search index over table and column names, built once per artifact version."""
+    from search_index import NameIndex
+    tables = schema_indexes(version)["tables"]
+    return NameIndex({t: [c["column_name"] for c in cols] for t, cols in tables.items()})
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def er_schema_layout(version):
+    """Layers and clusters for the ER diagram (er_layout reuses them while the schema is unchanged)."""
+    from er_layout import get_layout
+    idx = schema_indexes(version)
+    return get_layout(idx["tables"].keys(), idx["relationships"])
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def er_view_json(version, kind="overview", target=None):
+    """(title, JSON string) of one ER view (overview, cluster or table neighbourhood); None if the target is gone."""
+    import json
+    idx = schema_indexes(version)
+    layout = er_schema_layout(version)
+    view = layout.view(kind, target)
+    if view is None:
+        return None
+    return view["title"], json.dumps(build_er_graph(idx["tables"], idx["relationships"], layout, view, kind))
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def read_text(path, mtime_ns):
+    """File contents, re-read only when its mtime changes."""
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@st.fragment(run_every=2.0)
+def refresh_progress(shown_version):
+    """
+    Background refresh status (refresh_jobs.py). Only this fragment reruns while polling;
+    once a new artifact generation is published, the whole app reruns to show it.
+    """
+    from refresh_jobs import format_status, read_status
+    status = read_status()
+    if status["state"] == "running":
+        total = status.get("total")
+        st.progress(min(1.0, (status.get("done") or 0) / total) if total else 0.0, text=format_status(status))
+    elif status["state"] == "failed":
+        st.error(format_status(status))
+    elif status.get("finished"):
+        st.caption(format_status(status))
+    if artifacts_key() != shown_version:
+        st.rerun(scope="app")
+
+
+@st.cache_data(max_entries=64, ttl=60, show_spinner=False)
+def sql_page(sql, page, page_size, after=None):
+    """
+    One page of a query result as (DataFrame with the query's column names, has_more,
+    next_after), or (None, error, None). next_after is the key the next page starts after.
+    """
+    import pandas as pd
+    from ai_engine import fetch_page
+    cols, rows, has_more, next_after = fetch_page(sql, page, page_size, after)
+    if cols is None:
+        return None, rows, None
+    # Arrow (used by st.dataframe) rejects duplicate names, e.g. two "id" columns from a join
+    seen = {}
+    names = []
+    for c in cols:
+        seen[c] = seen.get(c, 0) + 1
+        names.append(c if seen[c] == 1 else f"{c}_{seen[c]}")
+    return pd.DataFrame.from_records(rows, columns=names), has_more, next_after
+
+
+@st.cache_data(max_entries=64, ttl=60, show_spinner=False)
+def sql_row_count(sql):
+    from ai_engine import count_rows
+    return count_rows(sql)
+
+
+def sql_result_grid(sql, key="sql"):
+    """
+    Paged result viewer: only the current page is fetched, converted and sent to the browser.
+    The key each visited page starts after is kept in session state, so Next and Previous
+    read by key instead of skipping rows whenever fetch_page can page the query that way.
+    """
+    import hashlib
+    page_key, anchors_key = f"{key}_page", f"{key}_anchors"
+    if st.session_state.get(f"{key}_for") != sql:
+        st.session_state[f"{key}_for"] = sql
+        st.session_state[page_key] = 0
+        st.session_state[anchors_key] = [None]
+    col_size, col_prev, col_next, col_info = st.columns([1, 1, 1, 3])
+    with col_size:
+        page_size = st.selectbox("Rows per page", [50, 100, 500, 1000], index=1, key=f"{key}_page_size",
+                                 on_change=lambda: st.session_state.update({page_key: 0, anchors_key: [None]}))
+    page = st.session_state[page_key]
+    anchors = st.session_state[anchors_key]
+    df, more, next_after = sql_page(sql, page, page_size, anchors[page] if page < len(anchors) else None)
+    if df is None:
+        st.error(more)
+        return
+    del anchors[page + 1:]
+    anchors.append(next_after)
+    count, exact = sql_row_count(sql)
+    with col_prev:
+        st.button("◀ Previous", key=f"{key}_prev", disabled=page == 0,
+                  on_click=lambda: st.session_state.update({page_key: max(0, page - 1)}))
+    with col_next:
+        st.button("Next ▶", key=f"{key}_next", disabled=not more,
+                  on_click=lambda: st.session_state.update({page_key: page + 1}))
+    with col_info:
+        first = page * page_size
+        total = "" if count is None else (f" of {count:,}" if exact else f" of more than {count:,}")
+        st.caption(f"Rows {first + 1 if len(df) else 0:,}–{first + len(df):,}{total}")
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    # Full result as CSV: written to disk in batches on request, not on every rerun
+    csv_path = QUERY_RESULTS_DIR / (hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16] + ".csv")
+    if st.button("Prepare CSV of all rows", key=f"{key}_csv"):
+        from ai_engine import write_csv
+        prune_query_results(keep=csv_path)
+        try:
+            with st.spinner("Writing CSV…"):
+                n = write_csv(sql, csv_path)
+            st.session_state[f"{key}_csv_for"] = sql
+            st.caption(f"{n:,} rows written.")
+        except Exception as e:
+            st.error(str(e))
+    if st.session_state.get(f"{key}_csv_for") == sql and csv_path.exists():
+        size = csv_path.stat().st_size
+        if size > CSV_DOWNLOAD_MAX_BYTES:
+            st.info(f"The CSV is {size / 1e6:,.0f} MB, too large to download through the app. "
+                    f"It was saved to {csv_path}.")
         else:
-            title_plain = f"{table}\n─────────────\n{col_list}"
-
-        node_entry = {
-            "id":    table,
-            "label": label,
-            "title": title_plain,
-            "physics": False,
-            "font": {
-                "size": 15,
-                "face": "monospace",
-                "color": "#f0f6fc",
-                "multi": False,
-            },
-            "color": {
-                "background": "#161b22",
-                "border":     "#58a6ff",
-                "highlight":  {"background": "#21262d", "border": "#79c0ff"},
-                "hover":      {"background": "#21262d", "border": "#79c0ff"},
-            },
-            "shape":       "box",
-            "borderWidth": 2,
-            "margin":      {"top": 14, "right": 18, "bottom": 14, "left": 18},
-            "widthConstraint": {"minimum": 200, "maximum": 280},
-        }
-        if tree_layout:
-            node_entry["level"] = levels.get(table, 0)
+            with open(csv_path, "rb") as f:
+                st.download_button("Download CSV", f, file_name="query_result.csv", mime="text/csv",
+                                   key=f"{key}_csv_download")
+
+
+def prune_query_results(keep=None):
+    """Delete result CSVs (and temp files of interrupted exports) older than QUERY_RESULTS_MAX_AGE_S."""
+    if not QUERY_RESULTS_DIR.exists():
+        return
+    cutoff = time.time() - QUERY_RESULTS_MAX_AGE_S
+    for path in QUERY_RESULTS_DIR.iterdir():
+        try:
+            if path != keep and path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+# lib/ is declared as a component: lib/index.html + lib/er/er.js load vis-network as a
+# static file the browser caches, and redraw only when the graph version changes.
+_er_component = components.declare_component("er_diagram", path=str(PROJECT_ROOT / "lib"))
+
+
+def er_diagram(version, view, height=900, key="er_diagram"):
+    """Draw one ER view; returns the last navigation event from the diagram ({"action", "id", "nonce"}) or None."""
+    kind, target = view
+    return _er_component(
+        graph=er_view_json(version, kind, target)[1], version=f"{version}|{kind}|{target}",
+        height=height, key=key, default=None,
+    )
+
+
+def _table_node(table, cols, fk_colors, connected, pos):
+    """vis-network box for one table: name + key columns, all columns in the tooltip."""
+    col_rows = []
+    for c in cols:
+        color = fk_colors.get(c["column_name"])
+        if c["primary_key"]:
+            col_rows.append({"name": c["column_name"], "color": "#FFD700", "icon": "🔑", "bold": True})
+        elif color:
+            col_rows.append({"name": c["column_name"], "color": color, "icon": "⬡", "bold": True})
         else:
-            node_entry["x"] = x
-            node_entry["y"] = y
-        nodes_js.append(node_entry)
+            col_rows.append({"name": c["column_name"], "color": "#aaaaaa", "icon": "", "bold": False})
+
+    # Show only table name + key columns (PK/FK) in box for readability; max 6 lines
+    key_cols = [c for c in col_rows if c["bold"]]  # PK and FK
+    other_cols = [c for c in col_rows if not c["bold"]]
+    display_cols = key_cols if key_cols else col_rows[:5]  # fallback: first 5
+    lines = [table, "─" * min(len(table), 20)]
+    for c in display_cols[:6]:
+        prefix = (c["icon"] + " ") if c["icon"] else "  "
+        lines.append(prefix + c["name"])
+    if (key_cols and len(other_cols) > 0) or len(col_rows) > 6:
+        lines.append("  … hover for all")
+    label = "\n".join(lines)
+
+    # Plain-text tooltip: this table's columns + connected table names only (no full detail of connected tables)
+    col_list = "\n".join(
+        (c["icon"] + " " if c["icon"] else "  ") + c["name"] for c in col_rows
+    )
+    if connected:
+        shown = connected[:30]
+        more = f" … +{len(connected) - len(shown)} more" if len(connected) > len(shown) else ""
+        title_plain = f"{table}\n─────────────\n{col_list}\n─────────────\nConnected tables: {', '.join(shown)}{more}"
+    else:
+        title_plain = f"{table}\n─────────────\n{col_list}"
+
+    x, y = pos
+    return {
+        "id":    table,
+        "kind":  "table",
+        "label": label,
+        "title": title_plain,
+        "x": x,
+        "y": y,
+        "physics": False,
+        "font": {
+            "size": 15,
+            "face": "monospace",
+            "color": "#f0f6fc",
+            "multi": False,
+        },
+        "color": {
+            "background": "#161b22",
+            "border":     "#58a6ff",
+            "highlight":  {"background": "#21262d", "border": "#79c0ff"},
+            "hover":      {"background": "#21262d", "border": "#79c0ff"},
+        },
+        "shape":       "box",
+        "borderWidth": 2,
+        "margin":      {"top": 14, "right": 18, "bottom": 14, "left": 18},
+        "widthConstraint": {"minimum": 200, "maximum": 280},
+    }
+
+
+def _cluster_node(index, cluster, pos):
+    """Collapsed group of tables; clicking it loads the group."""
+    n = len(cluster["tables"])
+    lines = [cluster["label"], f"{n:,} tables"] + ([cluster["detail"]] if cluster["detail"] else [])
+    preview = ", ".join(cluster["tables"][:12]) + (" …" if n > 12 else "")
+    x, y = pos
+    return {
+        "id":    f"cluster:{index}",
+        "kind":  "cluster",
+        "cluster": index,
+        "label": "\n".join(lines),
+        "title": f"{cluster['label']}\n─────────────\n{preview}\n─────────────\nClick to expand",
+        "x": x,
+        "y": y,
+        "physics": False,
+        "font": {"size": 16, "face": "monospace", "color": "#f0f6fc", "multi": False},
+        "color": {
+            "background": "#1f2a37",
+            "border":     "#FF9100",
+            "highlight":  {"background": "#2a3745", "border": "#FFB74D"},
+            "hover":      {"background": "#2a3745", "border": "#FFB74D"},
+        },
+        "shape":       "box",
+        "borderWidth": 3,
+        "margin":      {"top": 18, "right": 22, "bottom": 18, "left": 22},
+        "widthConstraint": {"minimum": 220, "maximum": 320},
+    }
+
+
+def _edge(source, target, label, color, width=2):
+    return {
+        "from":   source,
+        "to":     target,
+        "label":  label,
+        "color":  {"color": color, "highlight": color, "hover": color},
+        "font":   {
+            "size": 12,
+            "color": color,
+            "strokeWidth": 2,
+            "strokeColor": "#0d1117",
+            "face": "monospace",
+            "align": "middle",
+            "background": "rgba(13,17,23,0.85)",
+        },
+        "arrows": {"to": {"enabled": True, "scaleFactor": 1.0}},
+        "smooth": {"type": "curvedCW", "roundness": 0.25},
+        "width":  width,
+    }
+
+
+def build_er_graph(tables, relationships, layout, view, kind="overview"):
+    """vis-network nodes/edges for one er_layout view; tables are placed left to right by FK dependency."""
+    nodes_js = []
+    for table, pos in view["tables"].items():
+        # FK columns keep their relationship's color even when the referenced table is not shown
+        fk_colors = {}
+        for e in layout.edges_of[table]:
+            i, fr, _ = layout.edges[e]
+            if fr == table:
+                fk_colors[relationships[i].get("column")] = RELATIONSHIP_COLORS[i % len(RELATIONSHIP_COLORS)]
+        nodes_js.append(_table_node(table, tables[table], fk_colors, sorted(layout.neighbors[table]), pos))
+    for index, pos in view["clusters"].items():
+        nodes_js.append(_cluster_node(index, layout.clusters[index], pos))
 
     edges_js = []
-    for e in edge_data:
-        edges_js.append({
-            "from":   e["from"],
-            "to":     e["to"],
-            "label":  e["label"],
-            "color":  {"color": e["color"], "highlight": e["color"], "hover": e["color"]},
-            "font":   {
-                "size": 12,
-                "color": e["color"],
-                "strokeWidth": 2,
-                "strokeColor": "#0d1117",
-                "face": "monospace",
-                "align": "middle",
-                "background": "rgba(13,17,23,0.85)",
-            },
-            "arrows": {"to": {"enabled": True, "scaleFactor": 1.0}},
-            "smooth": {"type": "curvedCW", "roundness": 0.25},
-            "width":  2,
-        })
-
-    nodes_json = json.dumps(nodes_js)
-    edges_json = json.dumps(edges_js)
-    tree_layout_js = "true" if tree_layout else "false"
-
-    # Embed local vis-network so diagram works inside Streamlit iframe (CDN often blocked)
-    vis_lib_dir = PROJECT_ROOT / "lib" / "vis-9.1.2"
-    vis_js_inline = ""
-    vis_css_inline = ""
-    if (vis_lib_dir / "vis-network.min.js").exists():
-        raw = (vis_lib_dir / "vis-network.min.js").read_text(encoding="utf-8", errors="replace")
-        vis_js_inline = raw.replace("</script>", "<\\/script>")
-    if (vis_lib_dir / "vis-network.css").exists():
-        vis_css_inline = (vis_lib_dir / "vis-network.css").read_text(encoding="utf-8", errors="replace")
-
-    # If local lib missing, fall back to CDN
-    if not vis_js_inline:
-        vis_script_tag = '<script src="https://unpkg.com/vis-network@9.1.2/standalone/umd/vis-network.min.js"></script>'
-        vis_css_inline = '<link href="https://unpkg.com/vis-network@9.1.2/dist/vis-network.min.css" rel="stylesheet"/>'
-    else:
-        vis_script_tag = "<script>\n" + vis_js_inline + "\n</script>"
-
-    html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8"/>
-<style>
-  * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-  body {{ background: #0d1117; overflow: hidden; }}
-  #er-graph {{ width: 100%; height: 864px; border: none; background: #0d1117; }}
-  #er-toolbar {{ padding: 8px 12px; background: #161b22; border-bottom: 1px solid #30363d; font-family: sans-serif; font-size: 13px; color: #8b949e; }}
-  #er-toolbar button {{ background: #21262d; color: #58a6ff; border: 1px solid #30363d; padding: 6px 12px; border-radius: 6px; cursor: pointer; font-size: 12px; }}
-  #er-toolbar button:hover {{ background: #30363d; border-color: #58a6ff; }}
-  #er-toolbar .hint {{ margin-left: 12px; }}
-  {vis_css_inline}
-</style>
-{vis_script_tag}
-</head>
-<body>
-<div id="er-graph"></div>
-<script>
-  (function() {{
-    if (typeof vis === "undefined") {{
-      document.getElementById("er-graph").innerHTML = "<div style=\\"padding:20px;color:#8b949e;font-family:sans-serif;\\">Diagram library could not load. Refresh the page or check the console.</div>";
-      return;
-    }}
-    var nodes = new vis.DataSet({nodes_json});
-    var edges = new vis.DataSet({edges_json});
-    var allNodes = nodes.get().slice();
-    var allEdges = edges.get().slice();
-
-    var container = document.getElementById("er-graph");
-    var data = {{ nodes: nodes, edges: edges }};
-    var options = {{
-      interaction: {{
-        dragNodes: false,
-        dragView: true,
-        zoomView: true,
-        hover: true,
-        selectable: true,
-        selectConnectedEdges: true,
-        navigationButtons: false,
-        keyboard: false,
-        tooltipDelay: 100
-      }},
-      physics: {{ enabled: false }},
-      edges: {{ smooth: {{ type: "curvedCW", roundness: 0.2 }} }}
-    }};
-    if ({tree_layout_js}) {{
-      options.layout = {{
-        hierarchical: {{
-          enabled: true,
-          direction: "LR",
-          sortMethod: "directed",
-          levelSeparation: 220,
-          nodeSpacing: 180
-        }}
-      }};
-    }}
-
-    var network = new vis.Network(container, data, options);
-
-    // Fit view to all nodes so the diagram is visible (not blank)
-    network.on("afterDrawing", function() {{
-      network.fit({{ animation: {{ duration: 300 }} }});
-    }});
-    setTimeout(function() {{ network.fit({{ animation: {{ duration: 300 }} }}); }}, 100);
-
-    function showOnlyConnected(nodeId) {{
-      var connectedIds = new Set([nodeId]);
-      allEdges.forEach(function(e) {{
-        if (e.from === nodeId || e.to === nodeId) {{
-          connectedIds.add(e.from);
-          connectedIds.add(e.to);
-        }}
-      }});
-      var filteredNodes = allNodes.filter(function(n) {{ return connectedIds.has(n.id); }});
-      var filteredEdges = allEdges.filter(function(e) {{ return connectedIds.has(e.from) && connectedIds.has(e.to); }});
-      nodes.clear();
-      nodes.add(filteredNodes);
-      edges.clear();
-      edges.add(filteredEdges);
-      network.fit({{ animation: {{ duration: 250 }} }});
-    }}
-
-    function showAll() {{
-      nodes.clear();
-      nodes.add(allNodes);
-      edges.clear();
-      edges.add(allEdges);
-      network.fit({{ animation: {{ duration: 250 }} }});
-    }}
-
-    network.on("click", function(params) {{
-      if (params.nodes.length > 0) showOnlyConnected(params.nodes[0]);
-    }});
-    network.on("doubleClick", function() {{ showAll(); }});
-  }})();
-</script>
-</body>
-</html>
-"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html", mode="w", encoding="utf-8") as f:
-        f.write(html)
-        return f.name
+    for i in view["relationships"]:
+        r = relationships[i]
+        color = RELATIONSHIP_COLORS[i % len(RELATIONSHIP_COLORS)]
+        edges_js.append(_edge(r["table"], r["ref_table"], r.get("column") or "", color))
+    for a, b, n in view["cluster_edges"]:
+        edges_js.append(_edge(f"cluster:{a}", f"cluster:{b}", f"{n} FK" + ("s" if n > 1 else ""), "#8b949e",
+                              width=min(8, 1 + n.bit_length())))
+
+    return {"nodes": nodes_js, "edges": edges_js, "view": kind, "complete": view["complete"], "title": view["title"]}
 
 
 # ── Page setup ─────────────────────────────────────────────────────────────────
@@ -353,9 +406,10 @@ st.title("Intelligent Data Dictionary Agent")
 st.caption("Ask questions about your database schema, relationships, and data quality in plain language.")
 
 metadata, profiles, summaries = load_artifacts()
+artifacts_version = artifacts_key()
 tables_dict = metadata.get("tables", {})
-if not isinstance(tables_dict, dict):
-    tables_dict = {k: v for k, v in (metadata.items() if isinstance(metadata, dict) else []) if isinstance(v, list)}
+if not isinstance(tables_dict, Mapping):
+    tables_dict = {k: v for k, v in (metadata.items() if isinstance(metadata, Mapping) else []) if isinstance(v, Sequence)}
 relationships_list = metadata.get("relationships", [])
 n_tables = len(tables_dict)
 n_rels = len(relationships_list)
@@ -363,22 +417,23 @@ n_rels = len(relationships_list)
 # ── Sidebar ────────────────────────────────────────────────────────────────────
 with st.sidebar:
     st.header("Actions")
-    if st.button("Refresh documentation"):
-        from pipeline import run_pipeline
-        run_pipeline()
-        st.success("Documentation refreshed.")
-        st.rerun()
+    if st.button("Refresh documentation", help="Runs in the background; requests made during a run are merged into one follow-up run."):
+        from refresh_jobs import request_refresh
+        request_refresh()
+    refresh_progress(artifacts_version)
 
     st.divider()
     st.subheader("Artifacts")
-    if (ARTIFACTS_DIR / "data_dictionary.md").exists():
-        with open(ARTIFACTS_DIR / "data_dictionary.md") as f:
-            st.download_button(
-                "Download Markdown", f.read(),
-                file_name="data_dictionary.md", mime="text/markdown"
-            )
-    with st.expander("Export table data (JSON)", expanded=False):
-        tables_opt = list(tables_dict.keys()) if isinstance(tables_dict, dict) else []
+    dictionary_path = ARTIFACTS_DIR / "data_dictionary.md"
+    if dictionary_path.exists():
+        st.download_button(
+            "Download Markdown", read_text(str(dictionary_path), dictionary_path.stat().st_mtime_ns),
+            file_name="data_dictionary.md", mime="text/markdown"
+        )
+    elif (ARTIFACTS_DIR / "docs" / "index.md").exists():
+        st.caption("Large catalog: per-table pages are in `artifacts/docs/` (start at `index.md`).")
+    with st.expander("Export table data", expanded=False):
+        tables_opt = list(tables_dict.keys()) if isinstance(tables_dict, Mapping) else []
         export_tables = st.multiselect(
             "Tables to export (empty = all)",
             options=tables_opt,
@@ -392,7 +447,12 @@ with st.sidebar:
             step=100,
             key="export_max_rows",
         )
-        one_file = st.checkbox("Single file (table_data.json)", value=False, key="export_one_file")
+        from export_table_data import FORMATS, COMPRESSIONS, COMBINABLE_FORMATS
+        export_fmt = st.selectbox("Format", FORMATS, key="export_format",
+                                  help="parquet and arrow need pyarrow; zstd needs zstandard.")
+        export_compression = st.selectbox("Compression", ["none", *COMPRESSIONS], key="export_compression")
+        one_file = st.checkbox("Single file (table_data.json)", value=False, key="export_one_file",
+                               disabled=export_fmt not in COMBINABLE_FORMATS)
         custom_name = st.text_input(
             "Custom file name (optional)",
             placeholder="e.g. my_backup or jan_export",
@@ -401,12 +461,16 @@ with st.sidebar:
         st.caption("Single file: used as filename (e.g. my_backup → my_backup.json). Per-table: used as prefix (e.g. my_backup → my_backup_customers.json).")
         if st.button("Export", key="export_table_data_btn"):
             try:
-                from export_table_data import export_table_data_to_json
+                from export_table_data import export_table_data
                 tbl_list = export_tables if export_tables else None
                 limit = max_rows if max_rows else None
                 name = custom_name.strip() or None
-                out = export_table_data_to_json(one_file=one_file, tables=tbl_list, max_rows_per_table=limit, custom_name=name)
-                st.success(f"Exported to `{out}`")
+                report = export_table_data(
+                    one_file=one_file and export_fmt in COMBINABLE_FORMATS, tables=tbl_list, max_rows_per_table=limit, custom_name=name,
+                    fmt=export_fmt,
+                    compression=None if export_compression == "none" else export_compression,
+                )
+                st.success(f"Exported {report['rows']:,} rows to `{report['path']}` ({report['rows_per_s']:,} rows/s)")
             except NotImplementedError:
                 st.info("Table data export is only supported for SQLite.")
             except Exception as e:
@@ -414,41 +478,76 @@ with st.sidebar:
 
     st.divider()
     st.subheader("Tables")
-    tables_sidebar = metadata.get("tables", metadata)
-    rels = metadata.get("relationships", [])
-    table_names = list(tables_sidebar.keys()) if isinstance(tables_sidebar, dict) else []
-    # Connected tables per table (direct relationships)
-    connected = {}
-    for r in rels:
-        t1, t2 = r.get("table"), r.get("ref_table")
-        if t1 and t2:
-            connected.setdefault(t1, set()).add(t2)
-            connected.setdefault(t2, set()).add(t1)
-    # FK column -> ref_table
-    fk_ref = {(r.get("table"), r.get("column")): r.get("ref_table") for r in rels if r.get("table") and r.get("column") and r.get("ref_table")}
+    from catalog_db import open_catalog
+    catalog = open_catalog()
+    index = name_index(artifacts_version)
+    search = st.text_input("Search tables and columns", key="sidebar_search", placeholder="e.g. customer, orders.status")
+    if search.strip():
+        hits = index.search(search, limit=SIDEBAR_SEARCH_LIMIT)
+        if catalog is not None and len(hits) < SIDEBAR_SEARCH_LIMIT:
+            # Few name matches: add tables whose summaries mention the words (FTS in catalog.db)
+            seen = {(h["table"], h["column"]) for h in hits}
+            hits += [h for h in catalog.search(search) if (h["table"], h["column"]) not in seen]
+            hits = hits[:SIDEBAR_SEARCH_LIMIT]
+        if hits:
+            st.markdown("  \n".join(
+                f"`{h['table']}.{h['column']}`" if h["column"] else f"**{h['table']}**" for h in hits
+            ))
+        else:
+            st.caption("No matches.")
+        table_names = list(dict.fromkeys(h["table"] for h in hits))
+    else:
+        table_names = index.tables[:SIDEBAR_TABLE_LIMIT]
+        if len(index.tables) > SIDEBAR_TABLE_LIMIT:
+            st.caption(f"First {SIDEBAR_TABLE_LIMIT} of {len(index.tables):,} tables; search to find the others.")
+
+    def _sidebar_table_details(selected):
+        """(columns, {(table, column): ref_table}, connected table names) for one table."""
+        if catalog is not None:
+            cols = catalog.columns(selected)
+            rels = catalog.relationships(selected)
+        else:
+            idx = schema_indexes(artifacts_version)
+            return idx["tables"].get(selected, []), idx["fk_ref"], idx["connected"].get(selected, set())
+        fk_ref = {(r.get("table"), r.get("column")): r.get("ref_table") for r in rels if r.get("table") and r.get("column") and r.get("ref_table")}
+        connected = {r.get("ref_table") if r.get("table") == selected else r.get("table") for r in rels}
+        connected.discard(None)
+        return cols, fk_ref, connected
 
     if table_names:
         selected = st.selectbox("Select a table", ["—"] + table_names, key="sidebar_table_select", label_visibility="collapsed")
         if selected and selected != "—":
-            cols = tables_sidebar.get(selected, [])
-            st.markdown("**Columns**")
+            cols, fk_ref, connected = _sidebar_table_details(selected)
+            st.markdown(f"**Columns** ({len(cols)})")
+            col_rows = []
             for c in cols:
                 name = c.get("column_name", c.get("name", ""))
                 pk = c.get("primary_key", c.get("pk", False))
                 ref = fk_ref.get((selected, name))
                 if pk and not ref:
-                    st.caption(f"🔑 {name} (PK)")
+                    col_rows.append(("🔑", name, "PK"))
                 elif ref:
-                    st.caption(f"⬡ {name} (FK → {ref})")
+                    col_rows.append(("⬡", name, f"FK → {ref}"))
                 else:
-                    st.caption(f"  {name}")
-            conn = sorted(connected.get(selected, []))
+                    col_rows.append(("", name, ""))
+            if len(col_rows) > WIDE_TABLE_COLUMNS:
+                # One virtualized grid instead of a widget per column
+                st.dataframe(
+                    [{"": icon, "column": name, "key": key} for icon, name, key in col_rows],
+                    hide_index=True, use_container_width=True, height=400,
+                )
+            else:
+                for icon, name, key in col_rows:
+                    st.caption(f"{icon} {name} ({key})" if key else f"  {name}")
+            conn = sorted(connected)
             if conn:
                 st.markdown("**Connected tables** (names only)")
                 st.caption(", ".join(conn))
     else:
         for t in table_names:
             st.text(t)
+    if catalog is not None:
+        catalog.close()
 
 # ── Tabs: Chatbot | ER Diagram | SQL ──────────────────────────────────────────
 tab_chat, tab_er, tab_sql = st.tabs(["💬 Chatbot", "📊 ER Diagram", "🔍 SQL Query"])
@@ -471,42 +570,47 @@ with tab_chat:
         - **What is data quality like?** — Row counts and key health
         """)
     if submitted and question:
-        from ai_engine import answer_question
-        answer = answer_question(question.strip(), metadata, profiles, summaries)
+        import threading
+        from ai_engine import stream_answer
+        # The exchange is kept in session_state as it streams, so the rerun that a
+        # click on Stop triggers (which also closes the generator) still shows it
+        cancel_event = threading.Event()
+        exchange = {"question": question.strip(), "answer": "", "stopped": False}
+        st.session_state["chat_last"] = exchange
+
+        def stop_answer():
+            cancel_event.set()
+            exchange["stopped"] = True
+
+        def remember(chunks):
+            for chunk in chunks:
+                exchange["answer"] += chunk
+                yield chunk
+
         with st.chat_message("user"):
-            st.write(question)
+            st.write(exchange["question"])
         with st.chat_message("assistant"):
-            st.markdown(answer)
+            st.button("Stop", key="chat_stop", on_click=stop_answer)
+            st.write_stream(remember(stream_answer(exchange["question"], metadata, profiles, summaries,
+                                                   cancel_event=cancel_event)))
+    elif st.session_state.get("chat_last"):
+        exchange = st.session_state["chat_last"]
+        with st.chat_message("user"):
+            st.write(exchange["question"])
+        with st.chat_message("assistant"):
+            st.markdown(exchange["answer"] or "_No answer yet._")
+            if exchange["stopped"]:
+                st.caption("Stopped before the answer was complete.")
 
 with tab_er:
     st.subheader("Database ER Diagram")
-    tables_raw = metadata.get("tables", {})
-    if not isinstance(tables_raw, dict):
-        tables_raw = {}
-    rels_er = metadata.get("relationships", [])
-    tables_for_er = {}
-    for tname, cols in tables_raw.items():
-        if not isinstance(cols, list):
-            continue
-        tables_for_er[tname] = [
-            {
-                "column_name": c.get("column_name") or c.get("name", ""),
-                "primary_key": c.get("primary_key") if "primary_key" in c else c.get("pk", False),
-            }
-            for c in cols
-        ]
+    er_index = schema_indexes(artifacts_version)
+    tables_for_er = er_index["tables"]
+    rels_er = er_index["relationships"]
     n_er_tables = len(tables_for_er)
     # Connected table names per table (for tree view)
-    connected_er = {t: set() for t in tables_for_er}
-    fk_ref_er = {}
-    for r in rels_er:
-        if not isinstance(r, dict):
-            continue
-        fr, to, col = r.get("table"), r.get("ref_table"), r.get("column")
-        if fr and to and fr in connected_er and to in connected_er:
-            connected_er[fr].add(to)
-            connected_er[to].add(fr)
-            fk_ref_er[(fr, col)] = to
+    connected_er = er_index["connected"]
+    fk_ref_er = er_index["fk_ref"]
 
     view_mode = st.radio("View", ["Tree diagram (graph)", "Schema tree (expandable)"], horizontal=True, key="er_view_mode")
     st.caption(f"**{n_er_tables}** tables, **{len(rels_er)}** relationships. After DB changes, click **Refresh documentation** in the sidebar.")
@@ -532,25 +636,38 @@ with tab_er:
                 if conn_list:
                     st.caption(f"Connected tables: {', '.join(conn_list)}")
     else:
-        st.caption("Tree-style layout: referenced tables on the left, referencing on the right. Click a table to focus; double-click to show all. Pan and zoom.")
-        html_path = build_er_diagram(tables_for_er, rels_er, tree_layout=True)
-        if html_path:
-            with open(html_path, "r", encoding="utf-8") as f:
-                html_content = f.read()
-            st.components.v1.html(html_content, height=900, scrolling=False)
-        else:
-            st.warning("Could not generate the diagram.")
+        st.caption("Tree-style layout: referenced tables on the left, referencing on the right. Click a group to expand it, a table to focus on its neighbours; double-click to go back to the overview. Pan and zoom.")
+
+        def _focus_er_table():
+            choice = st.session_state.get("er_focus_table")
+            st.session_state["er_view"] = ("table", choice) if choice and choice != "—" else ("overview", None)
+
+        col_focus, col_back = st.columns([4, 1])
+        with col_focus:
+            st.selectbox("Focus on table", ["—"] + sorted(tables_for_er), key="er_focus_table", on_change=_focus_er_table)
+        with col_back:
+            st.button("Overview", key="er_overview", on_click=lambda: st.session_state.update(er_view=("overview", None)))
+
+        er_view = st.session_state.setdefault("er_view", ("overview", None))
+        if er_view_json(artifacts_version, *er_view) is None:
+            # Focused table or group is gone after a refresh
+            er_view = st.session_state["er_view"] = ("overview", None)
+        st.caption(er_view_json(artifacts_version, *er_view)[0])
+        event = er_diagram(artifacts_version, er_view, height=900)
+        # Clicks in the diagram load another view; the nonce tells a new click from the stored last one
+        if isinstance(event, dict) and event.get("nonce") != st.session_state.get("er_event"):
+            st.session_state["er_event"] = event.get("nonce")
+            action, target = event.get("action"), event.get("id")
+            if action in ("overview", "cluster", "table") and (action, target) != er_view:
+                st.session_state["er_view"] = (action, target)
+                st.rerun()
 
 with tab_sql:
     st.subheader("Ask in English → Get SQL Result")
     st.caption("Describe what you want; the app will generate and run SQL. DROP/DELETE/TRUNCATE and other destructive commands are blocked from execution to prevent data loss (SQL is still shown).")
     nl_query = st.text_input("Ask a data question", placeholder="e.g. most frequent product, total revenue, average price", key="nl_sql_input")
     if nl_query:
-        from ai_engine import generate_sql, execute_sql
+        from ai_engine import generate_sql
         sql = generate_sql(nl_query, metadata)
         st.code(sql, language="sql")
-        cols, rows = execute_sql(sql)
-        if isinstance(rows, str):
-            st.error(rows)
-        else:
-            st.dataframe(rows, use_container_width=True)
\ No newline at end of file
+        sql_result_grid(sql)
\ No newline at end of file
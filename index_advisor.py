@@ -0,0 +1,299 @@
+"""
+Index advisor: recommend (and optionally build) SQLite indexes.
+
+Candidates come from metadata.json (inferred primary keys checked by the
+profiler, relationship join keys), the profiler's freshness columns (MIN/MAX),
+and the query history recorded by ai_engine.execute_sql (columns filtered,
+joined, grouped or sorted on in queries whose plan scans the whole table).
+Each candidate gets an estimated benefit; the recommended ones can be created
+in one transaction, and the recorded queries are replayed before and after to
+report the speedup.
+"""
+import json
+import math
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from config import ARTIFACTS_DIR, DB_PATH, DB_TYPE, QUERY_HISTORY_PATH
+from profiler import detect_date_columns
+from storage import load_json
+
+INDEX_PREFIX = "idx_advisor_"
+# Relative weight of each reason an index helps (higher = more frequent / costlier scan)
+REASON_WEIGHTS = {"primary_key": 2.0, "join_key": 3.0, "freshness": 1.0, "query": 4.0}
+MIN_ROWS = 1000
+# Recorded queries replayed (3 times before and after) to measure the speedup
+MEASURE_QUERIES = 50
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _load_history(limit=500):
+    """Most recent distinct SELECT statements from the query history (rotated file first)."""
+    seen = {}
+    for path in (QUERY_HISTORY_PATH.with_name(QUERY_HISTORY_PATH.name + ".1"), QUERY_HISTORY_PATH):
+        if not path.exists():
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    sql = json.loads(line)["sql"].strip().rstrip(";")
+                except (ValueError, KeyError):
+                    continue
+                if sql.upper().startswith(("SELECT", "WITH")):
+                    seen.pop(sql, None)
+                    seen[sql] = True
+    return list(seen)[-limit:]
+
+
+def _existing_leading_columns(cur, table):
+    """Columns that already lead some index (or are the rowid alias)."""
+    leading = set()
+    cur.execute(f"PRAGMA index_list({_q(table)})")
+    for idx in cur.fetchall():
+        cur.execute(f"PRAGMA index_info({_q(idx[1])})")
+        info = cur.fetchall()
+        if info:
+            leading.add(info[0][2])
+    cur.execute(f"PRAGMA table_info({_q(table)})")
+    for col in cur.fetchall():
+        if col[5] == 1 and (col[2] or "").upper() == "INTEGER":
+            leading.add(col[1])
+    return leading
+
+
+def _estimate_rows(cur, table, profiles):
+    rows = profiles.get(table, {}).get("total_rows")
+    if rows is None:
+        try:
+            cur.execute(f"SELECT MAX(rowid) FROM {_q(table)}")
+            rows = cur.fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            rows = 0
+    return rows
+
+
+_IDENT = r'(?:"[^"]+"|\[[^\]]+\]|`[^`]+`|[\w.]+)'
+_FROM_ITEM = re.compile(rf"\b(?:FROM|JOIN)\s+({_IDENT})(?:\s+(?:AS\s+)?({_IDENT}))?", re.IGNORECASE)
+# Words that can follow a table name in FROM / JOIN and are not an alias
+_NOT_ALIAS = {
+    "where", "join", "inner", "left", "right", "full", "cross", "natural", "outer", "on", "using",
+    "group", "order", "limit", "having", "window", "union", "except", "intersect", "indexed", "not",
+}
+
+
+def _unquote(name):
+    return name.strip('"[]`')
+
+
+def _aliases(sql):
+    """{alias or table name (lowercase): table name} from the FROM / JOIN clauses of sql."""
+    found = {}
+    for table, alias in _FROM_ITEM.findall(sql):
+        table = _unquote(table)
+        found[table.lower()] = table
+        if alias and alias.lower() not in _NOT_ALIAS:
+            found[_unquote(alias).lower()] = table
+    return found
+
+
+def _scanned_tables(cur, sql):
+    """Tables the query plan reads with a full scan (no index); aliases resolved to table names."""
+    try:
+        cur.execute("EXPLAIN QUERY PLAN " + sql)
+    except sqlite3.Error:
+        return set()
+    aliases = _aliases(sql)
+    scanned = set()
+    for row in cur.fetchall():
+        # "SCAN p" (current SQLite prints the alias) or "SCAN TABLE products AS p" (before 3.36)
+        m = re.match(r"SCAN (?:TABLE )?(\S+)", row[-1])
+        if m and "USING" not in row[-1]:
+            name = _unquote(m.group(1))
+            scanned.add(aliases.get(name.lower(), name))
+    return scanned
+
+
+def _predicate_columns(sql, columns):
+    """Columns of a table that appear in WHERE / ON / GROUP BY / ORDER BY clauses of sql."""
+    clauses = re.split(r"\b(?:WHERE|ON|GROUP\s+BY|ORDER\s+BY)\b", sql, flags=re.IGNORECASE)[1:]
+    text = " ".join(clauses)
+    return [c for c in columns if re.search(rf"(?<![\w]){re.escape(c)}(?![\w])", text)]
+
+
+def recommend(metadata=None, profiles=None, history=None, min_rows=MIN_ROWS):
+    """
+    Candidate single-column indexes, best first:
+    [{"table", "column", "reasons": [...], "rows", "benefit", "sql"}].
+    benefit ≈ weighted uses × row visits saved per lookup (rows − log2 rows).
+    """
+    if DB_TYPE != "sqlite":
+        raise NotImplementedError("The index advisor supports only SQLite.")
+    metadata = metadata or load_json(ARTIFACTS_DIR / "metadata.json")
+    if profiles is None:
+        path = ARTIFACTS_DIR / "profiles.json"
+        profiles = load_json(path) if path.exists() else {}
+    history = _load_history() if history is None else history
+    tables = metadata.get("tables", {})
+
+    candidates = {}
+
+    def add(table, column, reason):
+        if table in tables and any(c["column_name"] == column for c in tables[table]):
+            candidates.setdefault((table, column), []).append(reason)
+
+    for table, cols in tables.items():
+        pks = [c["column_name"] for c in cols if c.get("primary_key")]
+        # profiler groups by the full PK; a leading-column index serves that GROUP BY
+        if pks:
+            add(table, pks[0], "primary_key")
+        for col in detect_date_columns(cols):
+            add(table, col, "freshness")
+    for r in metadata.get("relationships", []):
+        add(r.get("table"), r.get("column"), "join_key")
+        add(r.get("ref_table"), r.get("ref_column"), "join_key")
+
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    try:
+        for sql in history:
+            for table in _scanned_tables(cur, sql):
+                if table in tables:
+                    for col in _predicate_columns(sql, [c["column_name"] for c in tables[table]]):
+                        add(table, col, "query")
+
+        results = []
+        existing = {}
+        for (table, column), reasons in candidates.items():
+            if table not in existing:
+                existing[table] = _existing_leading_columns(cur, table)
+            if column in existing[table]:
+                continue
+            rows = _estimate_rows(cur, table, profiles)
+            if rows < min_rows:
+                continue
+            saved = rows - math.log2(max(rows, 2))
+            benefit = sum(REASON_WEIGHTS[r] for r in reasons) * saved
+            name = INDEX_PREFIX + re.sub(r"\W", "_", f"{table}_{column}")
+            results.append({
+                "table": table,
+                "column": column,
+                "reasons": sorted(set(reasons)),
+                "rows": rows,
+                "benefit": round(benefit),
+                "sql": f"CREATE INDEX IF NOT EXISTS {_q(name)} ON {_q(table)} ({_q(column)})",
+            })
+    finally:
+        conn.close()
+    return sorted(results, key=lambda r: r["benefit"], reverse=True)
+
+
+def _time_queries(history, repeat=3):
+    """
+    Best-of-repeat wall time per recorded query (seconds), on a read-only connection.
+    Rows are read and dropped one at a time, so a large result does not pile up in memory.
+    """
+    conn = sqlite3.connect(Path(DB_PATH).resolve().as_uri() + "?mode=ro", uri=True)
+    timings = {}
+    try:
+        for sql in history:
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                try:
+                    for _ in conn.execute(sql):
+                        pass
+                except sqlite3.Error:
+                    best = None
+                    break
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            if best is not None:
+                timings[sql] = best
+    finally:
+        conn.close()
+    return timings
+
+
+def apply(recommendations, top=None, measure=True):
+    """
+    Create the recommended indexes (all, or the top N) in one transaction, then ANALYZE.
+    With measure=True, replays the MEASURE_QUERIES most recent recorded queries before
+    and after and reports the speedup.
+    """
+    chosen = recommendations[:top] if top else recommendations
+    history = _load_history(MEASURE_QUERIES) if measure else []
+    before = _time_queries(history) if history else {}
+
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        conn.execute("BEGIN")
+        for rec in chosen:
+            conn.execute(rec["sql"])
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    build_seconds = time.perf_counter() - t0
+
+    after = _time_queries(history) if history else {}
+    queries = []
+    for sql, old in before.items():
+        new = after.get(sql)
+        if new is not None:
+            queries.append({
+                "sql": sql,
+                "before_s": round(old, 6),
+                "after_s": round(new, 6),
+                "speedup": round(old / new, 2) if new > 0 else None,
+            })
+    total_before = sum(q["before_s"] for q in queries)
+    total_after = sum(q["after_s"] for q in queries)
+    return {
+        "created": [rec["sql"] for rec in chosen],
+        "build_seconds": round(build_seconds, 3),
+        "queries": queries,
+        "total_before_s": round(total_before, 6),
+        "total_after_s": round(total_after, 6),
+        "speedup": round(total_before / total_after, 2) if total_after > 0 else None,
+    }
+
+
+def run_and_apply(metadata=None, profiles=None, top=None, measure=False):
+    """Pipeline stage: recommend, create, and print a short report (no query replay unless measure=True)."""
+    recs = recommend(metadata, profiles)
+    if not recs:
+        print("Index advisor: no new indexes recommended.")
+        return {"created": [], "queries": []}
+    result = apply(recs, top=top, measure=measure)
+    print(f"Index advisor: created {len(result['created'])} indexes in {result['build_seconds']:.2f}s")
+    if result["queries"]:
+        print(
+            f"Index advisor: recorded queries {result['total_before_s']:.4f}s → "
+            f"{result['total_after_s']:.4f}s ({result['speedup']}x)"
+        )
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recommend and optionally create SQLite indexes.")
+    parser.add_argument("--apply", action="store_true", help="Create the recommended indexes")
+    parser.add_argument("--top", type=int, help="Only the N highest-benefit indexes")
+    args = parser.parse_args()
+    recs = recommend()
+    for rec in recs[:args.top] if args.top else recs:
+        print(f"{rec['benefit']:>12,}  {rec['table']}.{rec['column']}  ({', '.join(rec['reasons'])}; {rec['rows']} rows)")
+    if args.apply and recs:
+        result = apply(recs, top=args.top)
+        print(f"Created {len(result['created'])} indexes in {result['build_seconds']:.2f}s")
+        for q in result["queries"]:
+            print(f"  {q['before_s']:.4f}s → {q['after_s']:.4f}s ({q['speedup']}x)  {q['sql'][:80]}")
+        if result["queries"]:
+            print(f"Recorded queries: {result['total_before_s']:.4f}s → {result['total_after_s']:.4f}s ({result['speedup']}x)")
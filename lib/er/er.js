@@ -0,0 +1,119 @@
+// ER diagram component: speaks Streamlit's component postMessage protocol directly
+// (no build step). Redraws only when the graph version changes, so reruns with the
+// same artifacts cost nothing beyond the message itself.
+(function () {
+  var renderedVersion = null;
+
+  function send(type, data) {
+    var message = { isStreamlitMessage: true, type: type };
+    for (var k in data || {}) message[k] = data[k];
+    window.parent.postMessage(message, "*");
+  }
+
+  var clicks = 0;
+  function navigate(action, id) {
+    clicks += 1;
+    send("streamlit:setComponentValue", {
+      value: { action: action, id: id, nonce: Date.now() + ":" + clicks },
+      dataType: "json"
+    });
+  }
+
+  function showMessage(text) {
+    document.getElementById("er-graph").innerHTML = '<div class="er-message">' + text + "</div>";
+  }
+
+  function draw(graph) {
+    if (typeof vis === "undefined") {
+      showMessage("Diagram library could not load. Refresh the page or check the console.");
+      return;
+    }
+    var container = document.getElementById("er-graph");
+    container.innerHTML = "";
+    var nodes = new vis.DataSet(graph.nodes);
+    var edges = new vis.DataSet(graph.edges);
+    var allNodes = nodes.get().slice();
+    var allEdges = edges.get().slice();
+    // Positions come precomputed (er_layout.py): no physics or hierarchical pass in the browser
+    var options = {
+      interaction: {
+        dragNodes: false,
+        dragView: true,
+        zoomView: true,
+        hover: true,
+        selectable: true,
+        selectConnectedEdges: true,
+        navigationButtons: false,
+        keyboard: false,
+        tooltipDelay: 100
+      },
+      physics: { enabled: false },
+      edges: { smooth: { type: "curvedCW", roundness: 0.2 } }
+    };
+
+    var network = new vis.Network(container, { nodes: nodes, edges: edges }, options);
+    network.once("afterDrawing", function () {
+      network.fit({ animation: { duration: 300 } });
+    });
+
+    function showOnlyConnected(nodeId) {
+      var connectedIds = new Set([nodeId]);
+      allEdges.forEach(function (e) {
+        if (e.from === nodeId || e.to === nodeId) {
+          connectedIds.add(e.from);
+          connectedIds.add(e.to);
+        }
+      });
+      nodes.clear();
+      nodes.add(allNodes.filter(function (n) { return connectedIds.has(n.id); }));
+      edges.clear();
+      edges.add(allEdges.filter(function (e) { return connectedIds.has(e.from) && connectedIds.has(e.to); }));
+      network.fit({ animation: { duration: 250 } });
+    }
+
+    function showAll() {
+      nodes.clear();
+      nodes.add(allNodes);
+      edges.clear();
+      edges.add(allEdges);
+      network.fit({ animation: { duration: 250 } });
+    }
+
+    // Groups and (in a partial view) tables load a new view from the server;
+    // with every table on screen, focusing happens right here.
+    network.on("click", function (params) {
+      if (params.nodes.length === 0) return;
+      var node = nodes.get(params.nodes[0]);
+      if (node.kind === "cluster") {
+        navigate("cluster", node.cluster);
+      } else if (graph.complete) {
+        showOnlyConnected(node.id);
+      } else {
+        navigate("table", node.id);
+      }
+    });
+    network.on("doubleClick", function () {
+      if (graph.view === "overview") showAll();
+      else navigate("overview", null);
+    });
+  }
+
+  window.addEventListener("message", function (event) {
+    var data = event.data;
+    if (!data || data.type !== "streamlit:render") return;
+    var args = data.args || {};
+    var height = args.height || 900;
+    document.getElementById("er-graph").style.height = (height - 36) + "px";
+    send("streamlit:setFrameHeight", { height: height });
+    if (args.version === renderedVersion) return;
+    renderedVersion = args.version;
+    if (!args.graph) {
+      showMessage("No tables to draw.");
+      return;
+    }
+    // Sent as a JSON string built once per version on the server
+    draw(typeof args.graph === "string" ? JSON.parse(args.graph) : args.graph);
+  });
+
+  send("streamlit:componentReady", { apiVersion: 1 });
+})();
@@ -0,0 +1,28 @@
+// Relationship graph for the static site: draws window.GRAPH ({nodes, edges})
+// with the bundled vis-network; clicking a table opens its page.
+(function () {
+  document.addEventListener("DOMContentLoaded", function () {
+    var container = document.getElementById("graph");
+    var data = window.GRAPH;
+    if (!container || !data || !data.nodes.length) return;
+    if (typeof vis === "undefined") {
+      container.textContent = "Diagram library could not load.";
+      return;
+    }
+    var network = new vis.Network(container, {
+      nodes: new vis.DataSet(data.nodes),
+      edges: new vis.DataSet(data.edges)
+    }, {
+      interaction: { hover: true, dragNodes: true, zoomView: true },
+      physics: { stabilization: { iterations: 200 } },
+      nodes: { shape: "box", font: { face: "monospace", color: "#e6edf3" }, color: { background: "#161b22", border: "#58a6ff" } },
+      edges: { arrows: { to: { enabled: true, scaleFactor: 0.6 } }, color: { color: "#8b949e" }, font: { size: 10, color: "#8b949e", strokeWidth: 0 } }
+    });
+    network.once("stabilizationIterationsDone", function () { network.setOptions({ physics: false }); });
+    network.on("doubleClick", function (params) {
+      if (!params.nodes.length) return;
+      var node = data.nodes.filter(function (n) { return n.id === params.nodes[0]; })[0];
+      if (node && node.url) window.location = node.url;
+    });
+  });
+})();
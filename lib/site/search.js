@@ -0,0 +1,132 @@
+// Client-side search for the static data dictionary site.
+// The index is prebuilt by doc_generator.render_site: search/meta.js lists the
+// shard keys and table pages, and search/<key>.js holds the terms starting with
+// <key> (the first two characters, or three for crowded prefixes). Shards are loaded with <script> tags on demand,
+// so the site works from file:// with no server.
+(function () {
+  var script = document.currentScript;
+  var root = script.getAttribute("data-root") || "";
+  var meta = null;
+  var shards = {};
+  var waiting = {};
+  var MAX_RESULTS = 50;
+
+  function load(name, cb) {
+    if (waiting[name]) { waiting[name].push(cb); return; }
+    waiting[name] = [cb];
+    var s = document.createElement("script");
+    s.src = root + "search/" + name + ".js";
+    s.onerror = function () { done(name); };
+    document.head.appendChild(s);
+  }
+
+  function done(name) {
+    var cbs = waiting[name] || [];
+    delete waiting[name];
+    cbs.forEach(function (cb) { cb(); });
+  }
+
+  window.__searchMeta = function (data) {
+    meta = data;
+    meta.keySet = {};
+    data.keys.forEach(function (k) { meta.keySet[k] = true; });
+    done("meta");
+  };
+  window.__searchShard = function (key, data) { shards[key] = data; done(key); };
+
+  function ensure(keys, cb) {
+    if (!meta) { load("meta", function () { if (meta) ensure(keys, cb); }); return; }
+    var missing = keys.filter(function (k) { return !(k in shards) && meta.keySet[k]; });
+    if (!missing.length) { cb(); return; }
+    var left = missing.length;
+    missing.forEach(function (k) {
+      load(k, function () {
+        if (!(k in shards)) shards[k] = {};
+        if (--left === 0) cb();
+      });
+    });
+  }
+
+  // Every query word must match (as a prefix of an indexed term) either the
+  // column itself or its table; scores add up, exact term matches count double.
+  function search(query, cb) {
+    var words = (query.toLowerCase().match(/[a-z0-9]+/g) || []).filter(function (w) { return w.length > 1; });
+    if (!words.length) { cb([]); return; }
+    if (!meta) { load("meta", function () { if (meta) search(query, cb); }); return; }
+    // Shards that can hold terms starting with w: keys that are a prefix of w, or extend it
+    var keysFor = words.map(function (w) {
+      return meta.keys.filter(function (k) { return w.lastIndexOf(k, 0) === 0 || k.lastIndexOf(w, 0) === 0; });
+    });
+    var keys = [];
+    keysFor.forEach(function (ks) { ks.forEach(function (k) { if (keys.indexOf(k) < 0) keys.push(k); }); });
+    ensure(keys, function () {
+      var perWord = words.map(function (w, i) {
+        var scores = {};
+        keysFor[i].forEach(function (k) {
+          var shard = shards[k] || {};
+          for (var term in shard) {
+            if (term.lastIndexOf(w, 0) !== 0) continue;
+            var boost = term === w ? 2 : 1;
+            shard[term].forEach(function (p) {
+              var id = p[0] + "\u0000" + p[1];
+              var score = p[2] * boost;
+              if (!(scores[id] >= score)) scores[id] = score;
+            });
+          }
+        });
+        return scores;
+      });
+      var candidates = {};
+      perWord.forEach(function (scores) { for (var id in scores) candidates[id] = true; });
+      var results = [];
+      for (var id in candidates) {
+        var parts = id.split("\u0000");
+        var tableId = parts[0] + "\u0000";
+        var total = 0;
+        for (var i = 0; i < perWord.length; i++) {
+          var s = perWord[i][id] || perWord[i][tableId] || 0;
+          if (!s) { total = 0; break; }
+          total += s;
+        }
+        if (total) results.push({ table: parts[0], column: parts[1], score: total });
+      }
+      results.sort(function (a, b) {
+        return b.score - a.score || a.table.localeCompare(b.table) || a.column.localeCompare(b.column);
+      });
+      cb(results.slice(0, MAX_RESULTS));
+    });
+  }
+
+  function render(list, results) {
+    list.innerHTML = "";
+    results.forEach(function (r) {
+      var li = document.createElement("li");
+      var a = document.createElement("a");
+      a.href = root + "tables/" + meta.pages[r.table] + (r.column ? "#col-" + encodeURIComponent(r.column) : "");
+      a.textContent = r.column ? r.table + "." + r.column : r.table;
+      li.className = r.column ? "column" : "table";
+      li.appendChild(a);
+      list.appendChild(li);
+    });
+    list.style.display = results.length ? "block" : "none";
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    var input = document.getElementById("search");
+    var list = document.getElementById("search-results");
+    if (!input || !list) return;
+    var timer = null;
+    var latest = 0;
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var ticket = ++latest;
+        search(input.value, function (results) { if (ticket === latest) render(list, results); });
+      }, 60);
+    });
+    input.addEventListener("keydown", function (e) {
+      if (e.key === "Enter" && list.firstChild) window.location = list.firstChild.firstChild.href;
+      if (e.key === "Escape") { list.style.display = "none"; input.blur(); }
+    });
+  });
+})();
@@ -0,0 +1,164 @@
+"""
+Pluggable LLM backends: Gemini, OpenAI, template-only, and a deterministic local stub.
+SDK clients are built lazily on first use, so importing this module (or ai_engine)
+is cheap and works offline without any API key.
+"""
+import json
+import re
+import time
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    LLM_BACKEND,
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    STUB_LATENCY_MS,
+)
+
+
+class LLMBackend:
+    """Base backend. Subclasses implement stream(prompt) as a generator of text chunks."""
+
+    name = "base"
+    # False for backends that cannot follow free-form prompts (callers use templates instead)
+    generative = True
+
+    def stream(self, prompt):
+        raise NotImplementedError
+
+    def complete(self, prompt):
+        return "".join(self.stream(prompt)).strip()
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, api_key=GEMINI_API_KEY, model=GEMINI_MODEL):
+        self.api_key = api_key
+        self.model = model
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("❌ GEMINI_API_KEY not found in environment variables")
+            from google import genai
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def stream(self, prompt):
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=prompt):
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key=OPENAI_API_KEY, model=OPENAI_MODEL):
+        self.api_key = api_key
+        self.model = model
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("❌ OPENAI_API_KEY not found in environment variables")
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key)
+        return self._client
+
+    def stream(self, prompt):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class TemplateBackend(LLMBackend):
+    """No model at all: ai_engine falls back to template summaries and keyword answers."""
+
+    name = "template"
+    generative = False
+
+    def stream(self, prompt):
+        raise RuntimeError("The template backend cannot answer free-form prompts.")
+
+
+class StubBackend(LLMBackend):
+    """Deterministic local backend: streams a canned answer (JSON for summaries, SQL for NL→SQL) word by word with fixed latency."""
+
+    name = "stub"
+
+    def __init__(self, latency_ms=STUB_LATENCY_MS):
+        self.latency_ms = latency_ms
+
+    def _answer(self, prompt):
+        if "Write ONLY a valid SQL query." in prompt:
+            return self._sql(prompt)
+        if '{"summary": "...", "recommendations"' in prompt:
+            return json.dumps({
+                "summary": f"(stub) Summary for a {len(prompt)}-character prompt.",
+                "recommendations": ["(stub) Check completeness.", "(stub) Index join keys."],
+            })
+        return f"(stub) Received a {len(prompt)}-character prompt. This is a canned offline answer."
+
+    @staticmethod
+    def _sql(prompt):
+        """COUNT(*) over the schema table the question mentions (else the first table)."""
+        match = re.search(r"Database schema:\s*(\{.*?\n\})\s*\n", prompt, re.S)
+        tables = list(json.loads(match.group(1))) if match else []
+        question = prompt.rsplit("Question:", 1)[-1].lower()
+        mentioned = [t for t in tables if t.lower() in question]
+        table = (mentioned or tables or ["sqlite_master"])[0]
+        return f'SELECT COUNT(*) FROM "{table}"'
+
+    def stream(self, prompt):
+        delay = self.latency_ms / 1000.0
+        words = self._answer(prompt).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(delay)
+            yield word if i == 0 else " " + word
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "openai": OpenAIBackend,
+    "template": TemplateBackend,
+    "stub": StubBackend,
+}
+
+_backend = None
+
+
+def _auto_backend_name():
+    if GEMINI_API_KEY:
+        return "gemini"
+    if OPENAI_API_KEY:
+        return "openai"
+    return "template"
+
+
+def get_backend():
+    """Return the configured backend (LLM_BACKEND; 'auto' picks by available API key). Cached."""
+    global _backend
+    if _backend is None:
+        name = LLM_BACKEND if LLM_BACKEND != "auto" else _auto_backend_name()
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown LLM_BACKEND: {name}. Use auto, {', '.join(BACKENDS)}.")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    """Override the process-wide backend (an LLMBackend instance or a name from BACKENDS)."""
+    global _backend
+    _backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+    return _backend
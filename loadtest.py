@@ -0,0 +1,267 @@
+"""
+Load test for the chat and SQL paths.
+
+Simulated analysts (threads, like Streamlit sessions) concurrently call
+ai_engine.answer_question, generate_sql and execute_sql, drawing from a
+question/SQL corpus built from the current artifacts (metadata.json and
+relationships). Popular questions repeat more often (Zipf), as they would with
+real users. The LLM is the local stub with configurable latency, so the results
+show the app's own overhead and contention, not the provider's.
+
+Each scenario is run once per connection pool / SQL cache variant (see VARIANTS)
+and per concurrency level. Reported per operation: p50/p95/p99/max latency,
+error count, and overall throughput. Results are printed and written to
+artifacts/loadtests/<time>.json. Needs the artifacts from pipeline.py.
+
+    python3 loadtest.py --users 1,8,32 --requests 400 --stub-latency-ms 5
+"""
+import itertools
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import ai_engine
+from catalog_model import get_shared_model
+from config import ARTIFACTS_DIR, CONNECTION_POOL_SIZE, SQL_CACHE_SIZE
+from llm_backends import StubBackend, set_backend
+
+LOADTEST_DIR = ARTIFACTS_DIR / "loadtests"
+OPERATIONS = ("answer", "generate_sql", "execute_sql")
+DEFAULT_MIX = {"answer": 0.4, "generate_sql": 0.3, "execute_sql": 0.3}
+# Connection pool size / generated-SQL cache size per variant
+VARIANTS = {
+    "pooled+cache": {"pool_size": CONNECTION_POOL_SIZE or 8, "sql_cache_size": SQL_CACHE_SIZE or 256},
+    "no-pool": {"pool_size": 0, "sql_cache_size": SQL_CACHE_SIZE or 256},
+    "no-cache": {"pool_size": CONNECTION_POOL_SIZE or 8, "sql_cache_size": 0},
+    "neither": {"pool_size": 0, "sql_cache_size": 0},
+}
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# --------------------------------------------------
+# Corpus
+# --------------------------------------------------
+
+def build_corpus(metadata, seed=7, per_operation=200):
+    """
+    {"answer": [questions], "generate_sql": [questions], "execute_sql": [sql]} from the
+    catalog's tables, columns and relationships, each list shuffled and capped at per_operation.
+    """
+    rng = random.Random(seed)
+    tables = {t: [c["column_name"] for c in cols] for t, cols in metadata["tables"].items()}
+    rels = [r for r in metadata.get("relationships", []) if r.get("table") in tables and r.get("ref_table") in tables]
+    corpus = {op: [] for op in OPERATIONS}
+    for t, cols in tables.items():
+        corpus["answer"] += [
+            f"What does the {t} table contain?",
+            f"What is the data quality of {t}?",
+            f"Which columns of {t} have missing values?",
+        ]
+        corpus["generate_sql"] += [f"How many rows are in {t}?", f"Show the latest 10 rows of {t}"]
+        corpus["execute_sql"] += [f"SELECT COUNT(*) FROM {_q(t)}", f"SELECT * FROM {_q(t)} LIMIT 100"]
+        for c in cols[:4]:
+            corpus["answer"].append(f"What is {c} in {t}?")
+            corpus["generate_sql"].append(f"What are the most common values of {c} in {t}?")
+            corpus["execute_sql"].append(
+                f"SELECT {_q(c)}, COUNT(*) FROM {_q(t)} GROUP BY 1 ORDER BY 2 DESC LIMIT 10"
+            )
+    for r in rels:
+        corpus["answer"].append(f"How is {r['table']} linked to {r['ref_table']}?")
+        corpus["generate_sql"].append(f"How many {r['table']} rows match a {r['ref_table']} row?")
+        corpus["execute_sql"].append(
+            f"SELECT COUNT(*) FROM {_q(r['table'])} a JOIN {_q(r['ref_table'])} b "
+            f"ON a.{_q(r['column'])} = b.{_q(r['ref_column'])}"
+        )
+    for op in OPERATIONS:
+        rng.shuffle(corpus[op])
+        corpus[op] = corpus[op][:per_operation]
+    return corpus
+
+
+def _plan(corpus, requests, mix, seed, skew=1.0):
+    """Pre-drawn (operation, item) list: operations by mix, items Zipf-weighted so popular ones repeat."""
+    rng = random.Random(seed)
+    ops = [op for op in OPERATIONS if mix.get(op, 0) > 0 and corpus[op]]
+    if not ops:
+        raise ValueError("Nothing to run: the mix selects no operation with a non-empty corpus.")
+    weights = {op: [1.0 / (k + 1) ** skew for k in range(len(corpus[op]))] for op in ops}
+    chosen = rng.choices(ops, weights=[mix[op] for op in ops], k=requests)
+    return [(op, rng.choices(corpus[op], weights=weights[op])[0]) for op in chosen]
+
+
+# --------------------------------------------------
+# Runner
+# --------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _latency_stats(samples):
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 2) if ms else None,
+        "p99_ms": round(percentile(ms, 99), 2) if ms else None,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else None,
+        "max_ms": round(ms[-1], 2) if ms else None,
+    }
+
+
+def run_load(artifacts, corpus, users=8, requests=200, mix=None, think_ms=0.0, seed=7):
+    """
+    Run `requests` calls spread over `users` threads (closed loop, optional think time
+    between a user's requests). Returns {"users", "requests", "seconds", "throughput_rps",
+    "all": latency stats, "operations": {op: latency stats + errors}}.
+    """
+    metadata, profiles, summaries = artifacts
+    plan = _plan(corpus, requests, mix or DEFAULT_MIX, seed)
+    calls = {
+        "answer": lambda q: (ai_engine.answer_question(q, metadata, profiles, summaries), None),
+        "generate_sql": lambda q: _check_sql(ai_engine.generate_sql(q, metadata)),
+        "execute_sql": lambda sql: ai_engine.execute_sql(sql),
+    }
+    next_index = itertools.count()
+    samples = {op: [] for op in OPERATIONS}
+    errors = {op: 0 for op in OPERATIONS}
+    lock = threading.Lock()
+
+    def user():
+        while True:
+            i = next(next_index)
+            if i >= len(plan):
+                return
+            op, item = plan[i]
+            t0 = time.perf_counter()
+            try:
+                result, error = calls[op](item)
+                failed = result is None and error is not None
+            except Exception:
+                failed = True
+            seconds = time.perf_counter() - t0
+            with lock:
+                samples[op].append(seconds)
+                errors[op] += failed
+            if think_ms:
+                time.sleep(think_ms / 1000.0)
+
+    threads = [threading.Thread(target=user, name=f"user-{n}", daemon=True) for n in range(users)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - started
+    return {
+        "users": users,
+        "requests": len(plan),
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(plan) / seconds, 1) if seconds > 0 else None,
+        "all": _latency_stats([s for op in OPERATIONS for s in samples[op]]),
+        "operations": {
+            op: {**_latency_stats(samples[op]), "errors": errors[op]} for op in OPERATIONS if samples[op]
+        },
+    }
+
+
+def _check_sql(sql):
+    if not sql or sql.lstrip().startswith("--"):
+        return None, sql or "empty SQL"
+    return sql, None
+
+
+def run_scenarios(users_levels=(1, 8, 32), requests=200, variants=None, mix=None, think_ms=0.0,
+                  stub_latency_ms=5.0, seed=7):
+    """Run every variant × concurrency level on the current artifacts with the stub LLM."""
+    if not (ARTIFACTS_DIR / "metadata.json").exists():
+        raise RuntimeError("No artifacts found: run python3 pipeline.py first.")
+    artifacts = get_shared_model().as_artifacts()
+    corpus = build_corpus(artifacts[0], seed=seed)
+    set_backend(StubBackend(latency_ms=stub_latency_ms))
+    history_path = ai_engine.QUERY_HISTORY_PATH
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep synthetic queries out of the history read by index_advisor (the write itself still happens)
+        ai_engine.QUERY_HISTORY_PATH = Path(tmp) / "query_history.jsonl"
+        try:
+            for name in variants or VARIANTS:
+                for users in users_levels:
+                    ai_engine.configure(**VARIANTS[name])
+                    result = run_load(artifacts, corpus, users=users, requests=requests, mix=mix,
+                                      think_ms=think_ms, seed=seed)
+                    runs.append({"variant": name, **VARIANTS[name], **result})
+        finally:
+            ai_engine.QUERY_HISTORY_PATH = history_path
+            ai_engine.configure(pool_size=CONNECTION_POOL_SIZE, sql_cache_size=SQL_CACHE_SIZE)
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "requests": requests,
+        "stub_latency_ms": stub_latency_ms,
+        "think_ms": think_ms,
+        "mix": mix or DEFAULT_MIX,
+        "corpus": {op: len(items) for op, items in corpus.items()},
+        "runs": runs,
+    }
+
+
+def format_report(report):
+    lines = [
+        f"Load test: {report['requests']} requests per run, stub LLM {report['stub_latency_ms']} ms/chunk, "
+        f"corpus {report['corpus']}",
+        f"{'variant':<14} {'users':>5} {'operation':<13} {'n':>5} {'err':>4} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}",
+    ]
+    for run in report["runs"]:
+        rows = [("all", {**run["all"], "errors": sum(o["errors"] for o in run["operations"].values())})]
+        rows += list(run["operations"].items())
+        for op, s in rows:
+            rps = f"{run['throughput_rps']:>8}" if op == "all" else ""
+            lines.append(
+                f"{run['variant']:<14} {run['users']:>5} {op:<13} {s['count']:>5} {s['errors']:>4} "
+                f"{s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {rps}"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent load test of answer_question / generate_sql / execute_sql.")
+    parser.add_argument("--users", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per variant and concurrency level")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help=f"Comma-separated subset of {', '.join(VARIANTS)}")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="Operation weights, e.g. answer=1,execute_sql=1")
+    parser.add_argument("--stub-latency-ms", type=float, default=5.0, help="Stub LLM latency per streamed chunk")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between one user's requests")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Result JSON path (default artifacts/loadtests/<time>.json)")
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown:
+        parser.error(f"Unknown variant(s): {', '.join(unknown)}")
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(",") if part)}
+    report = run_scenarios(
+        users_levels=[int(u) for u in args.users.split(",")], requests=args.requests, variants=variants,
+        mix=mix, think_ms=args.think_ms, stub_latency_ms=args.stub_latency_ms, seed=args.seed,
+    )
+    print(format_report(report))
+    LOADTEST_DIR.mkdir(parents=True, exist_ok=True)
+    output = args.output or LOADTEST_DIR / f"{datetime.now():%Y%m%dT%H%M%S}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
@@ -1,54 +1,261 @@
 """
 Full pipeline: extract metadata → profile → AI summaries → save artifacts (JSON + Markdown).
-Optionally exports table row data to JSON (see EXPORT_TABLE_DATA).
+Profiling and summaries run per table through dag_executor, so a table is
+summarized as soon as it has been profiled. Optionally exports table row data
+to JSON (see EXPORT_TABLE_DATA).
+
+run_pipeline / refresh_tables take an optional progress(stage, done=None, total=None)
+callback; refresh_jobs.py uses it to report a background run to the UI.
 """
 import os
+import threading
 from pathlib import Path
-from config import ARTIFACTS_DIR
-from storage import load_json, save_json
+from config import ARTIFACTS_DIR, ARTIFACT_STORE_DIR, PROFILE_WORKERS, SUMMARY_WORKERS
+from dag_executor import DagExecutor, PipelineState, Stage, format_stats
+from db_connector import get_connection
+from storage import ArtifactStore, load_json, publish_json, read_json_set, save_json
 from metadata_extractor import extract_metadata, run_and_save as extract_and_save
-from profiler import profile_all, run_and_save as profile_and_save
+from profiler import profile_table
+from profile_history import format_report as history_report, record_profiles
 from ai_engine import generate_table_summary
-from doc_generator import run_and_save as docs_save
+from llm_backends import get_backend
+from doc_generator import (
+    DATA_DICTIONARY_MAX_TABLES, render_docs, render_site, run_and_save as docs_save,
+    run_and_save_from_catalog as docs_save_from_catalog,
+)
+from catalog_db import open_catalog, write_catalog
+import tracing
+from tracing import span
 
 
-def run_pipeline():
-    """Run full pipeline and save all artifacts."""
-    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+def _table_stages(use_cache=True):
+    """Per-table DAG: profile (own DB connection per worker thread) → summary (cached by inputs)."""
+    local = threading.local()
+
+    def profile(table, columns, inputs):
+        if getattr(local, "conn", None) is None:
+            local.conn = get_connection()
+        result = profile_table(local.conn.cursor(), table, columns)
+        tracing.count("profiled_rows", result.get("total_rows") or 0)
+        return result
+
+    def close_connection():
+        if getattr(local, "conn", None) is not None:
+            local.conn.close()
+
+    def summary(table, columns, inputs):
+        return generate_table_summary(table, columns, inputs["profile"])
+
+    backend = get_backend()
+    return [
+        Stage("profile", profile, workers=PROFILE_WORKERS, on_exit=close_connection),
+        Stage(
+            "summary", summary, depends_on=("profile",), workers=SUMMARY_WORKERS,
+            cache=use_cache, version=f"{backend.name}:{getattr(backend, 'model', '')}",
+            # A template summary standing in for a failed LLM call is retried next run
+            cacheable=lambda value: not value.get("fallback"),
+        ),
+    ]
+
+
+def _no_progress(stage, done=None, total=None):
+    pass
 
-    # 1. Extract metadata
-    meta = extract_metadata()
-    save_json(meta, ARTIFACTS_DIR / "metadata.json")
-    print("Saved metadata.json")
 
-    # 2. Profile all tables
-    profiles = profile_and_save(meta)
-    # profiles already saved by profile_and_save
+def _profile_and_summarize(tables, state, use_cache=True, progress=_no_progress, previous=None):
+    """
+    Run the per-table DAG over {table: columns}. Returns (profiles, summaries, failed).
+    A failed table keeps its entries from previous = (profiles, summaries), by default
+    the published artifacts, so one bad table does not drop out of the catalog.
+    """
+    progress("tables", 0, len(tables))
+    with span("tables", tables=len(tables)):
+        report = DagExecutor(_table_stages(use_cache), state).run(
+            {name: cols if isinstance(cols, list) else [] for name, cols in tables.items()},
+            progress=lambda done, total: progress("tables", done, total),
+        )
+    print(format_stats(report))
+    results = report["results"]
+    failed = sorted({t for errs in report["errors"].values() for t in errs})
+    if failed:
+        print(f"Keeping the previous profile and summary of {len(failed)} failed table(s): {', '.join(failed)}")
+        if previous is None:
+            previous = read_json_set(("profiles.json", "summaries.json"), ARTIFACTS_DIR)
+    profiles, summaries = {}, {}
+    for t in tables:
+        if t in failed:
+            for out, old in zip((profiles, summaries), previous):
+                if t in old:
+                    out[t] = old[t]
+        else:
+            profiles[t] = results["profile"][t]
+            # The fallback marker only steers caching; it is not part of the summary
+            summaries[t] = {k: v for k, v in results["summary"][t].items() if k != "fallback"}
+    return profiles, summaries, failed
 
-    # 3. AI summaries per table
+
+def publish(meta, profiles, summaries, progress=_no_progress, failed=()):
+    """
+    Save every artifact derived from metadata, profiles and summaries. The three JSON
+    artifacts are published as one generation (storage.publish_json), so readers see
+    either the previous or the new set; the catalog database swaps in one transaction
+    and docs pages are replaced one by one. Tables in failed are never recorded as
+    removed in the profile history.
+    """
     tables = meta.get("tables", meta)
-    summaries = {}
-    for table_name, columns in tables.items():
-        profile = profiles.get(table_name, {})
-        summaries[table_name] = generate_table_summary(table_name, columns, profile)
-    save_json(summaries, ARTIFACTS_DIR / "summaries.json")
-    print("Saved summaries.json")
-
-    # 4. Markdown documentation
-    docs_save(meta, profiles, summaries)
-
-    # 5. Optional: export table row data to JSON (set EXPORT_TABLE_DATA=1 to enable)
-    if os.getenv("EXPORT_TABLE_DATA", "").strip() in ("1", "true", "yes"):
+
+    # 3. JSON artifacts
+    progress("publish")
+    generation = publish_json(
+        {"metadata.json": meta, "profiles.json": profiles, "summaries.json": summaries}, ARTIFACTS_DIR
+    )
+    print(f"Saved metadata.json, profiles.json, summaries.json (generation {generation})")
+
+    # 3a. Profile history: deduplicated snapshot, metric series, drift alerts
+    progress("history")
+    with span("history"):
+        history = record_profiles(profiles, keep=failed)
+    print(history_report(history))
+
+    # 3b. Per-table artifact store for lazy readers
+    progress("store")
+    with span("store"):
+        ArtifactStore(ARTIFACT_STORE_DIR).write_catalog(meta, profiles, summaries)
+    print("Saved artifact store")
+
+    # 3c. Catalog database (queried by the UI, docs and chat)
+    progress("catalog")
+    with span("catalog"):
+        write_catalog(meta, profiles, summaries)
+    print("Saved catalog.db")
+
+    # 4. Markdown documentation: per-table pages (only changed ones re-rendered) + single file for small catalogs
+    progress("docs")
+    with span("docs") as sp:
+        docs = render_docs()
+        sp.set(rendered=docs["rendered"])
+    print(f"Docs: {docs['rendered']} pages rendered, {docs['unchanged']} unchanged, {docs['removed']} removed")
+    progress("site")
+    with span("site") as sp:
+        site = render_site()
+        sp.set(rendered=site["rendered"])
+    print(f"Site: {site['rendered']} pages rendered, {site['shards_written']} search shards written")
+    if len(tables) <= DATA_DICTIONARY_MAX_TABLES:
+        progress("data_dictionary")
+        catalog = open_catalog()
+        with span("data_dictionary"):
+            if catalog is None:
+                # catalog.db missing or unreadable: build from the artifacts in hand
+                docs_save(meta, profiles, summaries)
+            else:
+                try:
+                    docs_save_from_catalog(catalog)
+                finally:
+                    catalog.close()
+
+    # 5. Optional: export table row data (EXPORT_TABLE_DATA=1 for all rows, =delta for changes since last run)
+    export_mode = os.getenv("EXPORT_TABLE_DATA", "").strip().lower()
+    if export_mode in ("1", "true", "yes", "delta"):
+        progress("export")
+    if export_mode in ("1", "true", "yes"):
         try:
             from export_table_data import export_table_data_to_json
-            export_table_data_to_json(one_file=False)
+            with span("export"):
+                export_table_data_to_json(one_file=False)
             print("Saved artifacts/table_data/*.json")
         except Exception as e:
             print(f"Table data export skipped: {e}")
+    elif export_mode == "delta":
+        try:
+            from export_table_data import export_table_data_delta, format_report
+            with span("export"):
+                delta = export_table_data_delta()
+            print(format_report(delta))
+        except Exception as e:
+            print(f"Table data export skipped: {e}")
+
+
+def _finish_trace():
+    if tracing.enabled():
+        trace_path, trace_summary = tracing.export()
+        print(tracing.format_summary(trace_summary))
+        print(f"Saved trace {trace_path} (open in chrome://tracing or https://ui.perfetto.dev)")
+
+
+def run_pipeline(resume=False, use_cache=True, progress=_no_progress):
+    """
+    Run full pipeline and save all artifacts.
+    resume=True continues an interrupted run from its checkpoints; use_cache=False
+    regenerates summaries even when a table's columns and profile are unchanged.
+    """
+    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    # 1. Extract metadata
+    progress("extract")
+    with span("extract") as sp:
+        meta = extract_metadata()
+        sp.set(tables=len(meta.get("tables", meta)))
+    print(f"Extracted metadata: {len(meta.get('tables', meta))} tables")
 
+    # 1b. Optional: build recommended indexes before profiling (set INDEX_ADVISOR=1)
+    if os.getenv("INDEX_ADVISOR", "").strip() in ("1", "true", "yes"):
+        try:
+            from index_advisor import run_and_apply
+            progress("index_advisor")
+            with span("index_advisor"):
+                run_and_apply(meta)
+        except Exception as e:
+            print(f"Index advisor skipped: {e}")
+
+    # 2. Profile and summarize each table; stages overlap across tables
+    state = PipelineState()
+    state.start_run(resume=resume)
+    if state.resumed:
+        print(f"Resuming pipeline run {state.run_id}")
+    profiles, summaries, failed = _profile_and_summarize(meta.get("tables", meta), state, use_cache, progress)
+
+    publish(meta, profiles, summaries, progress, failed)
+    state.finish_run()
+    state.close()
+    _finish_trace()
     print("Pipeline complete.")
     return meta, profiles, summaries
 
 
+def refresh_tables(meta, changed, profiles, summaries, use_cache=True, progress=_no_progress):
+    """
+    Incremental run for watch mode: re-profile and re-summarize only the `changed`
+    tables, keep the previous profile and summary of every other table in meta (and
+    of changed tables that failed), drop tables that are no longer in meta, and
+    publish. Returns (profiles, summaries, failed).
+    """
+    tables = meta.get("tables", meta)
+    todo = {t: tables[t] for t in changed if t in tables}
+    state = PipelineState()
+    state.start_run()
+    new_profiles, new_summaries, failed = _profile_and_summarize(
+        todo, state, use_cache, progress, previous=(profiles, summaries)
+    )
+    merged_profiles, merged_summaries = {}, {}
+    for t in tables:
+        p, s = (new_profiles, new_summaries) if t in todo else (profiles, summaries)
+        if t in p:
+            merged_profiles[t] = p[t]
+        if t in s:
+            merged_summaries[t] = s[t]
+    profiles, summaries = merged_profiles, merged_summaries
+    publish(meta, profiles, summaries, progress, failed)
+    state.finish_run()
+    state.close()
+    _finish_trace()
+    return profiles, summaries, failed
+
+
 if __name__ == "__main__":
-    run_pipeline()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract, profile, summarize and document the database.")
+    parser.add_argument("--resume", action="store_true", help="Continue the last interrupted run from its checkpoints")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate summaries for unchanged tables")
+    args = parser.parse_args()
+    run_pipeline(resume=args.resume, use_cache=not args.no_cache)
@@ -0,0 +1,417 @@
+"""
+Profile history: every pipeline run's profiles as a deduplicated snapshot, with
+metric time series and drift alerts.
+
+Each table's profile is stored once per distinct content (keyed by its hash),
+and a run records only the tables whose hash changed (or that were removed), so
+an unchanged table costs nothing; the snapshot as of any run is the latest entry
+per table up to it. Metric points (row count, completeness, distinct and null
+counts, key health) are written only when the value changed, as a step series
+indexed by (table, column, metric, time), so "completeness of X over 90 days"
+is one index range scan. Drift is checked only for changed tables, against the
+previous snapshot. Old runs and points are downsampled to one per day, then one
+per week.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import PROFILE_HISTORY_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    profile TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    tables INTEGER,
+    changed INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_runs_ts ON runs (ts);
+-- One row per table per run in which its profile changed; hash NULL = table removed
+CREATE TABLE IF NOT EXISTS snapshot_changes (
+    table_name TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    hash TEXT,
+    PRIMARY KEY (table_name, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_snapshot_run ON snapshot_changes (run_id);
+CREATE INDEX IF NOT EXISTS ix_snapshot_hash ON snapshot_changes (hash);
+CREATE TABLE IF NOT EXISTS points (
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts REAL NOT NULL,
+    value REAL,
+    PRIMARY KEY (table_name, column_name, metric, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    table_name TEXT NOT NULL,
+    column_name TEXT,
+    metric TEXT NOT NULL,
+    previous REAL,
+    current REAL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS ix_alerts_table ON alerts (table_name, ts);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value
+) WITHOUT ROWID;
+"""
+
+DAY = 86400
+WEEK = 7 * DAY
+# Keep every run for RAW_DAYS, then the last run per day; after WEEKLY_AFTER_DAYS the last per week
+RAW_DAYS = 7
+WEEKLY_AFTER_DAYS = 90
+# Alert when a metric moves by at least this much against the previous snapshot
+DRIFT_THRESHOLDS = {
+    "row_count_pct": 20.0,
+    "completeness_drop_pts": 5.0,
+    "distinct_pct": 50.0,
+}
+TABLE_METRICS = ("row_count", "null_pks", "duplicate_pks")
+COLUMN_METRICS = ("completeness_pct", "unique_count", "null_count")
+
+
+def _hash(profile):
+    text = json.dumps(profile, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest(), text
+
+
+def profile_metrics(profile):
+    """{(column, metric): value} for one table profile; table-level metrics use column ''."""
+    key_health = profile.get("key_health") or {}
+    metrics = {
+        ("", "row_count"): profile.get("total_rows"),
+        ("", "null_pks"): key_health.get("null_pks"),
+        ("", "duplicate_pks"): key_health.get("duplicate_pks"),
+    }
+    for column, stats in (profile.get("columns") or {}).items():
+        for metric in COLUMN_METRICS:
+            metrics[(column, metric)] = stats.get(metric)
+    return {k: v for k, v in metrics.items() if v is not None}
+
+
+def _pct_change(previous, current):
+    return (current - previous) / previous * 100 if previous else None
+
+
+def detect_drift(previous, current, thresholds=None):
+    """
+    Drift between two profiles of one table:
+    [{"column", "metric", "previous", "current", "message"}].
+    """
+    thresholds = {**DRIFT_THRESHOLDS, **(thresholds or {})}
+    old, new = profile_metrics(previous), profile_metrics(current)
+    alerts = []
+
+    def alert(column, metric, message, prev=None, cur=None):
+        alerts.append({"column": column or None, "metric": metric, "previous": prev, "current": cur, "message": message})
+
+    prev_rows, cur_rows = old.get(("", "row_count")), new.get(("", "row_count"))
+    if prev_rows is not None and cur_rows is not None:
+        change = _pct_change(prev_rows, cur_rows)
+        if change is not None and abs(change) >= thresholds["row_count_pct"]:
+            alert(None, "row_count", f"row count {prev_rows:,} → {cur_rows:,} ({change:+.1f}%)", prev_rows, cur_rows)
+    for metric in ("null_pks", "duplicate_pks"):
+        prev, cur = old.get(("", metric), 0), new.get(("", metric), 0)
+        if cur > prev:
+            alert(None, metric, f"{metric.replace('_', ' ')} {prev} → {cur}", prev, cur)
+
+    old_columns = {c for c, _ in old if c}
+    new_columns = {c for c, _ in new if c}
+    for column in sorted(old_columns - new_columns):
+        alert(column, "schema", f"column {column} removed")
+    for column in sorted(new_columns - old_columns):
+        alert(column, "schema", f"column {column} added")
+    for column in sorted(old_columns & new_columns):
+        prev, cur = old.get((column, "completeness_pct")), new.get((column, "completeness_pct"))
+        if prev is not None and cur is not None and prev - cur >= thresholds["completeness_drop_pts"]:
+            alert(column, "completeness_pct", f"{column} completeness {prev}% → {cur}%", prev, cur)
+        prev, cur = old.get((column, "unique_count")), new.get((column, "unique_count"))
+        if prev is not None and cur is not None:
+            change = _pct_change(prev, cur)
+            if change is not None and abs(change) >= thresholds["distinct_pct"]:
+                alert(column, "unique_count", f"{column} distinct values {prev:,} → {cur:,} ({change:+.1f}%)", prev, cur)
+    return alerts
+
+
+def _connect(path=None):
+    path = Path(path or PROFILE_HISTORY_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _keep_last_per_bucket(items, bucket_seconds):
+    """ids to keep from [(id, ts)]: the latest per time bucket."""
+    latest = {}
+    for item_id, ts in items:
+        bucket = int(ts // bucket_seconds)
+        if bucket not in latest or ts > latest[bucket][1]:
+            latest[bucket] = (item_id, ts)
+    return {item_id for item_id, _ in latest.values()}
+
+
+class ProfileHistory:
+    """Read/write access to the profile history database. One connection per instance."""
+
+    def __init__(self, path=None):
+        self.path = path or PROFILE_HISTORY_PATH
+        self.conn = _connect(self.path)
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- writing ----------
+
+    def _hashes_as_of(self, run_id=None):
+        """{table: hash} in force at run_id (default: latest run)."""
+        sql = "SELECT table_name, hash, MAX(run_id) FROM snapshot_changes"
+        params = ()
+        if run_id is not None:
+            sql += " WHERE run_id <= ?"
+            params = (run_id,)
+        rows = self.conn.execute(sql + " GROUP BY table_name", params)
+        return {table: digest for table, digest, _ in rows if digest is not None}
+
+    def _blob(self, digest):
+        row = self.conn.execute("SELECT profile FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def record(self, profiles, ts=None, thresholds=None, keep=()):
+        """
+        Store profiles as a new run: new blobs for changed tables only, metric points
+        for changed tables, and drift alerts against the previous snapshot. Tables in
+        keep (e.g. failed to profile this run) keep their snapshot instead of being
+        recorded as removed.
+        Returns {"run_id", "tables", "changed", "new_blobs", "alerts"}.
+        """
+        ts = time.time() if ts is None else ts
+        previous = self._hashes_as_of()
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            run_id = conn.execute("INSERT INTO runs (ts, tables) VALUES (?, ?)", (ts, len(profiles))).lastrowid
+            changed = new_blobs = 0
+            alerts = []
+            changes = []
+            points = []
+            for table, profile in profiles.items():
+                digest, text = _hash(profile)
+                if previous.get(table) == digest:
+                    continue
+                changed += 1
+                changes.append((table, run_id, digest))
+                new_blobs += conn.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, profile) VALUES (?, ?)", (digest, text)
+                ).rowcount
+                old = self._blob(previous[table]) if table in previous else {}
+                old_metrics = profile_metrics(old)
+                points += [
+                    (table, column, metric, ts, value)
+                    for (column, metric), value in profile_metrics(profile).items()
+                    if old_metrics.get((column, metric)) != value
+                ]
+                if table in previous:
+                    for a in detect_drift(old, profile, thresholds):
+                        alerts.append({"table": table, **a})
+            for table in sorted(set(previous) - set(profiles) - set(keep)):
+                changes.append((table, run_id, None))
+                alerts.append({
+                    "table": table, "column": None, "metric": "schema",
+                    "previous": None, "current": None, "message": f"table {table} removed",
+                })
+            conn.executemany("INSERT INTO snapshot_changes (table_name, run_id, hash) VALUES (?, ?, ?)", changes)
+            conn.executemany(
+                "INSERT OR REPLACE INTO points (table_name, column_name, metric, ts, value) VALUES (?, ?, ?, ?, ?)",
+                points,
+            )
+            conn.executemany(
+                "INSERT INTO alerts (run_id, ts, table_name, column_name, metric, previous, current, message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, ts, a["table"], a["column"], a["metric"], a["previous"], a["current"], a["message"])
+                    for a in alerts
+                ],
+            )
+            conn.execute("UPDATE runs SET changed = ? WHERE id = ?", (changed, run_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"run_id": run_id, "tables": len(profiles), "changed": changed, "new_blobs": new_blobs, "alerts": alerts}
+
+    def compact(self, now=None):
+        """
+        Downsample runs and points older than RAW_DAYS to the last one per day, and
+        older than WEEKLY_AFTER_DAYS to the last one per week; drop unreferenced blobs.
+        Only the range not yet compacted is scanned. Returns {"runs_dropped", "points_dropped", "blobs_dropped"}.
+        """
+        now = time.time() if now is None else now
+        conn = self.conn
+        result = {"runs_dropped": 0, "points_dropped": 0, "blobs_dropped": 0}
+        latest_run = conn.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, bucket, age_days in (("daily_until", DAY, RAW_DAYS), ("weekly_until", WEEK, WEEKLY_AFTER_DAYS)):
+                cutoff = (now - age_days * DAY) // bucket * bucket
+                row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+                start = (row[0] // bucket * bucket) if row else 0
+                if cutoff <= start:
+                    continue
+                runs = conn.execute(
+                    "SELECT id, ts FROM runs WHERE ts >= ? AND ts < ?", (start, cutoff)
+                ).fetchall()
+                keep = _keep_last_per_bucket(runs, bucket) | {latest_run}
+                dropped = sorted((run_id for run_id, _ in runs if run_id not in keep), reverse=True)
+                for run_id in dropped:
+                    # Carry the dropped run's changes into the next kept run unless that run (or a
+                    # later dropped one, handled first) already changed the same table
+                    next_kept = conn.execute("SELECT MIN(id) FROM runs WHERE id > ?", (run_id,)).fetchone()[0]
+                    conn.execute("UPDATE OR IGNORE snapshot_changes SET run_id = ? WHERE run_id = ?", (next_kept, run_id))
+                    conn.execute("DELETE FROM snapshot_changes WHERE run_id = ?", (run_id,))
+                    conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+                result["runs_dropped"] += len(dropped)
+                result["points_dropped"] += conn.execute(
+                    "DELETE FROM points WHERE (table_name, column_name, metric, ts) IN ("
+                    " SELECT table_name, column_name, metric, ts FROM ("
+                    "  SELECT table_name, column_name, metric, ts, ROW_NUMBER() OVER ("
+                    "   PARTITION BY table_name, column_name, metric, CAST(ts / ? AS INTEGER) ORDER BY ts DESC"
+                    "  ) AS rn FROM points WHERE ts >= ? AND ts < ?"
+                    " ) WHERE rn > 1)",
+                    (bucket, start, cutoff),
+                ).rowcount
+                conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, cutoff))
+            if result["runs_dropped"]:
+                result["blobs_dropped"] = conn.execute(
+                    "DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM snapshot_changes WHERE hash IS NOT NULL)"
+                ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    # ---------- reading ----------
+
+    def runs(self, limit=50):
+        """Most recent runs first: [{"run_id", "ts", "tables", "changed"}]."""
+        return [
+            {"run_id": r[0], "ts": r[1], "tables": r[2], "changed": r[3]}
+            for r in self.conn.execute("SELECT id, ts, tables, changed FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+        ]
+
+    def snapshot(self, run_id=None, tables=None):
+        """{table: profile} as of run_id (default latest), optionally only the given tables."""
+        hashes = self._hashes_as_of(run_id)
+        if tables is not None:
+            hashes = {t: hashes[t] for t in tables if t in hashes}
+        return {table: self._blob(digest) for table, digest in hashes.items()}
+
+    def series(self, table, metric, column=None, days=90, now=None):
+        """
+        [(ts, value)] for one metric over the last `days`. Points are stored only when
+        the value may have changed, so the series is a step function; the value in
+        force at the start of the window is included as its first point.
+        """
+        now = time.time() if now is None else now
+        start = now - days * DAY
+        key = (table, column or "", metric)
+        before = self.conn.execute(
+            "SELECT value FROM points WHERE table_name = ? AND column_name = ? AND metric = ? AND ts < ? "
+            "ORDER BY ts DESC LIMIT 1",
+            (*key, start),
+        ).fetchone()
+        points = self.conn.execute(
+            "SELECT ts, value FROM points WHERE table_name = ? AND column_name = ? AND metric = ? AND ts >= ? "
+            "ORDER BY ts",
+            (*key, start),
+        ).fetchall()
+        return ([(start, before[0])] if before else []) + points
+
+    def alerts(self, days=None, table=None, limit=200):
+        """Most recent drift alerts first: [{"ts", "table", "column", "metric", "previous", "current", "message"}]."""
+        sql = "SELECT ts, table_name, column_name, metric, previous, current, message FROM alerts WHERE 1 = 1"
+        params = []
+        if days is not None:
+            sql += " AND ts >= ?"
+            params.append(time.time() - days * DAY)
+        if table is not None:
+            sql += " AND table_name = ?"
+            params.append(table)
+        sql += " ORDER BY ts DESC, id LIMIT ?"
+        params.append(limit)
+        keys = ("ts", "table", "column", "metric", "previous", "current", "message")
+        return [dict(zip(keys, r)) for r in self.conn.execute(sql, params)]
+
+
+def record_profiles(profiles, path=None, keep=()):
+    """Pipeline stage: record this run's profiles, downsample old history, return the run report."""
+    history = ProfileHistory(path)
+    try:
+        report = history.record(profiles, keep=keep)
+        report.update(history.compact())
+        return report
+    finally:
+        history.close()
+
+
+def format_report(report):
+    lines = [
+        f"Profile history: run {report['run_id']}, {report['changed']}/{report['tables']} tables changed, "
+        f"{report['new_blobs']} new snapshots stored"
+    ]
+    for a in report["alerts"]:
+        lines.append(f"  drift: {a['table']}: {a['message']}")
+    return "\n".join(lines)
+
+
+def _fmt_ts(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query the profile history.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_series = sub.add_parser("series", help="One metric over time")
+    p_series.add_argument("table")
+    p_series.add_argument("--column", help="Column (omit for table-level metrics)")
+    p_series.add_argument(
+        "--metric", default="completeness_pct", choices=TABLE_METRICS + COLUMN_METRICS,
+    )
+    p_series.add_argument("--days", type=int, default=90)
+    p_alerts = sub.add_parser("alerts", help="Recent drift alerts")
+    p_alerts.add_argument("--days", type=int, default=30)
+    p_alerts.add_argument("--table")
+    sub.add_parser("runs", help="Recorded runs")
+    args = parser.parse_args()
+
+    history = ProfileHistory()
+    try:
+        if args.command == "series":
+            for ts, value in history.series(args.table, args.metric, args.column, args.days):
+                print(f"{_fmt_ts(ts)}  {value}")
+        elif args.command == "alerts":
+            for a in history.alerts(days=args.days, table=args.table):
+                print(f"{_fmt_ts(a['ts'])}  {a['table']}: {a['message']}")
+        else:
+            for r in history.runs():
+                print(f"{r['run_id']:>6}  {_fmt_ts(r['ts'])}  {r['changed']}/{r['tables']} tables changed")
+    finally:
+        history.close()
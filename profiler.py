@@ -10,6 +10,17 @@ def _quote_sqlite(name):
     return f'"{name}"' if " " in name else name
 
 
+def detect_date_columns(columns):
+    """Date-like columns used for freshness: text/date types whose name mentions date or time."""
+    date_columns = []
+    for c in columns:
+        col_name = c["column_name"]
+        if c.get("data_type", "").upper() in ("TEXT", "DATE", "DATETIME", "TIMESTAMP"):
+            if "date" in col_name.lower() or "time" in col_name.lower():
+                date_columns.append(col_name)
+    return date_columns
+
+
 def profile_table(cursor, table_name, columns):
     """Profile one table: completeness, unique counts, freshness (date cols), key health."""
     cursor.execute(f"SELECT COUNT(*) FROM {_quote_sqlite(table_name)}")
@@ -20,7 +31,7 @@ def profile_table(cursor, table_name, columns):
     col_names = [c["column_name"] for c in columns]
     pk_cols = [c["column_name"] for c in columns if c.get("primary_key")]
     column_stats = {}
-    date_columns = []
+    date_columns = detect_date_columns(columns)
 
     for c in columns:
         col_name = c["column_name"]
@@ -37,10 +48,6 @@ def profile_table(cursor, table_name, columns):
             "unique_count": distinct,
             "null_count": total_rows - non_null,
         }
-        # Detect date-like columns for freshness
-        if c.get("data_type", "").upper() in ("TEXT", "DATE", "DATETIME", "TIMESTAMP"):
-            if "date" in col_name.lower() or "time" in col_name.lower():
-                date_columns.append(col_name)
 
     # Freshness: max/min for date columns
     freshness = {}
@@ -0,0 +1,348 @@
+"""
+Background documentation refresh.
+
+request_refresh() records a request and, unless a refresh is already running,
+starts one in a separate worker process (python3 refresh_jobs.py --worker), so
+the Streamlit session that asked for it, and every other session, stays
+responsive. Only one worker runs at a time: it holds an exclusive lock on
+artifacts/refresh/lock for as long as it works. Requests that arrive during a
+run are coalesced: when the run ends, the worker starts one more run if anything
+was requested after the previous run started, however many requests there were.
+watch.py takes the same lock (refresh_lock()) around its incremental refreshes.
+
+The worker reports its progress (stage, tables done / total, ETA) to
+artifacts/refresh/status.json, which read_status() returns to the UI. The
+pipeline publishes the JSON artifacts as one generation (storage.publish_json),
+so readers switch to the new catalog in one step when the run finishes.
+Worker output goes to artifacts/refresh/refresh.log.
+
+    python3 refresh_jobs.py            # request a refresh and follow its progress
+    python3 refresh_jobs.py --status   # print the current status
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import ARTIFACTS_DIR
+from storage import atomic_write_bytes, load_json, save_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+REFRESH_DIR = ARTIFACTS_DIR / "refresh"
+LOCK_PATH = REFRESH_DIR / "lock"
+REQUEST_PATH = REFRESH_DIR / "requested"
+STATUS_PATH = REFRESH_DIR / "status.json"
+LOG_PATH = REFRESH_DIR / "refresh.log"
+# Minimum seconds between status writes while the stage stays the same
+STATUS_INTERVAL = 0.5
+# How long a starting worker keeps trying the lock: is_running() probes hold it for
+# an instant, so only a lock still held after this belongs to another refresh
+LOCK_RETRY_SECONDS = 1.0
+
+STAGE_LABELS = {
+    "extract": "Extracting metadata",
+    "index_advisor": "Building recommended indexes",
+    "tables": "Profiling and summarizing tables",
+    "publish": "Publishing artifacts",
+    "history": "Recording profile history",
+    "store": "Writing artifact store",
+    "catalog": "Writing catalog database",
+    "docs": "Rendering docs",
+    "site": "Rendering static site",
+    "data_dictionary": "Writing data dictionary",
+    "export": "Exporting table data",
+}
+
+# Worker processes started by this process (polled so finished ones are reaped)
+_children = []
+
+
+# --------------------------------------------------
+# Single-flight lock
+# --------------------------------------------------
+
+def _try_lock(f):
+    """Exclusive non-blocking lock on an open file; False if another process holds it."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _try_lock_for(f, seconds):
+    """_try_lock, retried for up to seconds."""
+    deadline = time.monotonic() + seconds
+    while not _try_lock(f):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def _lock(f):
+    """Exclusive lock on an open file, waiting for the holder to release it."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        f.seek(0)
+        try:
+            # LK_LOCK itself gives up after ten one-second attempts
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def refresh_lock():
+    """
+    Hold the single-flight lock for a refresh done outside the worker (watch.py),
+    waiting for a running refresh to finish first. A request made while the lock
+    was held is handed to a new worker on release.
+    """
+    REFRESH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_PATH, "a+b") as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+    if _requested() > _served():
+        _spawn_worker()
+
+
+def is_running():
+    """
+    True while a worker (or watch.py) holds the refresh lock. Probes by taking the
+    lock for an instant, which a worker starting at that moment rides out by
+    retrying for LOCK_RETRY_SECONDS.
+    """
+    REFRESH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_PATH, "a+b") as f:
+        if _try_lock(f):
+            _unlock(f)
+            return False
+        return True
+
+
+def _requested():
+    try:
+        return int(REQUEST_PATH.read_text().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _served():
+    """Request id of the last refresh a worker started (from status.json)."""
+    try:
+        return int(load_json(STATUS_PATH).get("request") or 0)
+    except (OSError, ValueError, TypeError):
+        return 0
+
+
+# --------------------------------------------------
+# Requests and status (called from the UI)
+# --------------------------------------------------
+
+def request_refresh():
+    """
+    Ask for a refresh. Starts a worker process unless one is running; a running
+    worker picks the request up when its current run ends. Returns the request id
+    (the run serving it reports a "request" >= this id in its status).
+    """
+    REFRESH_DIR.mkdir(parents=True, exist_ok=True)
+    request = time.time_ns()
+    atomic_write_bytes(str(request).encode("ascii"), REQUEST_PATH)
+    # A worker re-checks the request file after releasing the lock, so a request
+    # that sees the lock held is never lost.
+    if not is_running():
+        _spawn_worker()
+    return request
+
+
+def _spawn_worker():
+    _children[:] = [p for p in _children if p.poll() is None]
+    log = open(LOG_PATH, "ab")
+    kwargs = {"start_new_session": True} if os.name == "posix" else {}
+    _children.append(subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--worker"],
+        cwd=str(Path(__file__).resolve().parent),
+        stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **kwargs,
+    ))
+    log.close()
+
+
+def read_status():
+    """
+    Last reported status: {"state": "idle" | "running" | "failed", "stage", "label", "done",
+    "total", "eta_s", "started", "finished", "seconds", "pending", "error"}. A "running"
+    status whose worker no longer holds the lock is reported as failed.
+    """
+    try:
+        status = load_json(STATUS_PATH)
+    except (OSError, ValueError):
+        status = {"state": "idle"}
+    if status.get("state") == "running" and not is_running():
+        status = {**status, "state": "failed", "error": status.get("error") or "Refresh worker stopped unexpectedly"}
+    status["pending"] = status.get("state") == "running" and _requested() > status.get("request", 0)
+    return status
+
+
+# --------------------------------------------------
+# Worker
+# --------------------------------------------------
+
+class ProgressReporter:
+    """
+    pipeline progress callback that writes status.json (throttled within a stage).
+    Called from the DAG worker threads, hence the lock.
+    """
+
+    def __init__(self, request):
+        self.lock = threading.Lock()
+        self.request = request
+        self.started = time.time()
+        self.stage = None
+        self.stage_started = self.started
+        self.last_write = 0.0
+
+    def _write(self, status):
+        try:
+            save_json(status, STATUS_PATH)
+        except OSError:
+            pass
+
+    def __call__(self, stage, done=None, total=None):
+        with self.lock:
+            self._report(stage, done, total)
+
+    def _report(self, stage, done, total):
+        now = time.time()
+        if stage != self.stage:
+            self.stage, self.stage_started = stage, now
+        elif now - self.last_write < STATUS_INTERVAL and done != total:
+            return
+        self.last_write = now
+        eta = None
+        if done and total and done < total:
+            eta = round((now - self.stage_started) / done * (total - done), 1)
+        self._write({
+            "state": "running",
+            "stage": stage,
+            "label": STAGE_LABELS.get(stage, stage),
+            "done": done,
+            "total": total,
+            "eta_s": eta,
+            "started": self.started,
+            "updated": now,
+            "request": self.request,
+            "pid": os.getpid(),
+        })
+
+    def finish(self, error=None):
+        now = time.time()
+        self._write({
+            "state": "failed" if error else "idle",
+            "started": self.started,
+            "finished": now,
+            "seconds": round(now - self.started, 1),
+            "request": self.request,
+            "error": error,
+        })
+
+
+def run_worker():
+    """Run refreshes until no request is newer than the last run's start; exits if another refresh holds the lock."""
+    from pipeline import run_pipeline
+
+    REFRESH_DIR.mkdir(parents=True, exist_ok=True)
+    served = 0
+    while True:
+        with open(LOCK_PATH, "a+b") as f:
+            if not _try_lock_for(f, LOCK_RETRY_SECONDS):
+                return
+            try:
+                while _requested() > served:
+                    served = _requested()
+                    reporter = ProgressReporter(served)
+                    print(f"Refresh started (request {served})", flush=True)
+                    try:
+                        run_pipeline(progress=reporter)
+                    except Exception as e:
+                        traceback.print_exc()
+                        reporter.finish(error=f"{type(e).__name__}: {e}")
+                    else:
+                        reporter.finish()
+                    sys.stdout.flush()
+            finally:
+                _unlock(f)
+        # A request made while the lock was still held has seen it held and relies on us
+        if _requested() <= served:
+            return
+
+
+def format_status(status):
+    state = status.get("state")
+    if state == "running":
+        line = status.get("label") or status.get("stage") or "Starting"
+        if status.get("total"):
+            line += f": {status.get('done') or 0}/{status['total']} tables"
+        if status.get("eta_s") is not None:
+            line += f", about {status['eta_s']:.0f}s left"
+        if status.get("pending"):
+            line += " (another refresh queued)"
+        return line
+    if state == "failed":
+        return f"Last refresh failed: {status.get('error')}"
+    if status.get("finished"):
+        return f"Last refresh finished in {status.get('seconds')}s"
+    return "No refresh has run yet"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Refresh the documentation in a background worker process.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--status", action="store_true", help="Print the current refresh status and exit")
+    args = parser.parse_args()
+    if args.worker:
+        run_worker()
+    elif args.status:
+        print(format_status(read_status()))
+    else:
+        request = request_refresh()
+        last = None
+        while True:
+            time.sleep(0.5)
+            status = read_status()
+            served = status.get("request", 0) >= request and status.get("state") != "running"
+            line = format_status(status) if status.get("request", 0) >= request else "Waiting for the refresh worker"
+            if line != last:
+                print(line)
+                last = line
+            if served or (not is_running() and all(p.poll() is not None for p in _children)):
+                break
@@ -1,8 +1,10 @@
 import sqlite3
 
+from tracing import traced_connection
+
 
 def detect_relationships(db_path="demo.db"):
-    conn = sqlite3.connect(db_path)
+    conn = traced_connection(sqlite3.connect(db_path))
     cursor = conn.cursor()
 
     # Get tables
@@ -0,0 +1,160 @@
+"""
+In-memory search over table and column names for the app sidebar.
+
+Built once per artifact version from {table: [column names]}. Every name is
+indexed by its trigrams (posting lists of entry ids) and by its words (split on
+_ . - and spaces, kept sorted for prefix lookups), so a query only looks at
+entries that share something with it instead of scanning the whole catalog.
+
+Matches are ranked by kind of match: exact name, name prefix, word prefix,
+substring, then fuzzy (trigram similarity, so typos like "custmer" still find
+"customers"). Tables rank ahead of columns with the same kind of match, then
+shorter names first. A query with a dot is first matched as a whole name (so
+schema-qualified tables like "sales.orders" are found); only if no name matches
+it is split at the last dot: "orders.stat" searches columns starting with
+"stat" in tables matching "orders".
+"""
+import bisect
+import re
+from array import array
+from collections import Counter
+
+# Minimum trigram similarity (shared / union) for a fuzzy match
+FUZZY_THRESHOLD = 0.3
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+_WORD_SPLIT = re.compile(r"[_.\-\s]+")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _similarity(a_grams, b):
+    b_grams = _trigrams(b)
+    shared = len(a_grams & b_grams)
+    return shared / (len(a_grams) + len(b_grams) - shared) if shared else 0.0
+
+
+class NameIndex:
+    """Trigram + word-prefix index over the distinct table and column names."""
+
+    def __init__(self, tables):
+        self.tables = sorted(tables)
+        # Term i: one distinct (lowercase name, is_column); a column name shared by
+        # many tables (id, created_at, ...) is indexed once and lists its tables
+        self.terms = []
+        self.term_tables = []
+        term_ids = {}
+        for table in self.tables:
+            for column in [None, *tables[table]]:
+                key = ((column if column is not None else table).lower(), column is not None)
+                i = term_ids.get(key)
+                if i is None:
+                    i = term_ids[key] = len(self.terms)
+                    self.terms.append(key)
+                    self.term_tables.append([])
+                self.term_tables[i].append((table, column))
+        self.grams = {}
+        self.gram_counts = array("H")
+        words = []
+        for i, (name, _) in enumerate(self.terms):
+            grams = _trigrams(name)
+            self.gram_counts.append(min(len(grams), 65535))
+            for g in grams:
+                self.grams.setdefault(g, array("i")).append(i)
+            words.extend((w, i) for w in {name, *_WORD_SPLIT.split(name)} if w)
+        words.sort()
+        self.words = [w for w, _ in words]
+        self.word_ids = array("i", (i for _, i in words))
+        self.size = sum(len(t) for t in self.term_tables)
+
+    def __len__(self):
+        return self.size
+
+    def _word_prefix_ids(self, prefix, limit):
+        lo = bisect.bisect_left(self.words, prefix)
+        hi = bisect.bisect_left(self.words, prefix + "\uffff", lo)
+        return self.word_ids[lo:min(hi, lo + limit)]
+
+    def _tier(self, query, name):
+        """Kind of match of one name, FUZZY if it only shares trigrams with the query."""
+        if name == query:
+            return EXACT
+        if name.startswith(query):
+            return PREFIX
+        if any(w.startswith(query) for w in _WORD_SPLIT.split(name)):
+            return WORD_PREFIX
+        if query in name:
+            return SUBSTRING
+        return FUZZY
+
+    def _match(self, query, limit, columns=None, similar=True):
+        """
+        Term ids matching a lowercase query, best first (columns=True/False: only
+        column/table terms; similar=False: no fuzzy, trigram-similarity matches).
+        """
+        candidates = {}
+        query_grams = _trigrams(query)
+        if query_grams:
+            shared = Counter()
+            for g in query_grams:
+                postings = self.grams.get(g)
+                if postings is not None:
+                    shared.update(postings)
+            for i, n in shared.items():
+                candidates[i] = n / (len(query_grams) + self.gram_counts[i] - n)
+        # Prefix lookups catch short queries (under three letters) and short names
+        for i in self._word_prefix_ids(query, limit * 20):
+            candidates.setdefault(i, 0.0)
+        ranked, fuzzy = [], []
+        hits = 0
+        for i, similarity in candidates.items():
+            name, is_column = self.terms[i]
+            if columns is not None and is_column != columns:
+                continue
+            tier = self._tier(query, name)
+            if tier == FUZZY:
+                fuzzy.append((i, similarity))
+            else:
+                ranked.append(((tier, is_column, 0, len(name), name), i))
+                hits += len(self.term_tables[i])
+        # Fuzzy matches only fill up what the exact kinds of match leave of the limit
+        if similar and hits < limit:
+            for i, similarity in fuzzy:
+                name, is_column = self.terms[i]
+                words = _WORD_SPLIT.split(name)
+                if similarity < FUZZY_THRESHOLD and len(words) > 1:
+                    # A typo in one word of a long name: compare with the words instead
+                    similarity = max(_similarity(query_grams, w) for w in words)
+                if similarity >= FUZZY_THRESHOLD:
+                    ranked.append(((FUZZY, is_column, -similarity, len(name), name), i))
+        ranked.sort()
+        return [i for _, i in ranked]
+
+    def search(self, text, limit=20):
+        """Ranked matches: [{"kind": "table" | "column", "table", "column"}]."""
+        query = " ".join(text.lower().split())
+        if not query:
+            return []
+        tables = None
+        terms = self._match(query, limit, similar=False) if "." in query else None
+        if not terms:
+            table_part, dot, column_part = query.rpartition(".")
+            if dot and table_part and column_part:
+                # Fuzzy table matches only when no table name contains the table part
+                table_ids = (self._match(table_part, limit * 10, columns=False, similar=False)
+                             or self._match(table_part, limit * 10, columns=False))
+                tables = {self.term_tables[i][0][0] for i in table_ids}
+                terms = self._match(column_part, limit, columns=True)
+            if not terms or not any(t in tables for i in terms for t, _ in self.term_tables[i]):
+                tables = None
+                terms = self._match(query, limit)
+        hits = []
+        for i in terms:
+            for table, column in self.term_tables[i]:
+                if tables is None or table in tables:
+                    hits.append({"kind": "column" if column is not None else "table", "table": table, "column": column})
+                    if len(hits) == limit:
+                        return hits
+        return hits
@@ -1,14 +1,73 @@
-"""Save and load JSON artifacts."""
+"""Save and load JSON artifacts, plus a sharded per-table artifact store."""
+import hashlib
 import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
-def save_json(data, path):
-    """Write data as JSON to path (str or Path)."""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default_mode():
+    """0o666 less the process umask: the mode open() would give a new file."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# mkstemp creates 0600 files; published files get the usual permissions instead
+_FILE_MODE = _default_mode()
+
+
+def atomic_write_bytes(data, path):
+    """Write bytes to path via a temp file in the same directory + rename, so readers never see a partial file."""
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def atomic_writer(path, encoding="utf-8"):
+    """Text file handle for streaming writes; the file replaces path only when the block exits cleanly."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def save_json(data, path):
+    """Write data as JSON to path (str or Path), atomically."""
+    atomic_write_bytes(json.dumps(data, indent=2).encode("utf-8"), path)
 
 
 def load_json(path):
@@ -17,9 +76,230 @@ def load_json(path):
         return json.load(f)
 
 
+# --------------------------------------------------
+# Publishing several artifacts as one generation
+# --------------------------------------------------
+
+GENERATION_FILE = ".generation"
+
+
+def read_generation(out_dir):
+    """Publish counter of out_dir: even when stable, odd while publish_json() is swapping files."""
+    try:
+        return int((Path(out_dir) / GENERATION_FILE).read_text())
+    except (OSError, ValueError):
+        return 0
+
+
+def publish_json(artifacts, out_dir):
+    """
+    Write {file_name: data} to out_dir as one generation. Every file is first written
+    to a temp file; the renames then happen back to back while the generation counter
+    is odd, so read_json_set() never returns a mix of old and new files. Returns the
+    new generation.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    staged = []
+    try:
+        for name, data in artifacts.items():
+            fd, tmp = tempfile.mkstemp(dir=out_dir, prefix=f".{name}.", suffix=".tmp")
+            staged.append((tmp, out_dir / name))
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(data, indent=2).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, _FILE_MODE)
+        generation = read_generation(out_dir)
+        # An odd counter left by an interrupted publish is reused
+        swapping = generation + 1 if generation % 2 == 0 else generation
+        atomic_write_bytes(str(swapping).encode(), out_dir / GENERATION_FILE)
+        for tmp, path in staged:
+            os.replace(tmp, path)
+        atomic_write_bytes(str(swapping + 1).encode(), out_dir / GENERATION_FILE)
+        return swapping + 1
+    except BaseException:
+        for tmp, _ in staged:
+            Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def read_json_set(names, out_dir, timeout=2.0):
+    """
+    Load out_dir/<name> for each name ({} if missing) from a single generation: retries
+    while a publish is in progress or completes during the read. After timeout
+    (e.g. a publisher died mid-swap) the files are returned as they are.
+    """
+    out_dir = Path(out_dir)
+    deadline = time.monotonic() + timeout
+    while True:
+        before = read_generation(out_dir)
+        if before % 2 == 0 or time.monotonic() > deadline:
+            loaded = [load_json(out_dir / n) if (out_dir / n).exists() else {} for n in names]
+            if read_generation(out_dir) == before or time.monotonic() > deadline:
+                return loaded
+        time.sleep(0.01)
+
+
 def save_metadata(metadata, file_name="metadata.json"):
     """Legacy: save metadata dict to file_name (default metadata.json)."""
-    path = Path(file_name)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(metadata, f, indent=2)
+    save_json(metadata, file_name)
+
+
+# --------------------------------------------------
+# Compact encoding: msgpack > orjson > json
+# --------------------------------------------------
+
+def _codec_name():
+    if msgpack is not None:
+        return "msgpack"
+    if orjson is not None:
+        return "orjson"
+    return "json"
+
+
+def encode(obj, codec=None):
+    codec = codec or _codec_name()
+    if codec == "msgpack":
+        return msgpack.packb(obj, use_bin_type=True)
+    if codec == "orjson":
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def decode(data, codec):
+    if codec == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("This artifact store was written with msgpack: pip install msgpack")
+        return msgpack.unpackb(data, raw=False)
+    if codec == "orjson" and orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# The index stays JSON (orjson is only a faster JSON codec) so it is readable anywhere
+_INDEX_CODEC = "orjson" if orjson is not None else "json"
+
+
+# --------------------------------------------------
+# Sharded artifact store
+# --------------------------------------------------
+
+class ArtifactStore:
+    """
+    Catalog stored as one shard per table ({"metadata", "profile", "summary"})
+    plus an index (table → shard file, row/column counts, relationships).
+
+    Shard files are content-addressed and the index is replaced atomically last,
+    so a reader always sees one consistent version. Readers load the small index
+    and then only the shards they ask for.
+
+    Unreferenced shards are removed lazily: a write keeps every shard the new or
+    the previous index refers to, and any other shard touched within the last
+    SHARD_GRACE_SECONDS (written or reused by a concurrent writer, or read by a
+    reader still holding an older index).
+    """
+
+    INDEX_NAME = "index"
+    SHARD_GRACE_SECONDS = 600
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._index = None
+        self._index_mtime = None
+
+    # ---------- writing ----------
+
+    def write_catalog(self, metadata, profiles, summaries):
+        """Write every table's shard (unchanged shards are reused) and swap in the new index."""
+        codec = _codec_name()
+        tables = metadata.get("tables", metadata)
+        shard_dir = self.root / "tables"
+        try:
+            with open(self.root / f"{self.INDEX_NAME}.json", "rb") as f:
+                previous = {e["shard"] for e in decode(f.read(), _INDEX_CODEC)["tables"].values()}
+        except (OSError, ValueError, KeyError):
+            previous = set()
+        index = {
+            "version": time.time(),
+            "codec": codec,
+            "relationships": metadata.get("relationships", []),
+            "tables": {},
+        }
+        for name, columns in tables.items():
+            profile = profiles.get(name, {})
+            data = encode({"metadata": columns, "profile": profile, "summary": summaries.get(name, {})}, codec)
+            shard = f"tables/{hashlib.sha1(data).hexdigest()}.{codec}"
+            try:
+                # Reused: refresh its mtime so a concurrent write does not collect it
+                os.utime(self.root / shard)
+            except FileNotFoundError:
+                atomic_write_bytes(data, self.root / shard)
+            index["tables"][name] = {
+                "shard": shard,
+                "columns": len(columns),
+                "rows": profile.get("total_rows"),
+            }
+        atomic_write_bytes(encode(index, _INDEX_CODEC), self.root / f"{self.INDEX_NAME}.json")
+        # Drop shards neither index refers to once nobody can still be using them
+        live = previous | {entry["shard"] for entry in index["tables"].values()}
+        cutoff = time.time() - self.SHARD_GRACE_SECONDS
+        if shard_dir.exists():
+            for path in shard_dir.iterdir():
+                if f"tables/{path.name}" in live or path.name.startswith("."):
+                    continue
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                except FileNotFoundError:
+                    pass
+        self._index = None
+        return self.root / f"{self.INDEX_NAME}.json"
+
+    # ---------- reading ----------
+
+    def exists(self):
+        return (self.root / f"{self.INDEX_NAME}.json").exists()
+
+    def index(self):
+        """The index, reloaded only when the file changed."""
+        path = self.root / f"{self.INDEX_NAME}.json"
+        mtime = path.stat().st_mtime_ns
+        if self._index is None or mtime != self._index_mtime:
+            with open(path, "rb") as f:
+                self._index = decode(f.read(), _INDEX_CODEC)
+            self._index_mtime = mtime
+        return self._index
+
+    def table_names(self):
+        return list(self.index()["tables"])
+
+    def relationships(self):
+        return self.index()["relationships"]
+
+    def table(self, name):
+        """{"metadata": [columns], "profile": {...}, "summary": {...}} for one table."""
+        index = self.index()
+        entry = index["tables"].get(name)
+        if entry is None:
+            raise KeyError(name)
+        return _read_shard(str(self.root / entry["shard"]), index["codec"])
+
+    def load_all(self):
+        """(metadata, profiles, summaries) in the flat artifact shapes."""
+        names = self.table_names()
+        shards = {name: self.table(name) for name in names}
+        metadata = {
+            "tables": {n: s["metadata"] for n, s in shards.items()},
+            "relationships": self.relationships(),
+        }
+        profiles = {n: s["profile"] for n, s in shards.items()}
+        summaries = {n: s["summary"] for n, s in shards.items() if s["summary"]}
+        return metadata, profiles, summaries
+
+
+@lru_cache(maxsize=1024)
+def _read_shard(path, codec):
+    # Shards are content-addressed and never rewritten, so caching by path is safe
+    with open(path, "rb") as f:
+        return decode(f.read(), codec)
@@ -0,0 +1,217 @@
+"""
+Build a small, referentially consistent copy of the SQLite database.
+
+Start from seed rows (a WHERE clause) or a sample percentage of chosen tables,
+then follow the relationships in artifacts/metadata.json (explicit and inferred)
+transitively so every referenced row is included. Selected rowids are tracked in
+scratch tables inside the target file, so memory stays bounded on multi-GB
+sources; rows are then bulk-copied and the source indexes recreated.
+"""
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import ARTIFACTS_DIR, DB_PATH, DB_TYPE
+from storage import load_json
+
+_KEEP_PREFIX = "_subset_keep_"
+
+
+def _scratch_names(tables, taken):
+    """{table: name of its scratch rowid table}, avoiding every name in the source schema."""
+    taken = {n.lower() for n in taken}
+    names, i = {}, 0
+    for t in tables:
+        while f"{_KEEP_PREFIX}{i}".lower() in taken:
+            i += 1
+        names[t] = f"{_KEEP_PREFIX}{i}"
+        i += 1
+    return names
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _has_rowid(conn, table):
+    try:
+        conn.execute(f"SELECT rowid FROM src.{_q(table)} LIMIT 1")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _load_relationships():
+    path = ARTIFACTS_DIR / "metadata.json"
+    if not path.exists():
+        return []
+    return load_json(path).get("relationships", [])
+
+
+def build_subset(
+    target_path,
+    seeds: Optional[dict] = None,
+    sample_pct: Optional[dict] = None,
+    relationships: Optional[list] = None,
+    source_path: Optional[str] = None,
+) -> dict:
+    """
+    Write a subset database to target_path (overwritten if it exists).
+
+    - seeds: {table: "SQL WHERE clause"} selecting seed rows, e.g. {"customers": "customer_state = 'SP'"}.
+    - sample_pct: {table: percent} deterministic sample of a table's rows (by rowid hash).
+    - relationships: defaults to metadata.json's; each {table, column, ref_table, ref_column}
+      pulls in the ref_table rows referenced by selected table rows, until nothing changes.
+
+    Tables not reached stay empty (schema only). WITHOUT ROWID tables are copied whole.
+    Raises ValueError if seeds or sample_pct name a table that does not exist or
+    has no rowid; no target is left behind on failure.
+    Returns a report: rows per table, rounds, seconds, source and target sizes.
+    """
+    if DB_TYPE != "sqlite":
+        raise NotImplementedError("Subsetting is supported only for SQLite.")
+    if not seeds and not sample_pct:
+        raise ValueError("Give seeds and/or sample_pct to choose starting rows.")
+    source_path = source_path or DB_PATH
+    relationships = _load_relationships() if relationships is None else relationships
+    target = Path(target_path)
+    if target.resolve() == Path(source_path).resolve():
+        raise ValueError("Target must differ from the source database.")
+    target.unlink(missing_ok=True)
+    started = time.perf_counter()
+
+    built = False
+    conn = sqlite3.connect(target.resolve().as_uri(), uri=True, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("ATTACH DATABASE ? AS src", (Path(source_path).resolve().as_uri() + "?mode=ro",))
+    try:
+        schema = conn.execute(
+            "SELECT type, name, tbl_name, sql FROM src.sqlite_master "
+            "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        tables = [name for typ, name, _, _ in schema if typ == "table"]
+        rowid_tables = {t for t in tables if _has_rowid(conn, t)}
+        chosen = {**(seeds or {}), **(sample_pct or {})}
+        unknown = sorted(t for t in chosen if t not in tables)
+        if unknown:
+            raise ValueError(f"Unknown tables in seeds/sample_pct: {', '.join(unknown)}")
+        whole = sorted(t for t in chosen if t not in rowid_tables)
+        if whole:
+            raise ValueError(
+                f"WITHOUT ROWID tables cannot be seeded or sampled (they are copied whole): {', '.join(whole)}"
+            )
+        keep = _scratch_names(tables, {name for _, name, _, _ in schema})
+
+        conn.execute("BEGIN")
+        for typ, name, _, sql in schema:
+            if typ == "table":
+                conn.execute(sql)
+        for t in rowid_tables:
+            conn.execute(f"CREATE TABLE {keep[t]} (id INTEGER PRIMARY KEY)")
+
+        # 1. Seed rows
+        for t, where in (seeds or {}).items():
+            if t in rowid_tables:
+                conn.execute(f"INSERT OR IGNORE INTO {keep[t]} SELECT rowid FROM src.{_q(t)} WHERE {where}")
+        for t, pct in (sample_pct or {}).items():
+            if t in rowid_tables:
+                # Knuth multiplicative hash of rowid: deterministic, evenly spread sample
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {keep[t]} SELECT rowid FROM src.{_q(t)} "
+                    "WHERE (((rowid * 2654435761) & 4294967295) % 10000) < ?",
+                    (int(float(pct) * 100),),
+                )
+
+        # 2. Referential closure: include every row referenced by an included row
+        rels = [
+            r for r in relationships
+            if r.get("table") in rowid_tables and r.get("ref_table") in rowid_tables
+            and r.get("column") and r.get("ref_column")
+        ]
+        rounds = 0
+        changed = True
+        while changed and rels:
+            changed = False
+            rounds += 1
+            for r in rels:
+                child, parent = r["table"], r["ref_table"]
+                before = conn.total_changes
+                conn.execute(
+                    f"INSERT OR IGNORE INTO {keep[parent]} "
+                    f"SELECT p.rowid FROM src.{_q(parent)} p WHERE p.{_q(r['ref_column'])} IN ("
+                    f"SELECT c.{_q(r['column'])} FROM src.{_q(child)} c JOIN {keep[child]} k ON k.id = c.rowid)"
+                )
+                if conn.total_changes != before:
+                    changed = True
+
+        # 3. Bulk copy selected rows in rowid order, then drop the scratch tables
+        report = {"tables": {}}
+        for t in tables:
+            if t in rowid_tables:
+                conn.execute(
+                    f"INSERT INTO main.{_q(t)} SELECT s.* FROM {keep[t]} k "
+                    f"JOIN src.{_q(t)} s ON s.rowid = k.id ORDER BY k.id"
+                )
+                conn.execute(f"DROP TABLE {keep[t]}")
+            else:
+                conn.execute(f"INSERT INTO main.{_q(t)} SELECT * FROM src.{_q(t)}")
+            report["tables"][t] = conn.execute(f"SELECT COUNT(*) FROM main.{_q(t)}").fetchone()[0]
+
+        # 4. Indexes, views and triggers after the load
+        for typ, name, _, sql in schema:
+            if typ in ("index", "view", "trigger"):
+                conn.execute(sql)
+        conn.execute("COMMIT")
+
+        violations = conn.execute("PRAGMA main.foreign_key_check").fetchall()
+        built = True
+    finally:
+        conn.close()
+        if not built:
+            target.unlink(missing_ok=True)
+
+    report.update({
+        "rounds": rounds,
+        "foreign_key_violations": len(violations),
+        "seconds": round(time.perf_counter() - started, 3),
+        "source_bytes": Path(source_path).stat().st_size,
+        "target_bytes": target.stat().st_size,
+        "path": str(target),
+    })
+    return report
+
+
+def _parse_pairs(values):
+    pairs = {}
+    for v in values or []:
+        table, _, rest = v.partition("=")
+        pairs[table.strip()] = rest.strip()
+    return pairs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a referentially consistent subset of the SQLite database.")
+    parser.add_argument("target", help="Path of the subset .db to write")
+    parser.add_argument("--seed", action="append", metavar="TABLE=WHERE",
+                        help="Seed rows, e.g. --seed \"customers=customer_state = 'SP'\"")
+    parser.add_argument("--sample", action="append", metavar="TABLE=PCT",
+                        help="Sample percentage of a table, e.g. --sample orders=5")
+    parser.add_argument("--source", help="Source database (default: DB_PATH)")
+    args = parser.parse_args()
+    result = build_subset(
+        args.target,
+        seeds=_parse_pairs(args.seed),
+        sample_pct={t: float(p) for t, p in _parse_pairs(args.sample).items()},
+        source_path=args.source,
+    )
+    for table, rows in result["tables"].items():
+        print(f"{table}: {rows} rows")
+    print(
+        f"Wrote {result['path']} in {result['seconds']:.2f}s "
+        f"({result['source_bytes'] / 1e6:.1f} MB → {result['target_bytes'] / 1e6:.1f} MB, "
+        f"{result['rounds']} closure rounds, {result['foreign_key_violations']} FK violations)"
+    )
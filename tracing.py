@@ -0,0 +1,400 @@
+"""
+Lightweight tracing for the pipeline: spans per stage and per table, SQL
+statement timings, LLM latency and (estimated) token counts, and memory.
+
+Switched on with TRACE=1 (or tracing.enable()). When off, span() returns a
+shared no-op object and traced_connection() returns the connection unchanged,
+so instrumented code pays one function call per span and nothing per SQL row.
+export() writes a Chrome trace-event file (open it in chrome://tracing or
+https://ui.perfetto.dev) plus a JSON summary, and returns a text summary table.
+Each export starts a fresh buffer; between exports at most TRACE_MAX_EVENTS are
+kept, oldest dropped first, so a long-lived process does not grow without bound.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from config import ARTIFACTS_DIR, TRACE_ENABLED, TRACE_MAX_EVENTS
+
+TRACE_DIR = ARTIFACTS_DIR / "traces"
+
+_enabled = TRACE_ENABLED
+_events = deque(maxlen=TRACE_MAX_EVENTS)
+_counters = {}
+_thread_names = {}
+_lock = threading.Lock()
+_origin_ns = time.perf_counter_ns()
+_PID = os.getpid()
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    """Turn tracing on or off for this process (e.g. from a benchmark) and clear recorded events."""
+    global _enabled
+    _enabled = on
+    reset()
+
+
+def reset():
+    global _origin_ns
+    with _lock:
+        _events.clear()
+        _counters.clear()
+    _origin_ns = time.perf_counter_ns()
+
+
+def _append(event):
+    # Caller holds _lock
+    if len(_events) == _events.maxlen:
+        _counters["trace_events_dropped"] = _counters.get("trace_events_dropped", 0) + 1
+    _events.append(event)
+
+
+def _now_us():
+    return (time.perf_counter_ns() - _origin_ns) / 1000
+
+
+def rss_mb():
+    """Current resident memory (Linux /proc), else peak RSS from getrusage, else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (2**20 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+def count(name, n=1):
+    """Add n to a named counter (shown in the summary)."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def counters():
+    """Snapshot of the named counters (sql_statements, sql_rows, llm_calls, ...)."""
+    with _lock:
+        return dict(_counters)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("event",)
+
+    def __init__(self, name, cat, args):
+        thread = threading.current_thread()
+        _thread_names[thread.ident] = thread.name
+        self.event = {
+            "name": name, "cat": cat, "ph": "X", "pid": _PID,
+            "tid": threading.get_ident(), "ts": 0.0, "dur": 0.0, "args": args,
+        }
+
+    def __enter__(self):
+        self.event["ts"] = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ev = self.event
+        ev["dur"] = _now_us() - ev["ts"]
+        if exc_type is not None:
+            ev["args"]["error"] = exc_type.__name__
+        with _lock:
+            _append(ev)
+            if ev["cat"] == "stage":
+                _append({
+                    "name": "memory", "ph": "C", "pid": _PID, "tid": 0,
+                    "ts": ev["ts"] + ev["dur"], "args": {"rss_mb": rss_mb()},
+                })
+        return False
+
+    def set(self, **args):
+        self.event["args"].update(args)
+
+
+def span(name, cat="stage", **args):
+    """Context manager timing a block: with span("profile", cat="table", table=t) as s: ...; s.set(rows=n)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+# --------------------------------------------------
+# SQL statements
+# --------------------------------------------------
+
+class _TracedCursor:
+    """Cursor proxy: one "sql" event per statement, covering execute and the fetches that follow it."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._event = None
+
+    def _start(self, sql, many=False):
+        self._event = {
+            "name": "sql", "cat": "sql", "ph": "X", "pid": _PID, "tid": threading.get_ident(),
+            "ts": _now_us(), "dur": 0.0, "args": {"sql": sql, "rows": 0},
+        }
+        if many:
+            self._event["args"]["executemany"] = True
+        with _lock:
+            _append(self._event)
+            _counters["sql_statements"] = _counters.get("sql_statements", 0) + 1
+
+    def _time(self, fn, *args):
+        t0 = time.perf_counter_ns()
+        try:
+            return fn(*args)
+        finally:
+            if self._event is not None:
+                self._event["dur"] += (time.perf_counter_ns() - t0) / 1000
+
+    def _rows(self, n):
+        if self._event is not None:
+            self._event["args"]["rows"] += n
+        with _lock:
+            _counters["sql_rows"] = _counters.get("sql_rows", 0) + n
+
+    def execute(self, sql, params=()):
+        self._start(sql)
+        self._time(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq):
+        self._start(sql, many=True)
+        self._time(self._cursor.executemany, sql, seq)
+        return self
+
+    def fetchone(self):
+        row = self._time(self._cursor.fetchone)
+        self._rows(row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._time(self._cursor.fetchmany, *(() if size is None else (size,)))
+        self._rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._time(self._cursor.fetchall)
+        self._rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _TracedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _TracedCursor(self._conn.cursor())
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def traced_connection(conn):
+    """Wrap a DB-API connection so its statements are traced; the connection itself when tracing is off."""
+    return _TracedConnection(conn) if _enabled else conn
+
+
+# --------------------------------------------------
+# LLM calls
+# --------------------------------------------------
+
+def traced_stream(backend, prompt, chunks):
+    """
+    Wrap an LLM chunk iterator: one "llm" event with time to first token, total
+    latency and token counts (estimated at ~4 characters per token).
+    """
+    if not _enabled:
+        yield from chunks
+        return
+    with span("llm", cat="llm", backend=backend.name, model=getattr(backend, "model", "")) as s:
+        t0 = time.perf_counter()
+        first = None
+        chars = 0
+        n = 0
+        try:
+            for chunk in chunks:
+                if first is None:
+                    first = time.perf_counter() - t0
+                chars += len(chunk)
+                n += 1
+                yield chunk
+        finally:
+            s.set(
+                ttft_ms=round(first * 1000, 1) if first is not None else None,
+                chunks=n,
+                prompt_tokens=len(prompt) // 4,
+                completion_tokens=chars // 4,
+                tokens_estimated=True,
+            )
+            count("llm_calls")
+            count("llm_tokens", len(prompt) // 4 + chars // 4)
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+
+# --------------------------------------------------
+# Export
+# --------------------------------------------------
+
+def _normalize_sql(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    return re.sub(r"\s+", " ", sql).strip()[:120]
+
+
+def summarize(top=10, events=None, counters=None):
+    """
+    Aggregate recorded events (or the given events/counters snapshot): per span name,
+    slowest tables, top SQL shapes, LLM totals, counters.
+    """
+    if events is None:
+        with _lock:
+            events, counters = list(_events), dict(_counters)
+    events = [e for e in events if e["ph"] == "X"]
+    counters = counters or {}
+    spans, tables, sql = {}, {}, {}
+    llm = {"calls": 0, "seconds": 0.0, "ttft_ms": [], "prompt_tokens": 0, "completion_tokens": 0}
+    for e in events:
+        ms = e["dur"] / 1000
+        if e["cat"] == "sql":
+            key = _normalize_sql(e["args"]["sql"])
+            agg = sql.setdefault(key, {"count": 0, "ms": 0.0, "rows": 0})
+            agg["rows"] += e["args"]["rows"]
+        else:
+            agg = spans.setdefault(f"{e['cat']}:{e['name']}", {"count": 0, "ms": 0.0, "max_ms": 0.0})
+            agg["max_ms"] = max(agg["max_ms"], ms)
+            table = e["args"].get("table")
+            if table is not None:
+                tables[table] = tables.get(table, 0.0) + ms
+        agg["count"] += 1
+        agg["ms"] += ms
+        if e["cat"] == "llm":
+            llm["calls"] += 1
+            llm["seconds"] += ms / 1000
+            if e["args"].get("ttft_ms") is not None:
+                llm["ttft_ms"].append(e["args"]["ttft_ms"])
+            llm["prompt_tokens"] += e["args"].get("prompt_tokens", 0)
+            llm["completion_tokens"] += e["args"].get("completion_tokens", 0)
+    ttfts = sorted(llm.pop("ttft_ms"))
+    llm["median_ttft_ms"] = ttfts[len(ttfts) // 2] if ttfts else None
+    llm["seconds"] = round(llm["seconds"], 3)
+    return {
+        "spans": {k: {**v, "ms": round(v["ms"], 2), "max_ms": round(v["max_ms"], 2)} for k, v in spans.items()},
+        "slowest_tables": [
+            {"table": t, "ms": round(ms, 2)} for t, ms in sorted(tables.items(), key=lambda x: -x[1])[:top]
+        ],
+        "sql": [
+            {"sql": k, **v, "ms": round(v["ms"], 2)}
+            for k, v in sorted(sql.items(), key=lambda x: -x[1]["ms"])[:top]
+        ],
+        "llm": llm,
+        "counters": counters,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def format_summary(summary):
+    lines = [f"{'span':<40} {'count':>7} {'total ms':>12} {'max ms':>10}"]
+    for name, s in sorted(summary["spans"].items(), key=lambda x: -x[1]["ms"]):
+        lines.append(f"{name:<40} {s['count']:>7} {s['ms']:>12,.1f} {s['max_ms']:>10,.1f}")
+    if summary["slowest_tables"]:
+        lines.append("Slowest tables: " + ", ".join(f"{t['table']} {t['ms']:,.0f}ms" for t in summary["slowest_tables"]))
+    for q in summary["sql"]:
+        lines.append(f"  sql {q['count']:>6}x {q['ms']:>10,.1f}ms {q['rows']:>9} rows  {q['sql']}")
+    llm = summary["llm"]
+    if llm["calls"]:
+        lines.append(
+            f"LLM: {llm['calls']} calls, {llm['seconds']:.2f}s, median TTFT {llm['median_ttft_ms']}ms, "
+            f"~{llm['prompt_tokens']:,} prompt + ~{llm['completion_tokens']:,} completion tokens"
+        )
+    counters = ", ".join(f"{k}={v:,}" for k, v in sorted(summary["counters"].items()))
+    lines.append(f"Counters: {counters or '-'}; peak RSS {summary['peak_rss_mb']} MB")
+    return "\n".join(lines)
+
+
+def export(out_dir=None, name=None):
+    """
+    Write <name>.trace.json (Chrome trace events) and <name>.summary.json to out_dir
+    (default artifacts/traces/) and clear the recorded events and counters, so the next
+    export covers only what happened since. Returns (trace_path, summary) or (None, None)
+    when tracing is off.
+    """
+    if not _enabled:
+        return None, None
+    out_dir = out_dir or TRACE_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = name or datetime.now().strftime("pipeline-%Y%m%dT%H%M%S")
+    with _lock:
+        events, counters = list(_events), dict(_counters)
+        _events.clear()
+        _counters.clear()
+    thread_names = {**_thread_names, **{t.ident: t.name for t in threading.enumerate()}}
+    meta = [
+        {"name": "thread_name", "ph": "M", "pid": _PID, "tid": tid, "args": {"name": thread_names.get(tid, str(tid))}}
+        for tid in {e["tid"] for e in events if e["tid"]}
+    ]
+    trace_path = out_dir / f"{name}.trace.json"
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f, default=str)
+    summary = summarize(events=events, counters=counters)
+    with open(out_dir / f"{name}.summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, default=str)
+    return trace_path, summary
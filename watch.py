@@ -0,0 +1,334 @@
+"""
+Watch mode: keep the dictionary fresh without re-running the whole pipeline.
+
+A warm connection polls cheap change signals every WATCH_POLL_SECONDS:
+- SQLite: PRAGMA data_version (bumped by every commit from another connection)
+  and PRAGMA schema_version, plus the file identity so a replaced file is noticed
+- PostgreSQL: pg_stat_user_tables insert/update/delete counters and a hash of
+  information_schema.columns
+- SQL Server: partition row counts, index usage update times and a checksum of
+  sys.columns
+Changes are debounced: a refresh starts WATCH_DEBOUNCE_SECONDS after the last
+change, or WATCH_MAX_DELAY_SECONDS after the first one during a long burst.
+
+A refresh re-extracts metadata only when the schema changed. It compares
+per-table signatures to find the affected tables and re-profiles and
+re-summarizes only those (pipeline.refresh_tables). The artifacts are published
+as one generation (storage.publish_json), so readers never mix old and new files.
+On SQLite a table's signature is its row count, max rowid and a hash of its newest
+rows, so in-place updates of older rows are picked up by the periodic full refresh
+(WATCH_FULL_REFRESH_HOURS).
+
+Refreshes hold the single-flight lock of refresh_jobs.py, so they never overlap
+with a refresh started from the app. A failed refresh is logged and retried
+after the debounce period; the daemon keeps polling.
+
+    python3 watch.py                 # run until interrupted
+    python3 watch.py --once          # refresh whatever changed since the last run, then exit
+"""
+import hashlib
+import sqlite3
+import time
+import traceback
+from pathlib import Path
+
+from config import (
+    ARTIFACTS_DIR,
+    DB_PATH,
+    DB_TYPE,
+    WATCH_DEBOUNCE_SECONDS,
+    WATCH_FULL_REFRESH_HOURS,
+    WATCH_MAX_DELAY_SECONDS,
+    WATCH_POLL_SECONDS,
+)
+from db_connector import _file_identity, get_connection
+from refresh_jobs import refresh_lock
+from storage import load_json, read_generation, read_json_set, save_json
+
+WATCH_STATE_PATH = ARTIFACTS_DIR / "watch_state.json"
+# Newest rows hashed per SQLite table signature
+TAIL_ROWS = 64
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+
+# --------------------------------------------------
+# Change signals
+# --------------------------------------------------
+
+class SQLiteSignals:
+    """data_version / schema_version on one read-only connection, reopened if the file is replaced."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.conn = None
+        self.identity = None
+
+    def _connection(self):
+        identity = _file_identity(self.path)
+        if self.conn is None or identity != self.identity:
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = sqlite3.connect(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+            self.identity = identity
+        return self.conn
+
+    def version(self):
+        conn = self._connection()
+        data = conn.execute("PRAGMA data_version").fetchone()[0]
+        schema = conn.execute("PRAGMA schema_version").fetchone()[0]
+        return {"data": [str(self.identity), data], "schema": [str(self.identity), schema]}
+
+    def table_signatures(self, tables):
+        conn = self._connection()
+        signatures = {}
+        for t in tables:
+            try:
+                count, max_rowid = conn.execute(f"SELECT COUNT(*), MAX(rowid) FROM {_q(t)}").fetchone()
+                tail = conn.execute(f"SELECT * FROM {_q(t)} ORDER BY rowid DESC LIMIT {TAIL_ROWS}").fetchall()
+                signatures[t] = f"{count}:{max_rowid}:{_digest(tail)}"
+            except sqlite3.OperationalError:
+                # WITHOUT ROWID tables (or a table dropped meanwhile)
+                try:
+                    signatures[t] = str(conn.execute(f"SELECT COUNT(*) FROM {_q(t)}").fetchone()[0])
+                except sqlite3.OperationalError:
+                    signatures[t] = None
+        return signatures
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class PostgresSignals:
+    """Cumulative per-table write counters from pg_stat_user_tables (schema public)."""
+
+    def __init__(self):
+        self.conn = get_connection()
+        # Outside a transaction, so every poll sees fresh statistics
+        self.conn.autocommit = True
+
+    def _rows(self, sql):
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        return cur.fetchall()
+
+    def version(self):
+        data = self._rows(
+            "SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0) FROM pg_stat_user_tables "
+            "WHERE schemaname = 'public'"
+        )[0][0]
+        schema = self._rows(
+            "SELECT md5(string_agg(table_name || '.' || column_name || ':' || data_type, ',' "
+            "ORDER BY table_name, ordinal_position)) FROM information_schema.columns WHERE table_schema = 'public'"
+        )[0][0]
+        return {"data": str(data), "schema": schema}
+
+    def table_signatures(self, tables):
+        rows = self._rows(
+            "SELECT relname, n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables WHERE schemaname = 'public'"
+        )
+        found = {r[0]: f"{r[1]}:{r[2]}:{r[3]}" for r in rows}
+        return {t: found.get(t) for t in tables}
+
+    def close(self):
+        self.conn.close()
+
+
+class SqlServerSignals:
+    """Partition row counts and last index update per table (needs VIEW SERVER STATE for the usage stats)."""
+
+    def __init__(self):
+        self.conn = get_connection()
+        self.conn.autocommit = True
+
+    def _rows(self, sql):
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        return cur.fetchall()
+
+    def _table_rows(self):
+        return self._rows(
+            "SELECT t.name, SUM(p.rows), MAX(s.last_user_update) FROM sys.tables t "
+            "JOIN sys.partitions p ON p.object_id = t.object_id AND p.index_id IN (0, 1) "
+            "LEFT JOIN sys.dm_db_index_usage_stats s ON s.object_id = t.object_id AND s.database_id = DB_ID() "
+            "GROUP BY t.name"
+        )
+
+    def version(self):
+        schema = self._rows(
+            "SELECT CHECKSUM_AGG(CHECKSUM(t.name, c.name, c.system_type_id, t.modify_date)) "
+            "FROM sys.tables t JOIN sys.columns c ON c.object_id = t.object_id"
+        )[0][0]
+        return {"data": _digest(sorted(map(tuple, self._table_rows()))), "schema": str(schema)}
+
+    def table_signatures(self, tables):
+        found = {r[0]: f"{r[1]}:{r[2]}" for r in self._table_rows()}
+        return {t: found.get(t) for t in tables}
+
+    def close(self):
+        self.conn.close()
+
+
+def make_signals():
+    if DB_TYPE == "sqlite":
+        return SQLiteSignals()
+    if DB_TYPE == "postgres":
+        return PostgresSignals()
+    if DB_TYPE == "sqlserver":
+        return SqlServerSignals()
+    raise ValueError(f"Unknown DB_TYPE: {DB_TYPE}. Use sqlite, postgres, or sqlserver.")
+
+
+# --------------------------------------------------
+# Watcher
+# --------------------------------------------------
+
+class Watcher:
+    """Holds the published artifacts and table signatures in memory and refreshes what changed."""
+
+    def __init__(self, signals=None, poll=WATCH_POLL_SECONDS, debounce=WATCH_DEBOUNCE_SECONDS,
+                 max_delay=WATCH_MAX_DELAY_SECONDS, full_every_hours=WATCH_FULL_REFRESH_HOURS):
+        self.signals = signals or make_signals()
+        self.poll = poll
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.full_every = full_every_hours * 3600 if full_every_hours else None
+        self.generation = None
+        self._load_artifacts()
+        state = load_json(WATCH_STATE_PATH) if WATCH_STATE_PATH.exists() else {}
+        self.signatures = state.get("signatures", {})
+        self.schema_version = state.get("schema")
+        self.version = None
+        self.last_full = time.monotonic()
+
+    def _load_artifacts(self):
+        """Reload the published artifacts if someone else (a refresh worker) published since."""
+        generation = read_generation(ARTIFACTS_DIR)
+        if generation != self.generation:
+            self.meta, self.profiles, self.summaries = read_json_set(
+                ("metadata.json", "profiles.json", "summaries.json"), ARTIFACTS_DIR
+            )
+            self.generation = generation
+
+    def refresh(self, full=False):
+        """
+        Re-profile the tables whose signature or columns changed (all with full=True) and
+        publish, holding the refresh lock. On error nothing is recorded, so the next
+        refresh retries the same tables.
+        """
+        with refresh_lock():
+            self._load_artifacts()
+            self._refresh(full)
+            self.generation = read_generation(ARTIFACTS_DIR)
+
+    def _refresh(self, full):
+        from metadata_extractor import extract_metadata
+        from pipeline import refresh_tables
+
+        started = time.perf_counter()
+        # Read before the signatures: anything committed from here on triggers another round
+        version = self.signals.version()
+        previous = self.meta.get("tables", {})
+        if full or not previous or version["schema"] != self.schema_version:
+            meta = extract_metadata()
+        else:
+            meta = self.meta
+        tables = meta.get("tables", {})
+        signatures = self.signals.table_signatures(tables)
+        changed = [
+            t for t in tables
+            if full or t not in self.profiles or signatures.get(t) != self.signatures.get(t)
+            or tables[t] != previous.get(t)
+        ]
+        removed = [t for t in previous if t not in tables]
+        relationships_changed = meta.get("relationships") != self.meta.get("relationships")
+        if changed or removed or relationships_changed:
+            print(f"Refreshing {len(changed)} of {len(tables)} table(s), {len(removed)} removed")
+            self.profiles, self.summaries, failed = refresh_tables(meta, changed, self.profiles, self.summaries)
+            # Forget the signature of a failed table so the next refresh retries it
+            for t in failed:
+                signatures.pop(t, None)
+            self.meta = meta
+            print(f"Refreshed in {time.perf_counter() - started:.2f}s")
+        else:
+            print("No table changes")
+        self.version = version
+        self.signatures = signatures
+        self.schema_version = version["schema"]
+        save_json({"signatures": signatures, "schema": self.schema_version}, WATCH_STATE_PATH)
+        if full:
+            self.last_full = time.monotonic()
+
+    def _try_refresh(self, full=False):
+        """refresh(), logging instead of raising; True if it succeeded."""
+        try:
+            self.refresh(full=full)
+            return True
+        except Exception:
+            traceback.print_exc()
+            print(f"Refresh failed; retrying in {self.debounce:g}s")
+            return False
+
+    def run(self, once=False):
+        """Poll until interrupted (or, with once=True, until nothing is pending)."""
+        print(f"Watching {DB_TYPE} database (poll {self.poll}s, debounce {self.debounce}s)")
+        if once:
+            try:
+                self.refresh()
+            finally:
+                self.signals.close()
+            return
+        retry_at = None if self._try_refresh() else time.monotonic() + self.debounce
+        first_change = last_change = None
+        try:
+            while True:
+                time.sleep(self.poll)
+                now = time.monotonic()
+                try:
+                    version = self.signals.version()
+                except Exception:
+                    traceback.print_exc()
+                    continue
+                if version != self.version:
+                    self.version = version
+                    last_change = now
+                    first_change = first_change or now
+                full_due = self.full_every is not None and now - self.last_full >= self.full_every
+                settled = last_change is not None and (
+                    now - last_change >= self.debounce or now - first_change >= self.max_delay
+                )
+                if (settled or full_due or retry_at is not None) and (retry_at is None or now >= retry_at):
+                    if self._try_refresh(full=full_due):
+                        first_change = last_change = retry_at = None
+                    else:
+                        retry_at = time.monotonic() + self.debounce
+        finally:
+            self.signals.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Keep the data dictionary fresh as the database changes.")
+    parser.add_argument("--once", action="store_true", help="Refresh what changed since the last run and exit")
+    parser.add_argument("--poll", type=float, default=WATCH_POLL_SECONDS, help="Seconds between change checks")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS,
+                        help="Quiet seconds after the last change before refreshing")
+    parser.add_argument("--max-delay", type=float, default=WATCH_MAX_DELAY_SECONDS,
+                        help="Refresh at the latest this long after the first change of a burst")
+    parser.add_argument("--full-every-hours", type=float, default=WATCH_FULL_REFRESH_HOURS,
+                        help="Periodic full re-profile (0 = never)")
+    args = parser.parse_args()
+    watcher = Watcher(poll=args.poll, debounce=args.debounce, max_delay=args.max_delay,
+                      full_every_hours=args.full_every_hours)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("Stopped.")